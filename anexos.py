@@ -0,0 +1,167 @@
+# anexos.py
+# Anexos dos pacientes (PDFs e imagens). Só os metadados ficam no banco (tabela anexos); o conteúdo fica num
+# diretório endereçado pelo SHA-256 de cada arquivo, então o mesmo arquivo enviado duas vezes ocupa o disco uma vez.
+# O upload é gravado em pedaços direto num arquivo temporário do armazém, com o hash calculado no caminho, e depois
+# só renomeado para o lugar definitivo: nenhum arquivo é montado inteiro em memória nem copiado duas vezes.
+import hashlib
+import os
+import tempfile
+from datetime import datetime
+
+import pytz
+from flask import abort, request, send_file
+from PIL import Image, ImageOps
+from werkzeug.exceptions import RequestEntityTooLarge
+from werkzeug.formparser import parse_form_data
+
+from models import db, Anexo
+
+# Tipos aceitos, reconhecidos pelos primeiros bytes do arquivo (o tipo informado pelo navegador não é usado)
+ASSINATURAS = [
+    (b'%PDF-', 'application/pdf'),
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'GIF87a', 'image/gif'),
+    (b'GIF89a', 'image/gif'),
+]
+TIPOS_ACEITOS = sorted({tipo for _, tipo in ASSINATURAS} | {'image/webp'})
+
+def identificar_tipo(inicio):
+    if inicio[:4] == b'RIFF' and inicio[8:12] == b'WEBP': return 'image/webp'
+    for assinatura, tipo in ASSINATURAS:
+        if inicio.startswith(assinatura): return tipo
+    return None
+
+def listar_anexos(paciente_id):
+    return db.session.scalars(db.select(Anexo).where(Anexo.paciente_id == paciente_id)
+                              .order_by(Anexo.enviado_em.desc(), Anexo.id.desc())).all()
+
+class ArquivoRecebido:
+    """Destino de um arquivo do formulário (stream_factory do parser do Werkzeug).
+
+    Cada pedaço que chega é somado ao SHA-256 e gravado num arquivo temporário do armazém; passar do
+    tamanho máximo interrompe o upload com 413.
+    """
+    def __init__(self, diretorio, tamanho_maximo):
+        self.arquivo = tempfile.NamedTemporaryFile(dir=diretorio, prefix='upload-', delete=False)
+        self.hash = hashlib.sha256()
+        self.tamanho, self.tamanho_maximo = 0, tamanho_maximo
+        self.inicio = b''
+        self.tipo = None
+
+    def write(self, dados):
+        self.tamanho += len(dados)
+        if self.tamanho > self.tamanho_maximo: raise RequestEntityTooLarge()
+        if len(self.inicio) < 16: self.inicio += dados[:16 - len(self.inicio)]
+        self.hash.update(dados)
+        return self.arquivo.write(dados)
+
+    def seek(self, *args):
+        return self.arquivo.seek(*args)
+
+    def read(self, *args):
+        return self.arquivo.read(*args)
+
+    def descartar(self):
+        self.arquivo.close()
+        try:
+            os.unlink(self.arquivo.name)
+        except FileNotFoundError:
+            pass  # já foi movido para o armazém
+
+class ArmazemAnexos:
+    """Conteúdo dos anexos em disco: objetos/<hash[:2]>/<hash>, miniaturas/<hash[:2]>/<hash>-<lado>.jpg e tmp/.
+
+    O tmp fica no mesmo diretório para que mover um upload para o lugar definitivo seja um rename atômico.
+    """
+    def __init__(self, diretorio='anexos', tamanho_maximo=20 * 1024 * 1024, lado_miniatura=256):
+        self.diretorio, self.tamanho_maximo, self.lado_miniatura = diretorio, tamanho_maximo, lado_miniatura
+
+    def init_app(self, app):
+        self.diretorio = app.config['ANEXOS_DIRETORIO']
+        self.tamanho_maximo = app.config['ANEXOS_TAMANHO_MAXIMO_MB'] * 1024 * 1024
+        self.lado_miniatura = app.config['ANEXOS_LADO_MINIATURA']
+        for pasta in ('objetos', 'miniaturas', 'tmp'):
+            os.makedirs(os.path.join(self.diretorio, pasta), exist_ok=True)
+
+    def caminho(self, sha256):
+        return os.path.join(self.diretorio, 'objetos', sha256[:2], sha256)
+
+    def receber(self, paciente_id, enviado_por):
+        """Lê os arquivos do campo 'arquivos' da requisição atual e inclui os anexos na sessão (sem commit).
+
+        Devolve (anexos, erro); com erro nada é incluído. Chamar antes de qualquer acesso a request.form,
+        que leria o corpo da requisição do jeito padrão.
+        """
+        recebidos = []
+        def destino(total_content_length, content_type, filename, content_length=None):
+            recebidos.append(ArquivoRecebido(os.path.join(self.diretorio, 'tmp'), self.tamanho_maximo))
+            return recebidos[-1]
+        try:
+            _, _, arquivos = parse_form_data(request.environ, stream_factory=destino)
+            enviados = [arquivo for arquivo in arquivos.getlist('arquivos') if arquivo.filename and arquivo.stream.tamanho]
+            if not enviados: return [], 'Selecione ao menos um arquivo.'
+            for arquivo in enviados:
+                arquivo.stream.tipo = identificar_tipo(arquivo.stream.inicio)
+                if arquivo.stream.tipo is None: return [], f"O arquivo '{arquivo.filename}' não é um PDF nem uma imagem."
+            agora = datetime.now(pytz.timezone("America/Sao_Paulo"))
+            anexos = []
+            for arquivo in enviados:
+                recebido = arquivo.stream
+                sha256 = self._guardar(recebido)
+                anexos.append(Anexo(paciente_id=paciente_id, nome=arquivo.filename[:255], tipo=recebido.tipo, tamanho=recebido.tamanho,
+                                    sha256=sha256, enviado_em=agora, enviado_por=enviado_por))
+            db.session.add_all(anexos)
+            return anexos, None
+        except RequestEntityTooLarge:
+            return [], f"Cada arquivo pode ter no máximo {self.tamanho_maximo // (1024 * 1024)} MB."
+        finally:
+            for recebido in recebidos: recebido.descartar()
+
+    def _guardar(self, recebido):
+        recebido.arquivo.flush()
+        os.fsync(recebido.arquivo.fileno())
+        recebido.arquivo.close()
+        sha256 = recebido.hash.hexdigest()
+        destino = self.caminho(sha256)
+        if not os.path.exists(destino):
+            os.makedirs(os.path.dirname(destino), exist_ok=True)
+            os.replace(recebido.arquivo.name, destino)
+        return sha256
+
+    def miniatura(self, anexo):
+        """Caminho da miniatura JPEG de um anexo de imagem, gerada no primeiro pedido e guardada em disco; None se a imagem não abrir."""
+        destino = os.path.join(self.diretorio, 'miniaturas', anexo.sha256[:2], f"{anexo.sha256}-{self.lado_miniatura}.jpg")
+        if os.path.exists(destino): return destino
+        try:
+            with Image.open(self.caminho(anexo.sha256)) as imagem:
+                imagem.draft('RGB', (self.lado_miniatura, self.lado_miniatura))  # JPEG: já decodifica reduzida
+                miniatura = ImageOps.exif_transpose(imagem).convert('RGB')
+        except (OSError, Image.DecompressionBombError):
+            return None
+        miniatura.thumbnail((self.lado_miniatura, self.lado_miniatura))
+        os.makedirs(os.path.dirname(destino), exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=os.path.join(self.diretorio, 'tmp'), prefix='miniatura-', delete=False) as temporario:
+            miniatura.save(temporario, 'JPEG', quality=80)
+        os.replace(temporario.name, destino)
+        return destino
+
+    def resposta(self, anexo, miniatura=False):
+        """Envia o anexo (ou a miniatura) com suporte a Range e a GET condicional; o conteúdo de um anexo nunca muda."""
+        if miniatura:
+            if not anexo.imagem: abort(404)
+            caminho = self.miniatura(anexo)
+            if caminho is None: abort(404)
+            resposta = send_file(caminho, mimetype='image/jpeg', conditional=True, etag=f"{anexo.sha256}-{self.lado_miniatura}")
+        else:
+            if not os.path.exists(self.caminho(anexo.sha256)): abort(404)
+            resposta = send_file(self.caminho(anexo.sha256), mimetype=anexo.tipo, download_name=anexo.nome,
+                                 conditional=True, etag=anexo.sha256)
+        resposta.cache_control.no_cache = None
+        resposta.cache_control.public = False
+        resposta.cache_control.private = True
+        resposta.cache_control.max_age = 86400
+        resposta.headers['X-Content-Type-Options'] = 'nosniff'
+        return resposta
+
+armazem_anexos = ArmazemAnexos()
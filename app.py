@@ -1,215 +1,408 @@
 import os
-from flask import Flask, render_template, request, redirect, url_for, flash
-from datetime import date, datetime
+from flask import Flask, Blueprint, Response, current_app, render_template, request, redirect, url_for, flash, jsonify, abort, stream_with_context
+from datetime import date, datetime, timedelta
 from functools import wraps
+import click
+import hmac
+import json
 import pytz
-import re
-from markupsafe import Markup, escape
+import threading
+import time
+from collections import OrderedDict
+from markupsafe import Markup
 
 # Extensões
-from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
+from sqlalchemy.exc import IntegrityError
 from werkzeug.security import check_password_hash, generate_password_hash
 from flask_login import LoginManager, UserMixin, login_user, logout_user, login_required, current_user
 
-# --- Configuração Inicial ---
-app = Flask(__name__)
-app.config['SECRET_KEY'] = 'uma-chave-secreta-muito-segura-trocar-depois'
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-DB_NAME = 'hospital.db'
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + os.path.join(BASE_DIR, DB_NAME)
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-
-db = SQLAlchemy(app)
-migrate = Migrate(app, db)
-login_manager = LoginManager(app)
-login_manager.login_view = 'login'
-
-# --- Modelos de Banco de Dados ---
-class Usuario(UserMixin, db.Model):
-    __tablename__ = 'usuarios'
-    id = db.Column(db.Integer, primary_key=True)
-    nome_completo = db.Column(db.String(100), nullable=False)
-    email = db.Column(db.String(100), unique=True, nullable=False)
-    senha_hash = db.Column(db.String(200), nullable=False)
-    funcao = db.Column(db.String(20), nullable=False, default='fisioterapeuta')
-    status = db.Column(db.String(20), nullable=False, default='Ativo')
-    precisa_trocar_senha = db.Column(db.Boolean, nullable=False, default=False)
-
-class Paciente(db.Model):
-    __tablename__ = 'pacientes'
-    id = db.Column(db.Integer, primary_key=True)
-    nome = db.Column(db.String(100), nullable=False)
-    idade = db.Column(db.Integer, nullable=True)
-    leito = db.Column(db.String(20))
-    unidade = db.Column(db.String(50), nullable=False)
-    diagnostico = db.Column(db.Text)
-    status = db.Column(db.String(20), nullable=False, default='Ativo')
-    motivo_inativacao = db.Column(db.String(100))
-    data_nascimento = db.Column(db.String(10), nullable=False)
-    evolucoes = db.relationship('Evolucao', backref='paciente', lazy='dynamic', cascade="all, delete-orphan")
-    atendimentos = db.relationship('Atendimento', backref='paciente', lazy='dynamic', cascade="all, delete-orphan")
-
-    def to_dict(self):
-        """Converte o objeto Paciente num dicionário."""
-        return {
-            'id': self.id,
-            'nome': self.nome,
-            'idade': self.idade,
-            'leito': self.leito,
-            'unidade': self.unidade,
-            'diagnostico': self.diagnostico,
-            'data_nascimento': self.data_nascimento
-        }
-
-class Evolucao(db.Model):
-    __tablename__ = 'evolucoes'
-    id = db.Column(db.Integer, primary_key=True)
-    data = db.Column(db.DateTime, nullable=False)
-    fisio = db.Column(db.String(100), nullable=False)
-    texto = db.Column(db.Text, nullable=False)
-    paciente_id = db.Column(db.Integer, db.ForeignKey('pacientes.id'), nullable=False)
-
-class Atendimento(db.Model):
-    __tablename__ = 'atendimentos'
-    id = db.Column(db.Integer, primary_key=True)
-    data = db.Column(db.String(10), nullable=False)
-    turno_manha = db.Column(db.Boolean, nullable=False, default=False)
-    turno_tarde = db.Column(db.Boolean, nullable=False, default=False)
-    paciente_id = db.Column(db.Integer, db.ForeignKey('pacientes.id'), nullable=False)
-    __table_args__ = (db.UniqueConstraint('paciente_id', 'data', name='_paciente_data_uc'),)
+from config import Config
+from models import (db, Usuario, Paciente, Evolucao, Atendimento, Anexo, TURNOS, aplicar_pragmas_sqlite, incluir_no_autogenerate,
+                    registrar_atendimentos, buscar_evolucoes, evolucoes_do_usuario, decodificar_cursor, buscar_pacientes_inativos,
+                    recriar_indice_busca, texto_para_html)
+from relatorios import contabilizar_evolucao, atualizar_resumo_atendimentos, reconstruir_resumos, relatorio_produtividade
+from exportacao import COLUNAS_EXPORTACAO, FORMATOS, exportar
+from importacao import TAMANHO_LOTE, ler_censo, importar_censo
+from auditoria import escritor_auditoria, buscar_auditoria
+from metricas import metricas
+from cache_fragmentos import cache_fragmentos, html_evolucao, secoes_painel
+from cache_http import responder_condicional, versao_paciente, versoes_painel
+from painel_ao_vivo import barramento, anunciar_atendimentos, anunciar_painel, transmitir
+from leitos import censo, leito_ocupado, listar_unidades, validar_leito
+from anexos import armazem_anexos, listar_anexos, TIPOS_ACEITOS
+from arquivo_morto import ESQUEMA as ESQUEMA_ARQUIVO_MORTO, arquivo_morto
+from modelos_evolucao import (MODELOS_EVOLUCAO, CAMPOS_NUMERICOS, ler_dados, montar_texto, parametros_do_paciente, serie_temporal,
+                              pacientes_com_modelo)
+
+migrate = Migrate()
+login_manager = LoginManager()
+login_manager.login_view = 'main.login'
+
+main = Blueprint('main', __name__, cli_group=None)
+admin = Blueprint('admin', __name__, url_prefix='/admin')
+
+# --- Fábrica da Aplicação ---
+def create_app(config=None):
+    """Cria e configura a aplicação. `config` (um dicionário) sobrescreve os valores de Config."""
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    if config: app.config.update(config)
+    if ':memory:' not in app.config['SQLALCHEMY_DATABASE_URI']:
+        app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', {
+            'pool_size': app.config['DB_POOL_SIZE'],
+            'max_overflow': app.config['DB_MAX_OVERFLOW'],
+            'pool_timeout': app.config['DB_POOL_TIMEOUT'],
+        })
+
+    db.init_app(app)
+    with app.app_context():
+        aplicar_pragmas_sqlite(db.engine, app.config['SQLITE_PRAGMAS'])
+    migrate.init_app(app, db, include_object=incluir_no_autogenerate)
+    login_manager.init_app(app)
+    cache_usuarios.init_app(app)
+    escritor_auditoria.init_app(app)
+    metricas.init_app(app)
+    cache_fragmentos.init_app(app)
+    barramento.init_app(app)
+    armazem_anexos.init_app(app)
+    arquivo_morto.init_app(app)
+
+    app.register_blueprint(main)
+    app.register_blueprint(admin)
+    return app
 
 # --- Funções de Ajuda, Filtros e Hooks ---
-_paragraph_re = re.compile(r'(?:\r\n|\r|\n){2,}')
-
-@app.template_filter('nl2br')
+@main.app_template_filter('nl2br')
 def nl2br_filter(value: str):
-    if value is None: return ""
-    escaped_value = escape(value)
-    result = u'\n\n'.join(u'<p>%s</p>' % p.replace('\n', '<br>\n') for p in _paragraph_re.split(escaped_value))
-    return Markup(result)
+    return Markup(texto_para_html(value))
+
+@main.app_template_filter('tamanho_arquivo')
+def tamanho_arquivo_filter(tamanho: int):
+    if tamanho < 1024 * 1024: return f"{max(tamanho / 1024, 0.1):.1f} KB".replace('.', ',')
+    return f"{tamanho / (1024 * 1024):.1f} MB".replace('.', ',')
 
-def calcular_idade(data_nascimento_str):
-    if not data_nascimento_str: return None
+main.add_app_template_global(html_evolucao, 'html_evolucao')
+main.add_app_template_global(listar_unidades, 'listar_unidades')
+
+def ler_data_br(data_str):
+    """Converte uma data digitada no formato DD/MM/AAAA; retorna None se for inválida."""
     try:
-        hoje = date.today()
-        nascimento = datetime.strptime(data_nascimento_str, '%d/%m/%Y').date()
-        return hoje.year - nascimento.year - ((hoje.month, hoje.day) < (nascimento.month, nascimento.day))
-    except (ValueError, TypeError):
+        return datetime.strptime(data_str.strip(), '%d/%m/%Y').date()
+    except (ValueError, TypeError, AttributeError):
         return None
 
+# --- Cache de Usuários Logados ---
+class UsuarioSessao(UserMixin):
+    """Cópia leve (sem o hash da senha) dos dados do usuário logado, usada como current_user."""
+    def __init__(self, usuario):
+        self.id = usuario.id
+        self.nome_completo = usuario.nome_completo
+        self.email = usuario.email
+        self.funcao = usuario.funcao
+        self.status = usuario.status
+        self.precisa_trocar_senha = usuario.precisa_trocar_senha
+
+class CacheUsuarios:
+    """Cache LRU com validade para o user_loader, evitando uma consulta ao banco a cada requisição.
+
+    O cache é por processo: as rotas que alteram um usuário chamam invalidar() no próprio processo,
+    e nos demais workers a validade limita por quanto tempo um dado antigo pode ser visto.
+    """
+    def __init__(self, tamanho_maximo=256, validade=60):
+        self.tamanho_maximo, self.validade = tamanho_maximo, validade
+        self._itens = OrderedDict()
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.tamanho_maximo = app.config['CACHE_USUARIOS_TAMANHO']
+        self.validade = app.config['CACHE_USUARIOS_VALIDADE']
+
+    def obter(self, usuario_id):
+        with self._lock:
+            item = self._itens.get(usuario_id)
+            if item is None: return None
+            expira_em, usuario = item
+            if expira_em < time.monotonic():
+                del self._itens[usuario_id]; return None
+            self._itens.move_to_end(usuario_id)
+            return usuario
+
+    def guardar(self, usuario_id, usuario):
+        with self._lock:
+            self._itens[usuario_id] = (time.monotonic() + self.validade, usuario)
+            self._itens.move_to_end(usuario_id)
+            while len(self._itens) > self.tamanho_maximo:
+                self._itens.popitem(last=False)
+
+    def invalidar(self, usuario_id):
+        with self._lock:
+            self._itens.pop(usuario_id, None)
+
+cache_usuarios = CacheUsuarios()
+
 @login_manager.user_loader
 def load_user(user_id):
-    return db.session.get(Usuario, int(user_id))
+    usuario_id = int(user_id)
+    usuario_sessao = cache_usuarios.obter(usuario_id)
+    if usuario_sessao is None:
+        usuario = db.session.get(Usuario, usuario_id)
+        if usuario is None: return None
+        usuario_sessao = UsuarioSessao(usuario)
+        cache_usuarios.guardar(usuario_id, usuario_sessao)
+    return usuario_sessao
 
 def admin_required(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
         if not current_user.is_authenticated or current_user.funcao != 'admin':
-            flash('Acesso negado.', 'error'); return redirect(url_for('painel_diario'))
+            flash('Acesso negado.', 'error'); return redirect(url_for('main.painel_diario'))
         return f(*args, **kwargs)
     return decorated_function
 
-@app.before_request
+@main.before_app_request
 def check_force_password_change():
-    if current_user.is_authenticated and request.endpoint not in ['logout', 'alterar_senha', 'static']:
+    # Testa o endpoint antes de tocar em current_user, para que arquivos estáticos nem carreguem o usuário
+    if request.endpoint not in ['main.logout', 'main.alterar_senha', 'main.saude', 'main.metrics', 'static'] and current_user.is_authenticated:
         if getattr(current_user, 'precisa_trocar_senha', False):
-            flash('Por segurança, você precisa definir uma nova senha.', 'warning'); return redirect(url_for('alterar_senha'))
+            flash('Por segurança, você precisa definir uma nova senha.', 'warning'); return redirect(url_for('main.alterar_senha'))
 
 # --- Rotas Principais ---
-@app.route('/login', methods=['GET', 'POST'])
+@main.route('/login', methods=['GET', 'POST'])
 def login():
     if request.method == 'POST':
         usuario = Usuario.query.filter_by(email=request.form['email'], status='Ativo').first()
         if usuario and check_password_hash(usuario.senha_hash, request.form['senha']):
-            login_user(usuario); return redirect(url_for('painel_diario'))
+            login_user(usuario); return redirect(url_for('main.painel_diario'))
         else:
             flash('Email ou senha inválidos, ou usuário inativo.', 'error')
     return render_template('login.html')
 
-@app.route('/logout')
+@main.route('/saude')
+def saude():
+    # Verificação de saúde para o balanceador/orquestrador: sem login e com uma consulta mínima ao banco
+    try:
+        db.session.execute(db.text('SELECT 1'))
+    except Exception:
+        return jsonify(status='erro', banco='indisponível'), 503
+    return jsonify(status='ok')
+
+@main.route('/metrics')
+def metrics():
+    # Formato de texto do Prometheus; acesso com o token de METRICAS_TOKEN ou por um administrador logado
+    if not metricas.ativo: abort(404)
+    token = current_app.config['METRICAS_TOKEN']
+    autorizacao = request.headers.get('Authorization', '')
+    if not (token and hmac.compare_digest(autorizacao, f"Bearer {token}")):
+        if not current_user.is_authenticated or current_user.funcao != 'admin': abort(403)
+    return Response(metricas.texto_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+@main.route('/logout')
 @login_required
 def logout():
-    logout_user(); return redirect(url_for('login'))
+    logout_user(); return redirect(url_for('main.login'))
 
-@app.route('/alterar-senha', methods=['GET', 'POST'])
+@main.route('/alterar-senha', methods=['GET', 'POST'])
 @login_required
 def alterar_senha():
     if request.method == 'POST':
         senha_atual, nova_senha, confirmacao = request.form['senha_atual'], request.form['nova_senha'], request.form['confirmacao_senha']
-        if not check_password_hash(current_user.senha_hash, senha_atual):
+        usuario = db.session.get(Usuario, current_user.id)
+        if not check_password_hash(usuario.senha_hash, senha_atual):
             flash('Sua senha atual está incorreta.', 'error')
         elif nova_senha != confirmacao:
             flash('A nova senha e a confirmação não correspondem.', 'error')
         else:
-            usuario = db.session.get(Usuario, current_user.id)
             usuario.senha_hash = generate_password_hash(nova_senha)
             usuario.precisa_trocar_senha = False
-            db.session.commit()
+            db.session.commit(); cache_usuarios.invalidar(usuario.id)
             flash('Sua senha foi alterada com sucesso!', 'success')
-            return redirect(url_for('painel_diario'))
+            return redirect(url_for('main.painel_diario'))
     return render_template('alterar_senha.html')
 
-@app.route('/')
+@main.route('/')
 @login_required
 def painel_diario():
-    hoje_str = date.today().strftime('%d/%m/%Y')
-    pacientes_ativos = Paciente.query.filter_by(status='Ativo').order_by(Paciente.unidade, Paciente.leito).all()
-    painel = {}
-    for p in pacientes_ativos:
-        unidade = p.unidade
-        if unidade not in painel: painel[unidade] = []
-        atendimento_hoje = Atendimento.query.filter_by(paciente_id=p.id, data=date.today().isoformat()).first()
-        p.atendimentos_hoje = {'manha': atendimento_hoje.turno_manha if atendimento_hoje else False, 'tarde': atendimento_hoje.turno_tarde if atendimento_hoje else False}
-        painel[unidade].append(p)
-    return render_template('painel_diario.html', pacientes_por_unidade=painel, hoje=hoje_str)
-
-@app.route('/arquivo')
+    hoje = date.today()
+    versoes = versoes_painel()
+    return responder_condicional(
+        [(unidade, versao) for unidade, versao, _ in versoes], max((alterado_em for *_, alterado_em in versoes), default=0),
+        lambda: render_template('painel_diario.html', secoes=secoes_painel(hoje, versoes), hoje=hoje.strftime('%d/%m/%Y')))
+
+@main.route('/painel/eventos')
+@login_required
+def eventos_painel():
+    # Fluxo do painel ao vivo (Server-Sent Events); `versoes` traz as versões das seções que o painel já mostra
+    try:
+        versoes = json.loads(request.args.get('versoes') or '{}')
+    except ValueError:
+        abort(400)
+    if not isinstance(versoes, dict) or not all(isinstance(versao, int) for versao in versoes.values()): abort(400)
+    fila = barramento.assinar()
+    if fila is None:
+        return Response('Limite de painéis ao vivo atingido neste servidor.', status=503, headers={'Retry-After': str(barramento.espera)})
+    resposta = Response(stream_with_context(transmitir(fila, versoes)), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    # call_on_close roda mesmo se o fluxo nunca chegar a ser lido
+    resposta.call_on_close(lambda: barramento.cancelar(fila))
+    return resposta
+
+@main.route('/arquivo')
 @login_required
 def arquivo():
     termo_busca = request.args.get('busca', '')
+    incluir_evolucoes = request.args.get('evolucoes') == '1'
     pacientes_inativos = []
     if termo_busca:
-        termo_like = f"%{termo_busca}%"
-        pacientes_inativos = Paciente.query.filter(Paciente.status == 'Inativo', Paciente.nome.like(termo_like)).all()
-    return render_template('arquivo.html', pacientes=pacientes_inativos, busca=termo_busca)
+        pacientes_inativos = buscar_pacientes_inativos(termo_busca, incluir_evolucoes,
+                                                       arquivo_morto=ESQUEMA_ARQUIVO_MORTO if arquivo_morto.ativo else None)
+    return render_template('arquivo.html', pacientes=pacientes_inativos, busca=termo_busca, incluir_evolucoes=incluir_evolucoes)
+
+@main.route('/minhas-evolucoes')
+@login_required
+def minhas_evolucoes():
+    # Pacientes e evoluções do usuário logado no dia (hoje, no horário de Brasília, ou ?data=DD/MM/AAAA)
+    hoje = datetime.now(pytz.timezone("America/Sao_Paulo")).date()
+    dia = ler_data_br(request.args['data']) if request.args.get('data') else hoje
+    if dia is None or dia > hoje:
+        flash('Data inválida.', 'error'); return redirect(url_for('main.minhas_evolucoes'))
+    pacientes = evolucoes_do_usuario(current_user.id, dia)
+    return render_template('minhas_evolucoes.html', pacientes=pacientes, total=sum(len(evolucoes) for _, evolucoes in pacientes),
+                           dia=dia, hoje=hoje, anterior=dia - timedelta(days=1), seguinte=dia + timedelta(days=1))
 
 # --- Rotas de Pacientes ---
-@app.route('/paciente/<int:paciente_id>')
+@main.route('/paciente/<int:paciente_id>')
 @login_required
 def detalhes_paciente(paciente_id):
+    versao = versao_paciente(paciente_id)
+    arquivado_em = arquivo_morto.arquivado_em(paciente_id) if versao is None else None
+    if versao is None and arquivado_em is None: abort(404)
+    def renderizar():
+        # Um paciente do arquivo morto é lido de lá, só para consulta
+        with arquivo_morto.lendo(arquivado_em):
+            paciente = db.get_or_404(Paciente, paciente_id)
+            evolucoes, proximo_cursor = buscar_evolucoes(paciente.id)
+            return render_template('paciente.html', paciente=paciente, evolucoes=evolucoes, proximo_cursor=proximo_cursor,
+                                   anexos=listar_anexos(paciente.id), tipos_anexos=','.join(TIPOS_ACEITOS),
+                                   modelos_evolucao=MODELOS_EVOLUCAO, parametros=parametros_do_paciente(paciente.id),
+                                   arquivado_em=arquivado_em and datetime.fromtimestamp(arquivado_em))
+    if arquivado_em is not None:
+        # O arquivo não muda enquanto o paciente está lá
+        return responder_condicional(('arquivo_morto', paciente_id, arquivado_em), arquivado_em, renderizar)
+    return responder_condicional(('paciente', paciente_id, versao.versao), versao.alterado_em, renderizar)
+
+@main.route('/paciente/<int:paciente_id>/evolucoes')
+@login_required
+def historico_evolucoes(paciente_id):
+    # Páginas seguintes do histórico, pedidas pelo botão "Carregar anteriores"
+    cursor = decodificar_cursor(request.args.get('antes', ''))
+    if cursor is None: abort(400)
+    evolucoes, proximo_cursor = buscar_evolucoes(paciente_id, cursor)
+    if not evolucoes and arquivo_morto.arquivado_em(paciente_id) is not None:
+        with arquivo_morto.lendo():
+            evolucoes, proximo_cursor = buscar_evolucoes(paciente_id, cursor)
+    html = render_template('_evolucoes.html', evolucoes=evolucoes)
+    return jsonify(html=html, proximo=proximo_cursor)
+
+@main.route('/paciente/<int:paciente_id>/series')
+@login_required
+def serie_paciente(paciente_id):
+    # Série de um parâmetro numérico dos modelos de evolução, para o gráfico de tendências
+    parametro = request.args.get('parametro', '')
+    if parametro not in CAMPOS_NUMERICOS: abort(400)
+    dias = min(max(request.args.get('dias', 7, type=int), 1), 90)
+    _, campo = CAMPOS_NUMERICOS[parametro]
+    pontos = serie_temporal(paciente_id, parametro, dias)
+    if not pontos and arquivo_morto.arquivado_em(paciente_id) is not None:
+        with arquivo_morto.lendo():
+            pontos = serie_temporal(paciente_id, parametro, dias)
+    return jsonify(parametro=parametro, rotulo=campo['rotulo'], unidade=campo.get('unidade', ''), dias=dias, pontos=pontos)
+
+@main.route('/evolucoes/modelos/<modelo>/pacientes')
+@login_required
+def pacientes_por_modelo(modelo):
+    # Pacientes ativos com evolução recente de um modelo (ex.: ventilados da UTI: ventilacao_mecanica?unidade=UTI)
+    if modelo not in MODELOS_EVOLUCAO: abort(404)
+    horas = min(max(request.args.get('horas', 24, type=int), 1), 24 * 30)
+    return jsonify(modelo=modelo, horas=horas, pacientes=pacientes_com_modelo(modelo, request.args.get('unidade'), horas))
+
+@main.route('/paciente/<int:paciente_id>/anexos', methods=['POST'])
+@login_required
+def enviar_anexos(paciente_id):
     paciente = db.get_or_404(Paciente, paciente_id)
-    evolucoes = paciente.evolucoes.order_by(Evolucao.data.desc()).all()
-    return render_template('paciente.html', paciente=paciente, evolucoes=evolucoes)
+    anexos, erro = armazem_anexos.receber(paciente.id, current_user.nome_completo)
+    if erro:
+        flash(erro, 'error')
+    else:
+        db.session.commit()
+        flash('Arquivo anexado com sucesso.' if len(anexos) == 1 else f"{len(anexos)} arquivos anexados com sucesso.", 'success')
+    return redirect(url_for('main.detalhes_paciente', paciente_id=paciente.id))
+
+def obter_anexo(anexo_id):
+    # Os anexos dos pacientes do arquivo morto continuam acessíveis
+    anexo = db.session.get(Anexo, anexo_id) or arquivo_morto.obter(Anexo, anexo_id)
+    if anexo is None: abort(404)
+    return anexo
+
+@main.route('/anexos/<int:anexo_id>')
+@login_required
+def baixar_anexo(anexo_id):
+    return armazem_anexos.resposta(obter_anexo(anexo_id))
+
+@main.route('/anexos/<int:anexo_id>/miniatura')
+@login_required
+def miniatura_anexo(anexo_id):
+    return armazem_anexos.resposta(obter_anexo(anexo_id), miniatura=True)
+
+@main.route('/censo')
+@login_required
+def censo_leitos():
+    # Ocupação dos leitos por unidade; usado também pelo seletor de leitos livres dos formulários
+    return jsonify(unidades=censo(request.args.get('unidade'), request.args.get('paciente', type=int)))
 
-@app.route('/paciente/adicionar', methods=['GET', 'POST'])
+@main.route('/paciente/adicionar', methods=['GET', 'POST'])
 @login_required
 def adicionar_paciente():
     if request.method == 'POST':
         # Esta é a lógica de salvar que estava em salvar_paciente
         nome, data_nasc, unidade, leito, diagnostico = request.form['nome'], request.form['data_nascimento'], request.form['unidade'], request.form['leito'], request.form['diagnostico']
         if not data_nasc:
-            flash('A data de nascimento é um campo obrigatório.', 'error'); return redirect(url_for('adicionar_paciente'))
-        idade_calculada = calcular_idade(data_nasc)
-        leito_ocupado = Paciente.query.filter_by(unidade=unidade, leito=leito, status='Ativo').first()
-        if leito_ocupado:
-            flash(f"Erro: O leito {leito} na {unidade} já está ocupado.", 'error'); return redirect(url_for('adicionar_paciente'))
-        
-        paciente_existente = Paciente.query.filter_by(nome=nome, data_nascimento=data_nasc).first()
+            flash('A data de nascimento é um campo obrigatório.', 'error'); return redirect(url_for('main.adicionar_paciente'))
+        nascimento = ler_data_br(data_nasc)
+        if not nascimento:
+            flash('Data de nascimento inválida. Use o formato DD/MM/AAAA.', 'error'); return redirect(url_for('main.adicionar_paciente'))
+        erro_leito = validar_leito(unidade, leito)
+        if erro_leito:
+            flash(erro_leito, 'error'); return redirect(url_for('main.adicionar_paciente'))
+        paciente_existente = Paciente.query.filter_by(nome=nome, data_nascimento=nascimento).first()
+        arquivados = arquivo_morto.buscar({(nome, nascimento)}) if paciente_existente is None else []
+        if arquivados:
+            # Volta do arquivo morto com todo o histórico; se o commit abaixo falhar, continua arquivado
+            arquivo_morto.restaurar(arquivados[:1])
+            paciente_existente = Paciente.query.filter_by(nome=nome, data_nascimento=nascimento).first()
         if paciente_existente and paciente_existente.status == 'Inativo':
-            paciente_existente.status = 'Ativo'; paciente_existente.motivo_inativacao = None; paciente_existente.idade = idade_calculada
+            paciente_existente.status = 'Ativo'; paciente_existente.motivo_inativacao = None; paciente_existente.inativado_em = None
             paciente_existente.leito = leito; paciente_existente.unidade = unidade; paciente_existente.diagnostico = diagnostico
-            flash(f"Paciente '{nome}' foi REATIVADO com sucesso.", 'success')
+            mensagem = f"Paciente '{nome}' foi REATIVADO com sucesso."
         elif paciente_existente:
-            flash(f"Erro: Paciente '{nome}' (nascido em {data_nasc}) já está ATIVO.", 'error')
+            flash(f"Erro: Paciente '{nome}' (nascido em {data_nasc}) já está ATIVO.", 'error'); return redirect(url_for('main.painel_diario'))
         else:
-            novo_paciente = Paciente(nome=nome, idade=idade_calculada, leito=leito, unidade=unidade, diagnostico=diagnostico, data_nascimento=data_nasc)
-            db.session.add(novo_paciente); flash(f"Paciente '{nome}' cadastrado com sucesso!", 'success')
-        db.session.commit(); return redirect(url_for('painel_diario'))
+            novo_paciente = Paciente(nome=nome, leito=leito, unidade=unidade, diagnostico=diagnostico, data_nascimento=nascimento)
+            db.session.add(novo_paciente); mensagem = f"Paciente '{nome}' cadastrado com sucesso!"
+        anunciar_painel()
+        # O índice único parcial uq_pacientes_leito_ativo garante que o leito está livre
+        try:
+            db.session.commit()
+        except IntegrityError as erro:
+            if not leito_ocupado(erro): raise
+            db.session.rollback()
+            flash(f"Erro: O leito {leito} na {unidade} já está ocupado.", 'error'); return redirect(url_for('main.adicionar_paciente'))
+        flash(mensagem, 'success')
+        return redirect(url_for('main.painel_diario'))
 
     return render_template('form_paciente.html', paciente=None)
 
-@app.route('/paciente/editar/<int:paciente_id>', methods=['GET', 'POST'])
+@main.route('/paciente/editar/<int:paciente_id>', methods=['GET', 'POST'])
 @login_required
 def editar_paciente(paciente_id):
     paciente = db.get_or_404(Paciente, paciente_id)
@@ -217,72 +410,134 @@ def editar_paciente(paciente_id):
         data_nasc = request.form['data_nascimento']
         if not data_nasc:
             flash('A data de nascimento é um campo obrigatório.', 'error'); return render_template('form_paciente.html', paciente=paciente)
-        paciente.nome = request.form['nome']; paciente.idade = calcular_idade(data_nasc)
+        nascimento = ler_data_br(data_nasc)
+        if not nascimento:
+            flash('Data de nascimento inválida. Use o formato DD/MM/AAAA.', 'error'); return render_template('form_paciente.html', paciente=paciente)
+        # Leitos antigos fora do mapa continuam valendo enquanto o paciente não muda de leito
+        if (request.form['unidade'], request.form['leito']) != (paciente.unidade, paciente.leito):
+            erro_leito = validar_leito(request.form['unidade'], request.form['leito'])
+            if erro_leito:
+                flash(erro_leito, 'error'); return render_template('form_paciente.html', paciente=paciente)
+        paciente.nome = request.form['nome']
         paciente.leito = request.form['leito']; paciente.unidade = request.form['unidade']
-        paciente.diagnostico = request.form['diagnostico']; paciente.data_nascimento = data_nasc
-        db.session.commit(); flash('Dados do paciente atualizados com sucesso!', 'success')
-        return redirect(url_for('detalhes_paciente', paciente_id=paciente.id))
+        paciente.diagnostico = request.form['diagnostico']; paciente.data_nascimento = nascimento
+        anunciar_painel()
+        try:
+            db.session.commit()
+        except IntegrityError as erro:
+            if not leito_ocupado(erro): raise
+            db.session.rollback()
+            flash(f"Erro: O leito {request.form['leito']} na {request.form['unidade']} já está ocupado.", 'error'); return redirect(url_for('main.editar_paciente', paciente_id=paciente_id))
+        flash('Dados do paciente atualizados com sucesso!', 'success')
+        return redirect(url_for('main.detalhes_paciente', paciente_id=paciente.id))
     return render_template('form_paciente.html', paciente=paciente)
 
-@app.route('/paciente/evoluir/<int:paciente_id>', methods=['POST'])
+@main.route('/paciente/evoluir/<int:paciente_id>', methods=['POST'])
 @login_required
 def adicionar_evolucao(paciente_id):
     paciente = db.get_or_404(Paciente, paciente_id)
+    texto, modelo, dados = request.form['evolucao'], request.form.get('modelo') or None, None
+    if modelo:
+        dados, erro = ler_dados(modelo, request.form)
+        if erro:
+            flash(erro, 'error'); return redirect(url_for('main.detalhes_paciente', paciente_id=paciente_id))
+        texto = montar_texto(modelo, dados, texto)
+    elif not texto.strip():
+        flash('Escreva a evolução ou escolha um modelo.', 'error'); return redirect(url_for('main.detalhes_paciente', paciente_id=paciente_id))
     hora_correta = datetime.now(pytz.timezone("America/Sao_Paulo"))
-    nova_evolucao = Evolucao(data=hora_correta, fisio=current_user.nome_completo, texto=request.form['evolucao'], paciente_id=paciente.id)
+    nova_evolucao = Evolucao(data=hora_correta, fisio=current_user.nome_completo, usuario_id=current_user.id, texto=texto, modelo=modelo,
+                             dados=dados, paciente_id=paciente.id)
     db.session.add(nova_evolucao)
     
-    hoje_str, turno = date.today().isoformat(), request.form['turno_atendimento']
-    atendimento = Atendimento.query.filter_by(paciente_id=paciente_id, data=hoje_str).first()
+    hoje, turno = date.today(), request.form['turno_atendimento']
+    atendimento = Atendimento.query.filter_by(paciente_id=paciente_id, data=hoje).first()
     if not atendimento:
-        atendimento = Atendimento(paciente_id=paciente_id, data=hoje_str)
+        atendimento = Atendimento(paciente_id=paciente_id, data=hoje)
         db.session.add(atendimento)
+    marcou = not (atendimento.turno_manha if turno == 'manha' else atendimento.turno_tarde)
     if turno == 'manha': atendimento.turno_manha = True
     else: atendimento.turno_tarde = True
+    # Os resumos dos relatórios são atualizados na mesma transação
+    contabilizar_evolucao(nova_evolucao, paciente.unidade, current_user.id); atualizar_resumo_atendimentos(hoje)
+    if marcou: anunciar_atendimentos({(paciente_id, 'manha' if turno == 'manha' else 'tarde'): True})
+    db.session.commit()
+    return redirect(url_for('main.detalhes_paciente', paciente_id=paciente_id))
+
+@main.route('/atendimentos', methods=['POST'])
+@login_required
+def marcar_atendimentos():
+    # Recebe do painel um lote {"alteracoes": [{"paciente_id": 1, "turno": "manha", "valor": true}, ...]}
+    dados = request.get_json(silent=True) or {}
+    if not isinstance(dados, dict) or not isinstance(dados.get('alteracoes', []), list):
+        return jsonify(erro='Formato inválido.'), 400
+    alteracoes = {}
+    for item in dados.get('alteracoes', []):
+        if not isinstance(item, dict): return jsonify(erro='Formato inválido.'), 400
+        paciente_id, turno, valor = item.get('paciente_id'), item.get('turno'), item.get('valor')
+        if not isinstance(paciente_id, int) or isinstance(paciente_id, bool) or turno not in TURNOS or not isinstance(valor, bool):
+            return jsonify(erro='Formato inválido.'), 400
+        alteracoes[(paciente_id, turno)] = valor  # se o mesmo turno vier repetido, vale o último
+    if not alteracoes: return jsonify(erro='Nenhuma alteração enviada.'), 400
+
+    ids = {paciente_id for paciente_id, _ in alteracoes}
+    ativos = set(db.session.scalars(db.select(Paciente.id).where(Paciente.id.in_(ids), Paciente.status == 'Ativo')))
+    if ids - ativos:
+        return jsonify(erro='Paciente não encontrado ou inativo.', pacientes=sorted(ids - ativos)), 400
+    registrar_atendimentos(alteracoes)
+    atualizar_resumo_atendimentos(date.today())
+    anunciar_atendimentos(alteracoes)
     db.session.commit()
-    return redirect(url_for('detalhes_paciente', paciente_id=paciente_id))
+    return jsonify(ok=True, atualizados=len(alteracoes))
 
-@app.route('/paciente/transferir/<int:paciente_id>', methods=['POST'])
+@main.route('/paciente/transferir/<int:paciente_id>', methods=['POST'])
 @login_required
 def mudar_unidade(paciente_id):
     paciente = db.get_or_404(Paciente, paciente_id)
-    nova_unidade = request.form['unidade']
-    leito_ocupado = Paciente.query.filter(Paciente.unidade == nova_unidade, Paciente.leito == paciente.leito, Paciente.status == 'Ativo').first()
-    if leito_ocupado:
-        flash(f"Erro ao transferir: O leito {paciente.leito} na {nova_unidade} já está ocupado.", 'error')
-    else:
-        paciente.unidade = nova_unidade; db.session.commit(); flash('Paciente transferido com sucesso!', 'success')
-    return redirect(url_for('detalhes_paciente', paciente_id=paciente_id))
-
-@app.route('/paciente/inativar/<int:paciente_id>', methods=['POST'])
+    nova_unidade, novo_leito = request.form['unidade'], request.form.get('leito') or paciente.leito
+    erro_leito = validar_leito(nova_unidade, novo_leito)
+    if erro_leito:
+        flash(f"Erro ao transferir: {erro_leito}", 'error'); return redirect(url_for('main.detalhes_paciente', paciente_id=paciente_id))
+    paciente.unidade, paciente.leito = nova_unidade, novo_leito
+    anunciar_painel()
+    try:
+        atualizar_resumo_atendimentos(date.today())  # o autoflush já grava a nova unidade e pode violar o índice do leito
+        db.session.commit(); flash('Paciente transferido com sucesso!', 'success')
+    except IntegrityError as erro:
+        if not leito_ocupado(erro): raise
+        db.session.rollback()
+        flash(f"Erro ao transferir: O leito {novo_leito} na {nova_unidade} já está ocupado.", 'error')
+    return redirect(url_for('main.detalhes_paciente', paciente_id=paciente_id))
+
+@main.route('/paciente/inativar/<int:paciente_id>', methods=['POST'])
 @login_required
 def inativar_paciente(paciente_id):
     paciente = db.get_or_404(Paciente, paciente_id)
-    paciente.status = 'Inativo'; paciente.motivo_inativacao = request.form['motivo']
+    paciente.status = 'Inativo'; paciente.motivo_inativacao = request.form['motivo']; paciente.inativado_em = date.today()
+    anunciar_painel()
     db.session.commit(); flash('Paciente inativado com sucesso.', 'success')
-    return redirect(url_for('painel_diario'))
+    return redirect(url_for('main.painel_diario'))
 
 # --- ROTAS DA ÁREA DO ADMINISTRADOR ---
-@app.route('/admin/usuarios')
+@admin.route('/usuarios')
 @login_required
 @admin_required
 def lista_usuarios():
     usuarios = Usuario.query.order_by(Usuario.nome_completo).all()
     return render_template('admin/lista_usuarios.html', usuarios=usuarios)
 
-@app.route('/admin/usuarios/novo', methods=['GET', 'POST'])
+@admin.route('/usuarios/novo', methods=['GET', 'POST'])
 @login_required
 @admin_required
 def criar_usuario():
     if request.method == 'POST':
         nome, email, senha, funcao = request.form['nome_completo'], request.form['email'], request.form['senha'], request.form['funcao']
         if Usuario.query.filter_by(email=email).first():
-            flash('Este email já está cadastrado.', 'error'); return redirect(url_for('criar_usuario'))
+            flash('Este email já está cadastrado.', 'error'); return redirect(url_for('admin.criar_usuario'))
         novo_usuario = Usuario(nome_completo=nome, email=email, senha_hash=generate_password_hash(senha), funcao=funcao, precisa_trocar_senha=True)
-        db.session.add(novo_usuario); db.session.commit(); flash('Usuário criado com sucesso!', 'success'); return redirect(url_for('lista_usuarios'))
+        db.session.add(novo_usuario); db.session.commit(); flash('Usuário criado com sucesso!', 'success'); return redirect(url_for('admin.lista_usuarios'))
     return render_template('admin/form_usuario.html', usuario=None)
 
-@app.route('/admin/usuarios/editar/<int:usuario_id>', methods=['GET', 'POST'])
+@admin.route('/usuarios/editar/<int:usuario_id>', methods=['GET', 'POST'])
 @login_required
 @admin_required
 def editar_usuario_admin(usuario_id):
@@ -306,36 +561,38 @@ def editar_usuario_admin(usuario_id):
         usuario.funcao = request.form['funcao']
         
         db.session.commit()
+        cache_usuarios.invalidar(usuario.id)
         flash('Usuário atualizado com sucesso!', 'success')
-        return redirect(url_for('lista_usuarios'))
+        return redirect(url_for('admin.lista_usuarios'))
     
     # Para requisições GET, apenas mostra o formulário pré-preenchido
     return render_template('admin/form_usuario.html', usuario=usuario)
 
-@app.route('/admin/usuarios/inativar/<int:usuario_id>', methods=['POST'])
+@admin.route('/usuarios/inativar/<int:usuario_id>', methods=['POST'])
 @login_required
 @admin_required
 def inativar_usuario_admin(usuario_id):
     if usuario_id == current_user.id:
         flash('Você não pode inativar a si mesmo.', 'error')
-        return redirect(url_for('lista_usuarios'))
+        return redirect(url_for('admin.lista_usuarios'))
 
     usuario = db.session.get(Usuario, usuario_id)
     if usuario:
         usuario.status = 'Inativo'
         db.session.commit()
+        cache_usuarios.invalidar(usuario.id)
         flash('Usuário inativado com sucesso.', 'success')
-    return redirect(url_for('lista_usuarios'))
+    return redirect(url_for('admin.lista_usuarios'))
 
-@app.route('/admin/usuarios/reativar/<int:usuario_id>', methods=['POST'])
+@admin.route('/usuarios/reativar/<int:usuario_id>', methods=['POST'])
 @login_required
 @admin_required
 def reativar_usuario_admin(usuario_id):
     usuario = db.session.get(Usuario, usuario_id)
-    if usuario: usuario.status = 'Ativo'; db.session.commit(); flash('Usuário reativado com sucesso.', 'success')
-    return redirect(url_for('lista_usuarios'))
+    if usuario: usuario.status = 'Ativo'; db.session.commit(); cache_usuarios.invalidar(usuario.id); flash('Usuário reativado com sucesso.', 'success')
+    return redirect(url_for('admin.lista_usuarios'))
 
-@app.route('/admin/usuarios/resetar_senha/<int:usuario_id>', methods=['GET', 'POST'])
+@admin.route('/usuarios/resetar_senha/<int:usuario_id>', methods=['GET', 'POST'])
 @login_required
 @admin_required
 def resetar_senha_admin(usuario_id):
@@ -344,16 +601,135 @@ def resetar_senha_admin(usuario_id):
         nova_senha = request.form['nova_senha']
         if not nova_senha: flash('A senha provisória não pode estar em branco.', 'error'); return render_template('admin/reset_senha_form.html', usuario=usuario)
         usuario.senha_hash = generate_password_hash(nova_senha); usuario.precisa_trocar_senha = True
-        db.session.commit(); flash(f"Senha para '{usuario.nome_completo}' foi resetada com sucesso!", 'success'); return redirect(url_for('lista_usuarios'))
+        db.session.commit(); cache_usuarios.invalidar(usuario.id); flash(f"Senha para '{usuario.nome_completo}' foi resetada com sucesso!", 'success'); return redirect(url_for('admin.lista_usuarios'))
     return render_template('admin/reset_senha_form.html', usuario=usuario)
 
+@admin.route('/relatorios')
+@login_required
+@admin_required
+def relatorios():
+    fim = ler_data_br(request.args.get('fim', '')) or date.today()
+    inicio = ler_data_br(request.args.get('inicio', '')) or fim - timedelta(days=29)
+    if inicio > fim: inicio, fim = fim, inicio
+    relatorio = relatorio_produtividade(inicio, fim)
+    return render_template('admin/relatorios.html', relatorio=relatorio, inicio=inicio, fim=fim, entidades=COLUNAS_EXPORTACAO, formatos=FORMATOS)
+
+@admin.route('/auditoria')
+@login_required
+@admin_required
+def auditoria():
+    tabela, registro_id = request.args.get('tabela') or None, request.args.get('registro_id', type=int)
+    registros = buscar_auditoria(tabela, registro_id)
+    return render_template('admin/auditoria.html', registros=registros, tabela=tabela, registro_id=registro_id)
+
+@admin.route('/metricas')
+@login_required
+@admin_required
+def painel_metricas():
+    return render_template('admin/metricas.html', metricas=metricas, endpoints=metricas.por_endpoint(), lentas=metricas.consultas_lentas(),
+                           ocorrencias_n_mais_1=list(reversed(metricas.ocorrencias_n_mais_1)))
+
+@admin.route('/metricas/zerar', methods=['POST'])
+@login_required
+@admin_required
+def zerar_metricas():
+    metricas.zerar(); flash('Métricas zeradas.', 'success')
+    return redirect(url_for('admin.painel_metricas'))
+
+@admin.route('/exportar')
+@login_required
+@admin_required
+def exportar_dados():
+    entidade, formato = request.args.get('entidade', ''), request.args.get('formato', 'csv')
+    if entidade not in COLUNAS_EXPORTACAO or formato not in FORMATOS: abort(404)
+    filtros = {'unidade': request.args.get('unidade') or None, 'status': request.args.get('status') or None}
+    for campo in ['inicio', 'fim']:
+        valor = request.args.get(campo, '')
+        filtros[campo] = ler_data_br(valor) if valor else None
+        if valor and not filtros[campo]: abort(400)
+    # A resposta é enviada em pedaços enquanto a consulta é percorrida, sem montar o arquivo em memória
+    resposta = Response(stream_with_context(exportar(entidade, formato, **filtros)), content_type=FORMATOS[formato])
+    resposta.headers['Content-Disposition'] = f'attachment; filename="{entidade}_{date.today().isoformat()}.{formato}"'
+    return resposta
+
 # --- Comandos de CLI Personalizados ---
-@app.cli.command('create-admin')
+@main.cli.command('create-admin')
 def create_admin_command():
     if Usuario.query.filter_by(email='admin@fisio.com').first(): print('O usuário administrador já existe.'); return
     admin_user = Usuario(nome_completo='Admin do Sistema', email='admin@fisio.com', senha_hash=generate_password_hash('admin123'), funcao='admin', status='Ativo')
     db.session.add(admin_user); db.session.commit(); print('Usuário administrador criado com sucesso!')
 
+@main.cli.command('reindexar-busca')
+def reindexar_busca_command():
+    recriar_indice_busca(); print('Índice de busca do arquivo recriado com sucesso!')
+
+def opcao_data_br(ctx, param, valor):
+    # Callback do click para opções de data no formato DD/MM/AAAA
+    if not valor: return None
+    data = ler_data_br(valor)
+    if not data: raise click.BadParameter('Use o formato DD/MM/AAAA.')
+    return data
+
+@main.cli.command('reconstruir-relatorios')
+@click.option('--desde', callback=opcao_data_br, help='Recalcula só a partir desta data (DD/MM/AAAA); sem ela, todo o histórico.')
+def reconstruir_relatorios_command(desde):
+    reconstruir_resumos(desde); print('Resumos dos relatórios reconstruídos com sucesso!')
+
+@main.cli.command('export')
+@click.argument('entidade', type=click.Choice(list(COLUNAS_EXPORTACAO)))
+@click.option('--formato', type=click.Choice(list(FORMATOS)), default='csv', show_default=True)
+@click.option('--inicio', callback=opcao_data_br, help='Data inicial (DD/MM/AAAA) das evoluções ou atendimentos.')
+@click.option('--fim', callback=opcao_data_br, help='Data final (DD/MM/AAAA) das evoluções ou atendimentos.')
+@click.option('--unidade', help='Só pacientes desta unidade.')
+@click.option('--status', type=click.Choice(['Ativo', 'Inativo']), help='Só pacientes com este status.')
+@click.option('--saida', type=click.Path(dir_okay=False, writable=True), help='Arquivo de destino; sem ela, escreve na saída padrão.')
+def export_command(entidade, formato, inicio, fim, unidade, status, saida):
+    pedacos = exportar(entidade, formato, inicio=inicio, fim=fim, unidade=unidade, status=status)
+    if not saida:
+        for pedaco in pedacos: click.echo(pedaco, nl=False)
+        return
+    with open(saida, 'w', encoding='utf-8', newline='') as arquivo:
+        for pedaco in pedacos: arquivo.write(pedaco)
+    print(f"Exportação de {entidade} salva em {saida}.")
+
+@main.cli.command('import-census')
+@click.argument('arquivo', type=click.Path(exists=True, dir_okay=False))
+@click.option('--lote', type=click.IntRange(min=1), default=TAMANHO_LOTE, show_default=True, help='Linhas aplicadas por transação.')
+@click.option('--simular', is_flag=True, help='Só valida: aplica tudo numa transação que é desfeita no fim.')
+def import_census_command(arquivo, lote, simular):
+    """Importa internações, transferências e altas de um CSV.
+
+    Colunas: acao (internacao, transferencia ou alta), nome, data_nascimento e, conforme a ação,
+    unidade, leito, diagnostico e motivo. As linhas são aplicadas na ordem do arquivo.
+    """
+    with open(arquivo, encoding='utf-8-sig', newline='') as entrada:
+        try:
+            contagem, erros = importar_censo(ler_censo(entrada), lote, simular)
+        except ValueError as erro:
+            raise click.ClickException(str(erro))
+    for numero, mensagem in erros: click.echo(f"Linha {numero}: {mensagem}", err=True)
+    print(f"{'Simulação: ' if simular else ''}{contagem['internacoes']} internações, {contagem['reativacoes']} reativações, "
+          f"{contagem['transferencias']} transferências e {contagem['altas']} altas; {len(erros)} linhas com erro.")
+    if erros: raise click.exceptions.Exit(1)
+
+@main.cli.command('archive-patients')
+@click.option('--dias', type=click.IntRange(min=1), help='Arquiva quem está inativo há mais dias que isso (padrão: ARQUIVO_MORTO_DIAS).')
+@click.option('--lote', type=click.IntRange(min=1), help='Pacientes movidos por lote (padrão: ARQUIVO_MORTO_LOTE).')
+@click.option('--compactar', is_flag=True, help='No fim, roda VACUUM no banco principal para devolver o espaço liberado.')
+def archive_patients_command(dias, lote, compactar):
+    """Move para o arquivo morto os pacientes inativos há muito tempo, com evoluções, atendimentos e anexos.
+
+    Feito para ser agendado (cron, timer do systemd): cada execução move só quem passou do prazo desde a anterior.
+    """
+    if not arquivo_morto.ativo: raise click.ClickException('O arquivo morto está desligado (ARQUIVO_MORTO_BANCO vazio).')
+    movidos = arquivo_morto.arquivar(dias or current_app.config['ARQUIVO_MORTO_DIAS'], lote or current_app.config['ARQUIVO_MORTO_LOTE'])
+    if compactar:
+        with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conexao:
+            conexao.exec_driver_sql('VACUUM main')
+    print(f"{movidos['pacientes']} pacientes arquivados, com {movidos['evolucoes']} evoluções, "
+          f"{movidos['atendimentos']} atendimentos e {movidos['anexos']} anexos.")
+
 # --- Execução do Aplicativo ---
+# Servidor de desenvolvimento. Em produção use o wsgi.py com o gunicorn (ver gunicorn.conf.py).
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
+    create_app().run(host='0.0.0.0', port=5000, debug=os.environ.get('FLASK_DEBUG', '1') == '1')
\ No newline at end of file
@@ -0,0 +1,218 @@
+# arquivo_morto.py
+# Arquivo morto: pacientes inativos há muito tempo saem de pacientes/evolucoes/atendimentos/anexos e vão, com todo o
+# histórico, para um segundo banco SQLite, anexado a cada conexão como o esquema `arquivo_morto`. As tabelas e os
+# índices do banco principal ficam só com quem ainda pode voltar a ser atendido, e as páginas que o painel e os
+# prontuários leem o tempo todo cabem no cache. O arquivo tem as mesmas tabelas (sem chaves estrangeiras) e o seu
+# próprio índice de busca; as leituras de um paciente arquivado são as mesmas consultas do ORM, redirecionadas para
+# o esquema do arquivo por lendo(). O conteúdo dos anexos continua no armazém do anexos.py.
+import time
+from contextlib import contextmanager
+from datetime import date, timedelta
+
+from sqlalchemy import event
+from sqlalchemy.schema import CreateColumn, CreateIndex, CreateTable
+
+from models import db, Paciente, Evolucao, Atendimento, Anexo, VersaoPaciente, DDL_INDICE_BUSCA
+
+ESQUEMA = 'arquivo_morto'
+# Na ordem da restauração: o paciente antes dos registros dele (os triggers das versões dependem disso)
+TABELAS = [Paciente.__table__, Evolucao.__table__, Atendimento.__table__, Anexo.__table__]
+
+def _chave(tabela):
+    # Coluna com o id do paciente em cada tabela (do banco principal ou do arquivo)
+    return tabela.c.id if tabela.name == Paciente.__tablename__ else tabela.c.paciente_id
+
+def _colunas(tabela):
+    # As colunas geradas (peep, fio2...) são calculadas pelo próprio banco e não entram nos INSERTs
+    return [coluna.name for coluna in tabela.columns if coluna.computed is None]
+
+def _copiar(tabela, metadata):
+    """Cópia da tabela no esquema do arquivo: mesmas colunas e índices, sem as chaves estrangeiras."""
+    colunas = [db.Column(coluna.name, coluna.type, *([db.Computed(coluna.computed.sqltext, persisted=coluna.computed.persisted)] if coluna.computed is not None else []),
+                         primary_key=coluna.primary_key, nullable=coluna.nullable) for coluna in tabela.columns]
+    copia = db.Table(tabela.name, metadata, *colunas, schema=ESQUEMA)
+    for indice in tabela.indexes:
+        db.Index(indice.name, *[copia.c[coluna.name] for coluna in indice.columns], unique=indice.unique, **indice.dialect_kwargs)
+    for restricao in tabela.constraints:
+        if isinstance(restricao, db.UniqueConstraint):
+            db.Index(restricao.name, *[copia.c[coluna.name] for coluna in restricao.columns], unique=True)
+    return copia
+
+def _no_banco_principal(coluna):
+    # Um paciente restaurado continua no arquivo até a próxima execução de arquivar(); vale a cópia do banco principal
+    return db.exists().where(Paciente.id == coluna)
+
+class ArquivoMorto:
+    def __init__(self):
+        self.caminho = None
+        self.metadata = db.MetaData()
+        self.tabelas = {tabela.name: _copiar(tabela, self.metadata) for tabela in TABELAS}
+        # Um registro por paciente arquivado: quando, e a versão da página e o número de atendimentos naquele momento
+        self.arquivamentos = db.Table('arquivamentos', self.metadata,
+                                      db.Column('paciente_id', db.Integer, primary_key=True),
+                                      db.Column('arquivado_em', db.Float, nullable=False),
+                                      db.Column('versao', db.Integer, nullable=False),
+                                      db.Column('atendimentos', db.Integer, nullable=False),
+                                      schema=ESQUEMA)
+
+    @property
+    def ativo(self):
+        return self.caminho is not None
+
+    def init_app(self, app):
+        caminho = app.config['ARQUIVO_MORTO_BANCO']
+        if not caminho or ':memory:' in app.config['SQLALCHEMY_DATABASE_URI']: return
+        self.caminho, self.cache_kb = caminho, app.config['ARQUIVO_MORTO_CACHE_KB']
+        self.journal_mode = app.config['SQLITE_PRAGMAS'].get('journal_mode', 'WAL')
+        with app.app_context():
+            event.listen(db.engine, 'connect', self._anexar)
+            with db.engine.begin() as conexao:
+                self._criar_esquema(conexao)
+        if not event.contains(db.session, 'do_orm_execute', self._redirecionar):
+            event.listen(db.session, 'do_orm_execute', self._redirecionar)
+
+    def _anexar(self, dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f"ATTACH DATABASE ? AS {ESQUEMA}", (self.caminho,))
+        cursor.execute(f"PRAGMA {ESQUEMA}.journal_mode = {self.journal_mode}")
+        # Cache pequeno: o arquivo é lido raramente e não deve ocupar a memória de cada conexão do pool
+        cursor.execute(f"PRAGMA {ESQUEMA}.cache_size = -{self.cache_kb}")
+        cursor.close()
+
+    def _criar_esquema(self, conexao):
+        # IF NOT EXISTS em tudo: vários workers podem subir ao mesmo tempo
+        for tabela in self.metadata.sorted_tables:
+            conexao.execute(CreateTable(tabela, if_not_exists=True))
+            # Colunas incluídas depois nos modelos (por migrações do banco principal) entram também no arquivo
+            existentes = {linha[1] for linha in conexao.exec_driver_sql(f"PRAGMA {ESQUEMA}.table_xinfo({tabela.name})")}
+            for coluna in tabela.columns:
+                if coluna.name not in existentes:
+                    conexao.exec_driver_sql(f"ALTER TABLE {ESQUEMA}.{tabela.name} ADD COLUMN {CreateColumn(coluna).compile(dialect=conexao.dialect)}")
+            for indice in tabela.indexes:
+                conexao.execute(CreateIndex(indice, if_not_exists=True))
+        # O mesmo índice de busca do banco principal, sobre as tabelas do arquivo. Um índice criado agora sobre linhas que
+        # já existiam é reconstruído: fora de sincronia, o 'delete' dos triggers acusaria o banco de corrompido.
+        existentes = set(conexao.scalars(db.text(f"SELECT name FROM {ESQUEMA}.sqlite_master WHERE type = 'table'")))
+        for tabela, comandos in DDL_INDICE_BUSCA.items():
+            for comando in comandos:
+                conexao.exec_driver_sql(comando.replace('CREATE VIRTUAL TABLE ', f"CREATE VIRTUAL TABLE IF NOT EXISTS {ESQUEMA}.")
+                                               .replace('CREATE TRIGGER ', f"CREATE TRIGGER IF NOT EXISTS {ESQUEMA}."))
+            if f'busca_{tabela}' not in existentes:
+                conexao.exec_driver_sql(f"INSERT INTO {ESQUEMA}.busca_{tabela}(busca_{tabela}) VALUES ('rebuild')")
+
+    def _redirecionar(self, estado):
+        if estado.session.info.get('arquivo_morto'):
+            estado.update_execution_options(schema_translate_map={None: ESQUEMA})
+
+    @contextmanager
+    def lendo(self, arquivado=True):
+        """Dentro do bloco (se `arquivado`), as consultas da sessão leem as tabelas do arquivo em vez das do banco principal.
+
+        Vale para todas as tabelas: só consulte pacientes, evoluções, atendimentos e anexos dentro dele.
+        """
+        anterior = db.session.info.get('arquivo_morto')
+        db.session.info['arquivo_morto'] = bool(arquivado) or anterior
+        try:
+            yield
+        finally:
+            db.session.info['arquivo_morto'] = anterior
+
+    def arquivado_em(self, paciente_id):
+        """Quando (segundos desde 1970) o paciente foi para o arquivo morto, ou None se ele não está lá."""
+        if not self.ativo: return None
+        arquivamentos = self.arquivamentos
+        return db.session.scalar(db.select(arquivamentos.c.arquivado_em)
+                                 .where(arquivamentos.c.paciente_id == paciente_id, ~_no_banco_principal(arquivamentos.c.paciente_id)))
+
+    def obter(self, modelo, id_):
+        """db.session.get() no arquivo, para os registros (ex.: um anexo) pedidos pelo id sem passar pelo paciente."""
+        if not self.ativo: return None
+        with self.lendo():
+            objeto = db.session.get(modelo, id_)
+        if objeto is None: return None
+        return objeto if self.arquivado_em(objeto.id if modelo is Paciente else objeto.paciente_id) is not None else None
+
+    def buscar(self, chaves):
+        """Ids dos pacientes arquivados com os pares (nome, data de nascimento) de `chaves`."""
+        if not self.ativo or not chaves: return []
+        pacientes = self.tabelas['pacientes']
+        return db.session.scalars(db.select(pacientes.c.id)
+                                  .where(db.tuple_(pacientes.c.nome, pacientes.c.data_nascimento).in_(list(chaves)),
+                                         ~_no_banco_principal(pacientes.c.id))).all()
+
+    def restaurar(self, ids):
+        """Copia os pacientes `ids` do arquivo de volta para o banco principal, com todo o histórico, na transação da sessão.
+
+        Quem chama faz o commit (e, se desfizer a transação, o paciente continua arquivado). A cópia que fica no
+        arquivo é apagada na próxima execução de arquivar().
+        """
+        if not self.ativo or not ids: return
+        for tabela in TABELAS:
+            copia, colunas = self.tabelas[tabela.name], _colunas(tabela)
+            db.session.execute(db.insert(tabela).from_select(colunas, db.select(*[copia.c[nome] for nome in colunas])
+                                                                      .where(_chave(copia).in_(ids))))
+        # A versão da página continua de onde parou, senão um ETag de antes do arquivamento poderia voltar a valer
+        arquivamentos, versoes = self.arquivamentos, VersaoPaciente.__table__
+        versao_arquivada = db.select(arquivamentos.c.versao).where(arquivamentos.c.paciente_id == versoes.c.paciente_id).scalar_subquery()
+        db.session.execute(db.update(versoes).where(versoes.c.paciente_id.in_(ids)).values(versao=versoes.c.versao + versao_arquivada))
+
+    def descartar_restaurados(self):
+        """Apaga do arquivo as cópias dos pacientes que já voltaram para o banco principal."""
+        restaurados = db.select(self.arquivamentos.c.paciente_id).where(_no_banco_principal(self.arquivamentos.c.paciente_id))
+        for tabela in TABELAS:
+            copia = self.tabelas[tabela.name]
+            db.session.execute(db.delete(copia).where(_chave(copia).in_(restaurados)))
+        db.session.execute(db.delete(self.arquivamentos).where(self.arquivamentos.c.paciente_id.in_(restaurados)))
+        db.session.commit()
+
+    def _candidatos(self, limite, depois_de, tamanho_lote):
+        consulta = (db.select(Paciente.id).where(Paciente.status == 'Inativo', Paciente.inativado_em < limite, Paciente.id > depois_de)
+                    .order_by(Paciente.id).limit(tamanho_lote))
+        # O registro de maior id de cada tabela fica no banco principal: as tabelas não usam AUTOINCREMENT e o SQLite
+        # reaproveitaria o id, que o cache de fragmentos usa como chave do HTML das evoluções
+        for tabela in TABELAS:
+            maior_id = db.select(db.func.max(tabela.c.id)).scalar_subquery()
+            consulta = consulta.where(Paciente.id.not_in(db.select(_chave(tabela)).where(tabela.c.id == maior_id)))
+        return db.session.scalars(consulta).all()
+
+    def arquivar(self, dias, tamanho_lote=200):
+        """Move para o arquivo os pacientes inativos há mais de `dias` dias, em lotes de `tamanho_lote` pacientes.
+
+        Transações em bancos anexados não são atômicas entre si no modo WAL, então cada lote usa duas: a primeira copia
+        para o arquivo e a segunda apaga do banco principal só os pacientes que não mudaram desde a cópia (mesma versão
+        da página e mesmo número de atendimentos). Se o processo parar entre as duas, o paciente fica nos dois bancos,
+        as leituras usam o principal e a próxima execução refaz a cópia. Devolve {tabela: linhas movidas}.
+        """
+        self.descartar_restaurados()
+        limite = date.today() - timedelta(days=dias)
+        arquivamentos, versoes = self.arquivamentos, VersaoPaciente.__table__
+        movidos, depois_de = dict.fromkeys([tabela.name for tabela in TABELAS], 0), 0
+        while True:
+            ids = self._candidatos(limite, depois_de, tamanho_lote)
+            if not ids: break
+            depois_de = ids[-1]
+
+            for tabela in TABELAS:
+                copia, colunas = self.tabelas[tabela.name], _colunas(tabela)
+                db.session.execute(db.delete(copia).where(_chave(copia).in_(ids)))
+                db.session.execute(db.insert(copia).from_select(colunas, db.select(*[tabela.c[nome] for nome in colunas]).where(_chave(tabela).in_(ids))))
+            atendimentos = db.select(db.func.count()).where(Atendimento.paciente_id == versoes.c.paciente_id).scalar_subquery()
+            db.session.execute(db.delete(arquivamentos).where(arquivamentos.c.paciente_id.in_(ids)))
+            db.session.execute(db.insert(arquivamentos).from_select(
+                ['paciente_id', 'arquivado_em', 'versao', 'atendimentos'],
+                db.select(versoes.c.paciente_id, db.literal(time.time()), versoes.c.versao, atendimentos).where(versoes.c.paciente_id.in_(ids))))
+            db.session.commit()
+
+            # O DELETE ... RETURNING confirma os pacientes e já pega a trava de escrita até o commit
+            # (sem a mesma versão no arquivo a subconsulta dá NULL e a comparação é falsa)
+            atendimentos_arquivados = db.select(arquivamentos.c.atendimentos).where(
+                arquivamentos.c.paciente_id == versoes.c.paciente_id, arquivamentos.c.versao == versoes.c.versao).scalar_subquery()
+            confirmados = db.session.scalars(db.delete(versoes).where(versoes.c.paciente_id.in_(ids), atendimentos_arquivados == atendimentos)
+                                             .returning(versoes.c.paciente_id)).all()
+            for tabela in reversed(TABELAS):
+                resultado = db.session.execute(db.delete(tabela).where(_chave(tabela).in_(confirmados)))
+                movidos[tabela.name] += resultado.rowcount
+            db.session.commit()
+        return movidos
+
+arquivo_morto = ArquivoMorto()
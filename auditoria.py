@@ -0,0 +1,171 @@
+# auditoria.py
+# Log de auditoria das ações críticas: quem alterou o quê em pacientes e usuários, com os valores antes e depois.
+# Os registros são montados nos eventos da sessão e só vão para o buffer quando a transação é confirmada;
+# uma thread grava o buffer em lotes, fora do caminho da requisição (nenhum commit extra por requisição).
+import atexit
+import logging
+import threading
+from datetime import date, datetime
+
+import pytz
+from flask import has_request_context, request
+from flask_login import current_user
+from sqlalchemy import event, inspect
+from sqlalchemy.exc import OperationalError
+
+from models import db, Paciente, Usuario, Anexo, RegistroAuditoria
+
+logger = logging.getLogger(__name__)
+
+CAMPOS_AUDITADOS = {
+    Paciente: ['nome', 'data_nascimento', 'unidade', 'leito', 'diagnostico', 'status', 'motivo_inativacao'],
+    Usuario: ['nome_completo', 'email', 'funcao', 'status', 'senha_hash', 'precisa_trocar_senha'],
+    Anexo: ['paciente_id', 'nome', 'tipo', 'tamanho', 'sha256'],
+}
+# Campos cujo valor nunca vai para o log; registra-se apenas que foram alterados
+CAMPOS_OCULTOS = {'senha_hash'}
+
+# --- Captura nos Eventos da Sessão ---
+def _valor(campo, valor):
+    if valor is None: return None
+    if campo in CAMPOS_OCULTOS: return '***'
+    if isinstance(valor, (date, datetime)): return valor.isoformat()
+    return valor
+
+def _alteracoes(objeto, operacao):
+    estado = inspect(objeto)
+    alteracoes = {}
+    for campo in CAMPOS_AUDITADOS[type(objeto)]:
+        historico = estado.attrs[campo].history
+        if operacao == 'alteracao':
+            if not historico.has_changes(): continue
+            antes = historico.deleted[0] if historico.deleted else None
+            depois = historico.added[0] if historico.added else None
+            if antes == depois: continue
+        else:
+            antes, depois = (None, getattr(objeto, campo)) if operacao == 'inclusao' else (getattr(objeto, campo), None)
+            if antes is None and depois is None: continue
+        alteracoes[campo] = [_valor(campo, antes), _valor(campo, depois)]
+    return alteracoes
+
+def _autor():
+    if not has_request_context(): return None, 'sistema', 'cli'
+    if current_user.is_authenticated: return current_user.id, current_user.nome_completo, request.endpoint or request.path
+    return None, 'anônimo', request.endpoint or request.path
+
+def _apos_flush(sessao, contexto):
+    # Em after_flush os objetos já têm id e o histórico dos atributos ainda mostra os valores anteriores
+    objetos = ([(o, 'inclusao') for o in sessao.new] + [(o, 'alteracao') for o in sessao.dirty]
+               + [(o, 'exclusao') for o in sessao.deleted])
+    registros = []
+    for objeto, operacao in objetos:
+        if type(objeto) not in CAMPOS_AUDITADOS: continue
+        alteracoes = _alteracoes(objeto, operacao)
+        if not alteracoes: continue
+        if not registros:
+            usuario_id, usuario_nome, origem = _autor()
+            agora = datetime.now(pytz.timezone("America/Sao_Paulo"))
+        registros.append({'data': agora, 'usuario_id': usuario_id, 'usuario_nome': usuario_nome, 'origem': origem,
+                          'tabela': objeto.__tablename__, 'registro_id': objeto.id, 'operacao': operacao, 'alteracoes': alteracoes})
+    if registros:
+        sessao.info.setdefault('auditoria', []).extend(registros)
+
+def _apos_commit(sessao):
+    escritor_auditoria.adicionar(sessao.info.pop('auditoria', None))
+
+def _apos_rollback(sessao):
+    sessao.info.pop('auditoria', None)
+
+# --- Gravação em Lote ---
+class EscritorAuditoria:
+    """Buffer dos registros de auditoria já confirmados, gravados em lote por uma thread em segundo plano.
+
+    A requisição só acrescenta ao buffer; a gravação acontece a cada `intervalo` segundos ou quando o buffer
+    chega a `tamanho_lote`, com uma transação por lote de `tamanho_lote` registros. Ao encerrar o processo o buffer
+    é descarregado (atexit e, no gunicorn, o hook worker_exit); só uma queda abrupta (kill -9) perde os últimos
+    `intervalo` segundos. Com o banco indisponível os registros esperam no buffer, limitado a `tamanho_maximo`.
+    """
+    def __init__(self, intervalo=2.0, tamanho_lote=100, tamanho_maximo=10000):
+        self.intervalo, self.tamanho_lote, self.tamanho_maximo = intervalo, tamanho_lote, tamanho_maximo
+        self.engine = None
+        self._buffer = []
+        self._lock = threading.Lock()
+        self._acordar = threading.Event()
+        self._thread = None
+
+    def init_app(self, app):
+        self.intervalo = app.config['AUDITORIA_INTERVALO']
+        self.tamanho_lote = app.config['AUDITORIA_LOTE']
+        self.tamanho_maximo = app.config['AUDITORIA_BUFFER_MAXIMO']
+        with app.app_context():
+            self.engine = db.engine
+        if not event.contains(db.session, 'after_flush', _apos_flush):
+            event.listen(db.session, 'after_flush', _apos_flush)
+            event.listen(db.session, 'after_commit', _apos_commit)
+            event.listen(db.session, 'after_rollback', _apos_rollback)
+            atexit.register(self.descarregar)
+
+    def adicionar(self, registros):
+        if not registros: return
+        with self._lock:
+            self._buffer.extend(registros)
+            self._limitar_buffer()
+            cheio = len(self._buffer) >= self.tamanho_lote
+            # A thread nasce no primeiro registro, já dentro do processo do worker (depois do fork)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._executar, name='escritor-auditoria', daemon=True)
+                self._thread.start()
+        if cheio: self._acordar.set()
+
+    def _limitar_buffer(self):
+        # Chamado com o lock: sem limite, um banco fora do ar faria o buffer crescer enquanto houver requisições
+        excesso = len(self._buffer) - self.tamanho_maximo
+        if excesso > 0:
+            del self._buffer[:excesso]
+            logger.error('Buffer de auditoria cheio: %d registros mais antigos descartados sem gravar.', excesso)
+
+    def _executar(self):
+        while True:
+            self._acordar.wait(self.intervalo)
+            self._acordar.clear()
+            self.descarregar()
+
+    def descarregar(self):
+        """Grava agora tudo o que está no buffer, um lote de `tamanho_lote` registros por transação.
+
+        Banco indisponível (OperationalError: travado, disco cheio): o que faltou volta ao buffer para o próximo
+        ciclo. Qualquer outro erro é do próprio lote: os registros dele são tentados um a um, e só o que falhar
+        sozinho é descartado, para que um registro ruim não impeça a gravação dos demais.
+        """
+        with self._lock:
+            lote, self._buffer = self._buffer, []
+        if not lote or self.engine is None: return
+        partes = [lote[inicio:inicio + self.tamanho_lote] for inicio in range(0, len(lote), self.tamanho_lote)]
+        while partes:
+            parte = partes.pop(0)
+            try:
+                with self.engine.begin() as conexao:
+                    conexao.execute(db.insert(RegistroAuditoria), parte)
+            except OperationalError:
+                restantes = [registro for pendente in [parte] + partes for registro in pendente]
+                logger.exception('Falha ao gravar %d registros de auditoria; nova tentativa no próximo ciclo.', len(restantes))
+                with self._lock:
+                    self._buffer[:0] = restantes
+                    self._limitar_buffer()
+                return
+            except Exception:
+                if len(parte) > 1:
+                    logger.warning('Lote de %d registros de auditoria recusado; gravando um a um.', len(parte), exc_info=True)
+                    partes[:0] = [[registro] for registro in parte]
+                else:
+                    logger.exception('Registro de auditoria descartado por não poder ser gravado: %s %s (%s).',
+                                     parte[0].get('tabela'), parte[0].get('registro_id'), parte[0].get('operacao'))
+
+escritor_auditoria = EscritorAuditoria()
+
+def buscar_auditoria(tabela=None, registro_id=None, limite=200):
+    """Registros mais recentes primeiro, opcionalmente de um único registro auditado."""
+    consulta = RegistroAuditoria.query
+    if tabela: consulta = consulta.filter(RegistroAuditoria.tabela == tabela)
+    if registro_id: consulta = consulta.filter(RegistroAuditoria.registro_id == registro_id)
+    return consulta.order_by(RegistroAuditoria.id.desc()).limit(limite).all()
@@ -0,0 +1,226 @@
+# benchmark.py
+# Benchmark das rotas principais sobre um hospital sintético (ver gerar_dados.py), num banco temporário.
+#
+#   python benchmark.py --saida resultado.json
+#   python benchmark.py --pacientes-inativos 20000 --meses 36 --saida grande.json --comparar resultado.json
+#
+# Mede latência e número de consultas SQL por requisição (pelo test client do Flask) e a vazão de vários
+# escritores simultâneos. O resultado é um JSON; com --comparar, imprime a variação em relação a outro resultado.
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import event
+
+from app import create_app
+from gerar_dados import gerar_hospital
+from models import db, Paciente, Usuario
+
+SENHA = 'bench123'
+
+# --- Medição ---
+class ContadorConsultas:
+    """Conta os comandos SQL executados pela thread atual (cada thread do teste concorrente tem o seu)."""
+    def __init__(self, engine):
+        self._local = threading.local()
+        event.listen(engine, 'before_cursor_execute', self._contar)
+
+    def _contar(self, *args):
+        self._local.total = getattr(self._local, 'total', 0) + 1
+
+    def zerar(self):
+        self._local.total = 0
+
+    @property
+    def total(self):
+        return getattr(self._local, 'total', 0)
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, round(p / 100 * (len(ordenados) - 1)))]
+
+def resumir(latencias, consultas):
+    ms = [t * 1000 for t in latencias]
+    return {
+        'n': len(ms),
+        'latencia_ms': {'min': round(min(ms), 3), 'mediana': round(statistics.median(ms), 3), 'media': round(statistics.fmean(ms), 3),
+                        'p95': round(percentil(ms, 95), 3), 'max': round(max(ms), 3)},
+        'consultas': {'min': min(consultas), 'mediana': statistics.median(consultas), 'max': max(consultas)},
+    }
+
+def cliente_logado(app, email):
+    cliente = app.test_client()
+    resposta = cliente.post('/login', data={'email': email, 'senha': SENHA})
+    assert resposta.status_code == 302, f"login falhou para {email}"
+    return cliente
+
+def medir(contador, requisicao, repeticoes, aquecimento=3):
+    """Executa `requisicao(i)` repetidas vezes e devolve o resumo de latência e consultas (após o aquecimento)."""
+    for i in range(aquecimento):
+        requisicao(i)
+    latencias, consultas = [], []
+    for i in range(repeticoes):
+        contador.zerar()
+        inicio = time.perf_counter()
+        resposta = requisicao(i)
+        latencias.append(time.perf_counter() - inicio)
+        consultas.append(contador.total)
+        assert resposta.status_code < 400, f"status {resposta.status_code}"
+    return resumir(latencias, consultas)
+
+# --- Cenários ---
+def cenarios_sequenciais(app, contador, repeticoes, rng):
+    with app.app_context():
+        ativos = db.session.scalars(db.select(Paciente.id).where(Paciente.status == 'Ativo')).all()
+        inativos = db.session.scalars(db.select(Paciente.id).where(Paciente.status == 'Inativo')).all()
+        sobrenomes = [nome.split()[-1] for nome in db.session.scalars(db.select(Paciente.nome).where(Paciente.id.in_(inativos[:200])))]
+    cliente = cliente_logado(app, 'admin@bench')
+    resultados = {}
+
+    resultados['login'] = medir(contador, lambda i: app.test_client().post('/login', data={'email': 'fisio0@bench', 'senha': SENHA}),
+                                max(5, repeticoes // 5))
+    resultados['painel_diario'] = medir(contador, lambda i: cliente.get('/'), repeticoes)
+    resultados['detalhes_paciente'] = medir(contador, lambda i: cliente.get(f"/paciente/{rng.choice(ativos + inativos)}"), repeticoes)
+    # Tablets recarregando páginas que não mudaram: o navegador manda o ETag e recebe 304
+    etag = cliente.get('/').headers['ETag']
+    resultados['painel_revalidado'] = medir(contador, lambda i: cliente.get('/', headers={'If-None-Match': etag}), repeticoes)
+    paciente_id = rng.choice(ativos)
+    etag = cliente.get(f"/paciente/{paciente_id}").headers['ETag']
+    resultados['paciente_revalidado'] = medir(contador, lambda i: cliente.get(f"/paciente/{paciente_id}", headers={'If-None-Match': etag}), repeticoes)
+    ventilados = [p['paciente_id'] for p in cliente.get('/evolucoes/modelos/ventilacao_mecanica/pacientes').get_json()['pacientes']] or ativos
+    resultados['serie_paciente'] = medir(
+        contador, lambda i: cliente.get(f"/paciente/{rng.choice(ventilados)}/series", query_string={'parametro': rng.choice(['peep', 'fio2', 'fr']), 'dias': 30}),
+        repeticoes)
+    fisio = cliente_logado(app, 'fisio0@bench')
+    resultados['minhas_evolucoes'] = medir(contador, lambda i: fisio.get('/minhas-evolucoes'), repeticoes)
+    resultados['arquivo'] = medir(contador, lambda i: cliente.get('/arquivo', query_string={'busca': rng.choice(sobrenomes)}), repeticoes)
+    resultados['arquivo_com_evolucoes'] = medir(
+        contador, lambda i: cliente.get('/arquivo', query_string={'busca': rng.choice(['higiene', 'PEEP', 'marcha', 'extubado']), 'evolucoes': '1'}),
+        repeticoes)
+    resultados['adicionar_evolucao'] = medir(
+        contador, lambda i: cliente.post(f"/paciente/evoluir/{rng.choice(ativos)}", data={'evolucao': 'Evolução do benchmark.', 'turno_atendimento': rng.choice(['manha', 'tarde'])}),
+        repeticoes)
+    return resultados
+
+def cenario_escritores_concorrentes(app, contador, escritores, por_escritor, rng):
+    """Vários fisioterapeutas gravando evoluções e marcações do painel ao mesmo tempo, cada um na sua thread."""
+    with app.app_context():
+        ativos = db.session.scalars(db.select(Paciente.id).where(Paciente.status == 'Ativo')).all()
+        emails = db.session.scalars(db.select(Usuario.email).where(Usuario.funcao == 'fisioterapeuta').limit(escritores)).all()
+    clientes = [cliente_logado(app, email) for email in emails]
+    latencias, consultas, erros = [], [], []
+    lock = threading.Lock()
+    barreira = threading.Barrier(len(clientes))
+
+    def escritor(cliente, semente):
+        rng_local = random.Random(semente)
+        barreira.wait()
+        for i in range(por_escritor):
+            paciente_id = rng_local.choice(ativos)
+            contador.zerar()
+            inicio = time.perf_counter()
+            if i % 2:
+                resposta = cliente.post('/atendimentos', json={'alteracoes': [{'paciente_id': paciente_id, 'turno': 'tarde', 'valor': bool(i % 4)}]})
+            else:
+                resposta = cliente.post(f"/paciente/evoluir/{paciente_id}", data={'evolucao': 'Escrita concorrente.', 'turno_atendimento': 'manha'})
+            duracao = time.perf_counter() - inicio
+            with lock:
+                if resposta.status_code >= 400: erros.append(resposta.status_code)
+                else: latencias.append(duracao); consultas.append(contador.total)
+
+    threads = [threading.Thread(target=escritor, args=(cliente, rng.random())) for cliente in clientes]
+    inicio = time.perf_counter()
+    for thread in threads: thread.start()
+    for thread in threads: thread.join()
+    total = time.perf_counter() - inicio
+    resultado = resumir(latencias, consultas) if latencias else {'n': 0}
+    resultado.update(escritores=len(clientes), erros=len(erros), segundos=round(total, 3),
+                     escritas_por_segundo=round(len(latencias) / total, 1))
+    return resultado
+
+# --- Comparação entre Execuções ---
+def comparar(atual, anterior):
+    print(f"\n{'cenário':<26}{'mediana ms':>12}{'antes':>10}{'var.':>9}{'consultas':>11}{'antes':>8}")
+    for nome, resultado in atual['cenarios'].items():
+        antigo = anterior.get('cenarios', {}).get(nome)
+        if not antigo or 'latencia_ms' not in resultado or 'latencia_ms' not in antigo: continue
+        agora, antes = resultado['latencia_ms']['mediana'], antigo['latencia_ms']['mediana']
+        variacao = f"{100 * (agora - antes) / antes:+.0f}%" if antes else '-'
+        print(f"{nome:<26}{agora:>12.2f}{antes:>10.2f}{variacao:>9}{resultado['consultas']['mediana']:>11}{antigo['consultas']['mediana']:>8}")
+
+def versao_git():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark das rotas principais do Passa Plantão.')
+    parser.add_argument('--unidades', type=int, default=4)
+    parser.add_argument('--leitos', type=int, default=20, help='Leitos por unidade.')
+    parser.add_argument('--pacientes-inativos', type=int, default=2000)
+    parser.add_argument('--meses', type=int, default=12, help='Meses de histórico dos pacientes inativos.')
+    parser.add_argument('--evolucoes-por-dia', type=int, default=2)
+    parser.add_argument('--repeticoes', type=int, default=50, help='Requisições medidas por cenário.')
+    parser.add_argument('--escritores', type=int, default=8, help='Threads do cenário de escrita concorrente.')
+    parser.add_argument('--escritas', type=int, default=25, help='Escritas por thread no cenário concorrente.')
+    parser.add_argument('--semente', type=int, default=42)
+    parser.add_argument('--banco', help='Arquivo SQLite a usar (padrão: um arquivo temporário, apagado no fim).')
+    parser.add_argument('--saida', help='Arquivo JSON de resultado (padrão: só imprime).')
+    parser.add_argument('--comparar', help='JSON de uma execução anterior para comparar.')
+    args = parser.parse_args()
+
+    pasta = tempfile.TemporaryDirectory()
+    caminho = os.path.abspath(args.banco) if args.banco else os.path.join(pasta.name, 'benchmark.db')
+    # Arquivo morto e anexos também ficam na pasta temporária: os da instalação nem são tocados nem entram nos números
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + caminho,
+        'ARQUIVO_MORTO_BANCO': '' if args.banco else os.path.join(pasta.name, 'arquivo_morto.db'),
+        'ANEXOS_DIRETORIO': os.path.join(pasta.name, 'anexos'),
+    })
+    rng = random.Random(args.semente)
+
+    with app.app_context():
+        db.create_all()
+        inicio = time.perf_counter()
+        dados = gerar_hospital(unidades=args.unidades, leitos=args.leitos, pacientes_inativos=args.pacientes_inativos, meses=args.meses,
+                               evolucoes_por_dia=args.evolucoes_por_dia, fisioterapeutas=max(args.escritores, 5), semente=args.semente, senha=SENHA)
+        dados['segundos_para_gerar'] = round(time.perf_counter() - inicio, 2)
+        contador = ContadorConsultas(db.engine)
+    print(f"Dados gerados: {dados}", file=sys.stderr)
+
+    cenarios = cenarios_sequenciais(app, contador, args.repeticoes, rng)
+    cenarios['escritores_concorrentes'] = cenario_escritores_concorrentes(app, contador, args.escritores, args.escritas, rng)
+
+    resultado = {
+        'data': datetime.now().isoformat(timespec='seconds'),
+        'commit': versao_git(),
+        'ambiente': {'python': platform.python_version(), 'sqlite': sqlite3.sqlite_version, 'plataforma': platform.platform()},
+        'parametros': vars(args),
+        'dados': dados,
+        'cenarios': cenarios,
+    }
+    texto = json.dumps(resultado, indent=2, ensure_ascii=False)
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as arquivo: arquivo.write(texto + '\n')
+        print(f"Resultado salvo em {args.saida}", file=sys.stderr)
+    else:
+        print(texto)
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as arquivo: comparar(resultado, json.load(arquivo))
+    with app.app_context(): db.engine.dispose()
+    pasta.cleanup()
+
+if __name__ == '__main__':
+    main()
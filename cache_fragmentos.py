@@ -0,0 +1,136 @@
+# cache_fragmentos.py
+# Cache de trechos de HTML já renderizados: cada evolução do histórico (imutável depois de gravada) e
+# a seção de cada unidade no painel (chaveada pela versão da unidade, incrementada por triggers no banco).
+# Fica em memória (LRU limitado) e, opcionalmente, num arquivo SQLite compartilhado entre os workers.
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app, render_template
+from markupsafe import Markup
+
+from models import db, VersaoPainel, montar_painel
+
+class ArmazemSqlite:
+    """Segundo nível do cache: um arquivo SQLite local, visto por todos os workers da máquina."""
+    def __init__(self, caminho, tamanho_maximo):
+        self.caminho, self.tamanho_maximo = caminho, tamanho_maximo
+        self._local = threading.local()
+        self._gravacoes = 0
+        with self._conexao() as conexao:
+            conexao.execute("CREATE TABLE IF NOT EXISTS fragmentos (chave TEXT PRIMARY KEY, html TEXT NOT NULL, criado REAL NOT NULL)")
+            conexao.execute("CREATE INDEX IF NOT EXISTS ix_fragmentos_criado ON fragmentos (criado)")
+
+    def _conexao(self):
+        conexao = getattr(self._local, 'conexao', None)
+        if conexao is None:
+            conexao = sqlite3.connect(self.caminho, timeout=1)
+            conexao.execute("PRAGMA journal_mode = WAL")
+            conexao.execute("PRAGMA synchronous = OFF")  # é só cache: perder as últimas gravações não tem problema
+            self._local.conexao = conexao
+        return conexao
+
+    def obter(self, chave):
+        linha = self._conexao().execute("SELECT html FROM fragmentos WHERE chave = ?", (chave,)).fetchone()
+        return linha[0] if linha else None
+
+    def guardar(self, chave, html):
+        with self._conexao() as conexao:
+            conexao.execute("INSERT OR REPLACE INTO fragmentos (chave, html, criado) VALUES (?, ?, ?)", (chave, html, time.time()))
+            self._gravacoes += 1
+            if self._gravacoes % 500 == 0:
+                # De tempos em tempos descarta os mais antigos para manter o arquivo limitado
+                conexao.execute("DELETE FROM fragmentos WHERE chave IN (SELECT chave FROM fragmentos ORDER BY criado DESC LIMIT -1 OFFSET ?)",
+                                (self.tamanho_maximo,))
+
+    def limpar(self):
+        with self._conexao() as conexao:
+            conexao.execute("DELETE FROM fragmentos")
+
+class CacheFragmentos:
+    """LRU em memória para HTML renderizado, com um ArmazemSqlite opcional como segundo nível."""
+    def __init__(self, tamanho_maximo=2000):
+        self.tamanho_maximo = tamanho_maximo
+        self.armazem = None
+        self.acertos = self.falhas = 0
+        self._itens = OrderedDict()
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.tamanho_maximo = app.config['CACHE_FRAGMENTOS_TAMANHO']
+        arquivo = app.config['CACHE_FRAGMENTOS_ARQUIVO']
+        self.armazem = ArmazemSqlite(arquivo, app.config['CACHE_FRAGMENTOS_TAMANHO_ARQUIVO']) if arquivo else None
+
+    def obter(self, chave):
+        with self._lock:
+            html = self._itens.get(chave)
+            if html is not None:
+                self._itens.move_to_end(chave); self.acertos += 1
+                return html
+        html = self.armazem.obter(chave) if self.armazem else None
+        if html is None:
+            self.falhas += 1; return None
+        self.acertos += 1
+        self._guardar_em_memoria(chave, html)
+        return html
+
+    def guardar(self, chave, html):
+        self._guardar_em_memoria(chave, html)
+        if self.armazem: self.armazem.guardar(chave, html)
+
+    def _guardar_em_memoria(self, chave, html):
+        with self._lock:
+            self._itens[chave] = html
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.tamanho_maximo:
+                self._itens.popitem(last=False)
+
+    def obter_ou_renderizar(self, chave, renderizar):
+        html = self.obter(chave)
+        if html is None:
+            html = renderizar()
+            self.guardar(chave, html)
+        return Markup(html)
+
+    def limpar(self):
+        with self._lock:
+            self._itens.clear()
+        if self.armazem: self.armazem.limpar()
+
+cache_fragmentos = CacheFragmentos()
+
+# --- Fragmentos da Aplicação ---
+def html_evolucao(evolucao):
+    # Evoluções não são editadas depois de gravadas, então o id basta como chave.
+    # A macro do template (carregada uma vez por processo) sai mais barata que um render_template por evolução.
+    macro = current_app.jinja_env.get_template('_evolucao.html').module.evolucao_html
+    return cache_fragmentos.obter_ou_renderizar(f"evolucao:{evolucao.id}", lambda: str(macro(evolucao)))
+
+def secoes_painel(dia, versoes=None):
+    """(unidade, versao, HTML) de cada unidade com pacientes ativos no painel do dia, na ordem das unidades.
+
+    A chave inclui a versão da unidade (versoes_painel, atualizada por triggers a cada mudança em pacientes
+    ou atendimentos daquela unidade). Com tudo em cache, o painel custa uma consulta pequena; as unidades
+    que mudaram são montadas numa única consulta e renderizadas de novo. `versoes` são as linhas de
+    cache_http.versoes_painel(), quando a rota já as consultou.
+    """
+    if versoes is None:
+        versoes = db.session.execute(db.select(VersaoPainel.unidade, VersaoPainel.versao).order_by(VersaoPainel.unidade)).all()
+    versoes = {unidade: versao for unidade, versao, *_ in versoes}
+    secoes = secoes_unidades(dia, versoes)
+    return [(unidade, versao, secoes[unidade]) for unidade, versao in versoes.items() if secoes[unidade]]
+
+def secoes_unidades(dia, versoes):
+    """{unidade: HTML} das unidades em `versoes` ({unidade: versao}); vazio para unidade sem pacientes ativos."""
+    chaves = {unidade: f"painel:{dia.isoformat()}:{unidade}:{versao}" for unidade, versao in versoes.items()}
+    secoes = {unidade: cache_fragmentos.obter(chave) for unidade, chave in chaves.items()}
+    faltando = [unidade for unidade, html in secoes.items() if html is None]
+    if faltando:
+        painel = montar_painel(dia, unidades=faltando)
+        for unidade in faltando:
+            pacientes = painel.get(unidade)
+            # Unidades sem pacientes ativos também vão para o cache (vazias), para não serem consultadas de novo
+            secoes[unidade] = render_template('_painel_unidade.html', unidade=unidade, pacientes_na_unidade=pacientes) if pacientes else ''
+            cache_fragmentos.guardar(chaves[unidade], secoes[unidade])
+    return {unidade: Markup(html) for unidade, html in secoes.items()}
@@ -0,0 +1,62 @@
+# cache_http.py
+# GET condicional (ETag / Last-Modified) para as páginas que os tablets das unidades recarregam o tempo todo.
+# O ETag vem de versões mantidas por triggers no banco (versoes_painel, versoes_paciente): uma consulta pequena
+# decide se a página mudou; se não mudou, a resposta é um 304 sem montar nem renderizar nada.
+import hashlib
+import os
+from datetime import date, datetime, time, timezone
+
+from flask import current_app, make_response, request, session
+from flask_login import current_user
+from werkzeug.http import is_resource_modified
+
+from models import db, VersaoPainel, VersaoPaciente
+
+_versao_templates = None
+
+def versao_templates():
+    """Data de modificação mais recente dos templates, para que um deploy com templates novos invalide os ETags.
+
+    Calculada uma vez por processo; é a mesma em todos os workers, que leem os mesmos arquivos.
+    """
+    global _versao_templates
+    if _versao_templates is None:
+        pasta = os.path.join(current_app.root_path, current_app.template_folder)
+        _versao_templates = max((os.path.getmtime(os.path.join(raiz, nome)) for raiz, _, nomes in os.walk(pasta) for nome in nomes), default=0)
+    return _versao_templates
+
+def responder_condicional(versao, alterado_em, renderizar):
+    """Devolve 304 se o navegador já tem a página na `versao` atual; senão chama `renderizar()` e marca a resposta.
+
+    O ETag junta a versão dos dados com o que mais muda a página: o dia (idade, turnos do dia), o usuário logado
+    (nome e menu de admin) e os templates. `alterado_em` (segundos desde 1970) vira o Last-Modified, nunca
+    anterior à meia-noite de hoje pelo mesmo motivo do dia no ETag.
+    """
+    if session.get('_flashes'):
+        # Há mensagens a mostrar: a página precisa ser renderizada de novo
+        return renderizar()
+    hoje = date.today()
+    partes = (versao, hoje.isoformat(), current_user.id, current_user.nome_completo, current_user.funcao, versao_templates())
+    etag = hashlib.sha1(repr(partes).encode()).hexdigest()
+    ultima_alteracao = datetime.fromtimestamp(max(alterado_em or 0, datetime.combine(hoje, time()).timestamp()), timezone.utc)
+    if not is_resource_modified(request.environ, etag=etag, last_modified=ultima_alteracao):
+        resposta = current_app.response_class(status=304)
+    else:
+        resposta = make_response(renderizar())
+    resposta.set_etag(etag)
+    resposta.last_modified = ultima_alteracao
+    # private: a página é de um usuário; no-cache: o navegador guarda, mas sempre pergunta antes de usar
+    resposta.cache_control.private = True
+    resposta.cache_control.no_cache = True
+    resposta.vary.add('Cookie')
+    return resposta
+
+def versoes_painel():
+    """(unidade, versao, alterado_em) de cada unidade, na ordem das unidades."""
+    return db.session.execute(db.select(VersaoPainel.unidade, VersaoPainel.versao, VersaoPainel.alterado_em)
+                              .order_by(VersaoPainel.unidade)).all()
+
+def versao_paciente(paciente_id):
+    """(versao, alterado_em) da página do paciente, ou None se ele não existe."""
+    return db.session.execute(db.select(VersaoPaciente.versao, VersaoPaciente.alterado_em)
+                              .where(VersaoPaciente.paciente_id == paciente_id)).first()
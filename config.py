@@ -0,0 +1,85 @@
+# config.py
+import os
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DB_NAME = 'hospital.db'
+
+
+class Config:
+    """Configuração padrão, lida das variáveis de ambiente (com valores de desenvolvimento como fallback)."""
+    # Em produção SECRET_KEY deve vir do ambiente e ser a mesma em todos os workers, senão as sessões se perdem
+    SECRET_KEY = os.environ.get('SECRET_KEY', 'uma-chave-secreta-muito-segura-trocar-depois')
+    SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL', 'sqlite:///' + os.path.join(BASE_DIR, DB_NAME))
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # PRAGMAs aplicados a cada conexão SQLite: WAL deixa leitores e escritor trabalharem ao mesmo tempo,
+    # e o busy_timeout faz um escritor esperar pelo outro em vez de falhar com "database is locked".
+    SQLITE_PRAGMAS = {
+        'journal_mode': os.environ.get('SQLITE_JOURNAL_MODE', 'WAL'),
+        'synchronous': os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL'),
+        'busy_timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000)),
+        'mmap_size': int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024)),
+        'cache_size': -int(os.environ.get('SQLITE_CACHE_SIZE_KB', 20000)),  # valor negativo = tamanho em KiB
+    }
+
+    # Pool de conexões para servidores WSGI com várias threads (um banco em memória usa o pool padrão)
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 10))
+    DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 10))
+    DB_POOL_TIMEOUT = int(os.environ.get('DB_POOL_TIMEOUT', 30))
+
+    # Cache dos usuários logados (por processo): validade em segundos e número máximo de usuários
+    CACHE_USUARIOS_VALIDADE = int(os.environ.get('CACHE_USUARIOS_VALIDADE', 60))
+    CACHE_USUARIOS_TAMANHO = int(os.environ.get('CACHE_USUARIOS_TAMANHO', 256))
+
+    # Log de auditoria: o buffer é gravado a cada AUDITORIA_INTERVALO segundos ou ao juntar AUDITORIA_LOTE registros
+    # (cada lote numa transação). Com o banco recusando gravações, o buffer guarda no máximo AUDITORIA_BUFFER_MAXIMO
+    # registros por processo; acima disso os mais antigos são descartados, com erro no log.
+    AUDITORIA_INTERVALO = float(os.environ.get('AUDITORIA_INTERVALO', 2))
+    AUDITORIA_LOTE = int(os.environ.get('AUDITORIA_LOTE', 100))
+    AUDITORIA_BUFFER_MAXIMO = int(os.environ.get('AUDITORIA_BUFFER_MAXIMO', 10000))
+
+    # Cache de fragmentos HTML (painel e histórico): número de itens em memória por processo e, opcionalmente,
+    # um arquivo SQLite local compartilhado pelos workers (CACHE_FRAGMENTOS_ARQUIVO) com seu próprio limite.
+    CACHE_FRAGMENTOS_TAMANHO = int(os.environ.get('CACHE_FRAGMENTOS_TAMANHO', 2000))
+    CACHE_FRAGMENTOS_ARQUIVO = os.environ.get('CACHE_FRAGMENTOS_ARQUIVO')
+    CACHE_FRAGMENTOS_TAMANHO_ARQUIVO = int(os.environ.get('CACHE_FRAGMENTOS_TAMANHO_ARQUIVO', 20000))
+
+    # Métricas por requisição (desligadas por padrão). METRICAS_LIMITE_REPETICOES: um comando repetido mais vezes que
+    # isso na mesma requisição é registrado no log como possível N+1 (0 desliga). METRICAS_TOKEN libera o /metrics
+    # para o Prometheus (cabeçalho "Authorization: Bearer <token>"); sem ele, só administradores logados o acessam.
+    METRICAS_ATIVAS = os.environ.get('METRICAS_ATIVAS', '0') == '1'
+    METRICAS_LIMITE_REPETICOES = int(os.environ.get('METRICAS_LIMITE_REPETICOES', 10))
+    METRICAS_CONSULTAS_LENTAS = int(os.environ.get('METRICAS_CONSULTAS_LENTAS', 20))
+    METRICAS_TOKEN = os.environ.get('METRICAS_TOKEN')
+
+    # Painel ao vivo (Server-Sent Events). Cada painel aberto ocupa uma thread do worker enquanto está conectado:
+    # PAINEL_AO_VIVO_CONEXOES limita as conexões por processo, PAINEL_AO_VIVO_INTERVALO é de quantos em quantos segundos
+    # cada conexão confere as versões do painel (mudanças feitas em outros workers) e PAINEL_AO_VIVO_DURACAO encerra a
+    # conexão depois desse tempo; o navegador reconecta. Acima do limite a conexão recebe 503 (Retry-After:
+    # PAINEL_AO_VIVO_ESPERA): o navegador tenta de novo com espera crescente (de PAINEL_AO_VIVO_ESPERA até 5 minutos)
+    # e, enquanto isso, confere a página do painel (GET condicional, um 304 quando nada mudou) a cada
+    # PAINEL_AO_VIVO_REVALIDACAO segundos.
+    # Dimensionamento: cabem GUNICORN_WORKERS x PAINEL_AO_VIVO_CONEXOES painéis ao vivo. Para T tablets, use
+    # PAINEL_AO_VIVO_CONEXOES >= T / GUNICORN_WORKERS com uma folga de ~25% (as conexões não se dividem por igual entre
+    # os workers). Cada worker precisa ainda de threads livres para as demais requisições: o gunicorn.conf.py usa
+    # GUNICORN_THREADS = PAINEL_AO_VIVO_CONEXOES + GUNICORN_THREADS_REQUISICOES (8), e DB_POOL_SIZE deve cobrir essas 8
+    # (o fluxo não prende conexão do pool). Ex.: 40 tablets e 4 workers -> PAINEL_AO_VIVO_CONEXOES=12, 20 threads.
+    PAINEL_AO_VIVO_CONEXOES = int(os.environ.get('PAINEL_AO_VIVO_CONEXOES', 12))
+    PAINEL_AO_VIVO_INTERVALO = float(os.environ.get('PAINEL_AO_VIVO_INTERVALO', 5))
+    PAINEL_AO_VIVO_DURACAO = int(os.environ.get('PAINEL_AO_VIVO_DURACAO', 600))
+    PAINEL_AO_VIVO_ESPERA = int(os.environ.get('PAINEL_AO_VIVO_ESPERA', 30))
+    PAINEL_AO_VIVO_REVALIDACAO = int(os.environ.get('PAINEL_AO_VIVO_REVALIDACAO', 15))
+
+    # Anexos dos pacientes: diretório do conteúdo (fora do banco, um arquivo por SHA-256), tamanho máximo de cada
+    # arquivo e lado máximo, em pixels, das miniaturas das imagens (guardadas no mesmo diretório).
+    ANEXOS_DIRETORIO = os.environ.get('ANEXOS_DIRETORIO', os.path.join(BASE_DIR, 'anexos'))
+    ANEXOS_TAMANHO_MAXIMO_MB = int(os.environ.get('ANEXOS_TAMANHO_MAXIMO_MB', 20))
+    ANEXOS_LADO_MINIATURA = int(os.environ.get('ANEXOS_LADO_MINIATURA', 256))
+
+    # Arquivo morto: pacientes inativos há mais de ARQUIVO_MORTO_DIAS dias vão, com todo o histórico, para este outro
+    # banco SQLite (anexado às conexões) pelo comando `flask archive-patients`, em lotes de ARQUIVO_MORTO_LOTE pacientes.
+    # Vazio desliga o arquivo morto. ARQUIVO_MORTO_CACHE_KB é o cache de páginas dele em cada conexão.
+    ARQUIVO_MORTO_BANCO = os.environ.get('ARQUIVO_MORTO_BANCO', os.path.join(BASE_DIR, 'arquivo_morto.db'))
+    ARQUIVO_MORTO_DIAS = int(os.environ.get('ARQUIVO_MORTO_DIAS', 365))
+    ARQUIVO_MORTO_LOTE = int(os.environ.get('ARQUIVO_MORTO_LOTE', 200))
+    ARQUIVO_MORTO_CACHE_KB = int(os.environ.get('ARQUIVO_MORTO_CACHE_KB', 2000))
@@ -0,0 +1,70 @@
+# exportacao.py
+# Exportação de pacientes, evoluções e atendimentos em CSV ou NDJSON (um objeto JSON por linha).
+# Os registros são lidos do banco em lotes (yield_per) e escritos à medida que chegam: a memória usada
+# não depende do tamanho do histórico e os primeiros bytes saem antes de a consulta terminar.
+import csv
+import io
+import json
+from datetime import date, datetime, time, timedelta
+
+from models import db, Paciente, Evolucao, Atendimento
+
+TAMANHO_LOTE = 1000
+FORMATOS = {'csv': 'text/csv; charset=utf-8', 'ndjson': 'application/x-ndjson; charset=utf-8'}
+
+COLUNAS_EXPORTACAO = {
+    'pacientes': [
+        ('id', Paciente.id), ('nome', Paciente.nome), ('data_nascimento', Paciente.data_nascimento),
+        ('unidade', Paciente.unidade), ('leito', Paciente.leito), ('diagnostico', Paciente.diagnostico),
+        ('status', Paciente.status), ('motivo_inativacao', Paciente.motivo_inativacao),
+    ],
+    'evolucoes': [
+        ('id', Evolucao.id), ('paciente_id', Evolucao.paciente_id), ('paciente', Paciente.nome),
+        ('unidade', Paciente.unidade), ('data', Evolucao.data), ('fisio', Evolucao.fisio), ('texto', Evolucao.texto),
+    ],
+    'atendimentos': [
+        ('id', Atendimento.id), ('paciente_id', Atendimento.paciente_id), ('paciente', Paciente.nome),
+        ('unidade', Paciente.unidade), ('data', Atendimento.data),
+        ('turno_manha', Atendimento.turno_manha), ('turno_tarde', Atendimento.turno_tarde),
+    ],
+}
+
+def montar_consulta_exportacao(entidade, inicio=None, fim=None, unidade=None, status=None):
+    """Monta o SELECT da exportação. O período vale para evoluções e atendimentos; unidade e status, para o paciente."""
+    colunas = COLUNAS_EXPORTACAO[entidade]
+    consulta = db.select(*[coluna.label(nome) for nome, coluna in colunas])
+    if entidade == 'evolucoes':
+        consulta = consulta.select_from(Evolucao).join(Paciente, Paciente.id == Evolucao.paciente_id)
+        if inicio: consulta = consulta.where(Evolucao.data >= datetime.combine(inicio, time()))
+        if fim: consulta = consulta.where(Evolucao.data < datetime.combine(fim + timedelta(days=1), time()))
+    elif entidade == 'atendimentos':
+        consulta = consulta.select_from(Atendimento).join(Paciente, Paciente.id == Atendimento.paciente_id)
+        if inicio: consulta = consulta.where(Atendimento.data >= inicio)
+        if fim: consulta = consulta.where(Atendimento.data <= fim)
+    if unidade: consulta = consulta.where(Paciente.unidade == unidade)
+    if status: consulta = consulta.where(Paciente.status == status)
+    return consulta.order_by(colunas[0][1])
+
+def _valor_json(valor):
+    if isinstance(valor, (date, datetime)): return valor.isoformat()
+    raise TypeError(f"Tipo não serializável: {type(valor).__name__}")
+
+def exportar(entidade, formato, **filtros):
+    """Gera o arquivo em pedaços de texto, um por lote de registros (o primeiro é o cabeçalho do CSV)."""
+    nomes = [nome for nome, _ in COLUNAS_EXPORTACAO[entidade]]
+    resultado = db.session.execute(montar_consulta_exportacao(entidade, **filtros).execution_options(yield_per=TAMANHO_LOTE))
+    try:
+        if formato == 'csv':
+            buffer = io.StringIO()
+            escritor = csv.writer(buffer)
+            escritor.writerow(nomes)
+            yield buffer.getvalue()
+            for lote in resultado.partitions():
+                buffer.seek(0); buffer.truncate()
+                escritor.writerows(lote)
+                yield buffer.getvalue()
+        else:
+            for lote in resultado.partitions():
+                yield ''.join(json.dumps(dict(zip(nomes, linha)), ensure_ascii=False, default=_valor_json) + '\n' for linha in lote)
+    finally:
+        resultado.close()
@@ -0,0 +1,115 @@
+# gerar_dados.py
+# Gerador de um hospital sintético (unidades, leitos, pacientes, evoluções e atendimentos) para benchmarks.
+# Os registros são gravados com INSERTs em lote pelo Core do SQLAlchemy, sem passar pelo ORM.
+import random
+from datetime import date, datetime, time, timedelta
+
+from werkzeug.security import generate_password_hash
+
+from models import (db, Usuario, Paciente, Evolucao, Atendimento, Unidade, Leito, UNIDADES_PADRAO, recriar_indice_busca,
+                    texto_para_html)
+from modelos_evolucao import montar_texto
+from relatorios import reconstruir_resumos
+
+NOMES = ['Ana', 'Antônio', 'Beatriz', 'Carlos', 'Cláudia', 'Daniel', 'Eduarda', 'Fernando', 'Gabriela', 'Helena',
+         'Igor', 'João', 'José', 'Júlia', 'Lucas', 'Márcia', 'Maria', 'Paulo', 'Raquel', 'Sebastião', 'Tereza', 'Vítor']
+SOBRENOMES = ['Almeida', 'Barbosa', 'Cardoso', 'Costa', 'Fernandes', 'Gomes', 'Lima', 'Martins', 'Oliveira',
+              'Pereira', 'Ribeiro', 'Rodrigues', 'Santos', 'Silva', 'Souza']
+DIAGNOSTICOS = ['DPOC agudizado', 'Pneumonia comunitária', 'Insuficiência cardíaca', 'AVC isquêmico', 'Pós-operatório de artroplastia de quadril',
+                'Fratura de fêmur', 'Sepse de foco pulmonar', 'Asma grave', 'Traumatismo cranioencefálico', 'COVID-19']
+FRASES = ['Paciente em ar ambiente, eupneico.', 'Realizada higiene brônquica com tosse eficaz.', 'Em VM modo PCV, PEEP 8, FiO2 40%.',
+          'Sedestação à beira leito por 15 minutos.', 'Deambulou no corredor com auxílio.', 'Ausculta com roncos difusos.',
+          'Exercícios ativo-assistidos de MMII.', 'Saturação estável durante a sessão.', 'Orientado quanto ao uso do incentivador.',
+          'Queixa de dor em ferida operatória.', 'Extubado sem intercorrências.', 'Treino de marcha com andador.']
+
+TAMANHO_LOTE = 5000
+
+def _nome(rng):
+    return f"{rng.choice(NOMES)} {rng.choice(SOBRENOMES)} {rng.choice(SOBRENOMES)}"
+
+def _inserir(modelo, linhas):
+    for i in range(0, len(linhas), TAMANHO_LOTE):
+        db.session.execute(db.insert(modelo), linhas[i:i + TAMANHO_LOTE])
+
+def gerar_hospital(unidades=4, leitos=20, ocupacao=0.85, pacientes_inativos=2000, meses=12, evolucoes_por_dia=2,
+                   fisioterapeutas=15, semente=42, senha='bench123'):
+    """Popula o banco da aplicação atual (precisa de app context) e retorna um resumo do que foi criado.
+
+    Os pacientes ativos ocupam `ocupacao` dos leitos, internados nos últimos 30 dias; os inativos tiveram
+    internações de 2 a 30 dias espalhadas pelos últimos `meses`. Cada dia de internação tem uma linha de
+    atendimento e `evolucoes_por_dia` evoluções de fisioterapeutas sorteados.
+    """
+    rng = random.Random(semente)
+    hoje = date.today()
+    senha_hash = generate_password_hash(senha)
+
+    usuarios = [{'nome_completo': 'Admin Benchmark', 'email': 'admin@bench', 'senha_hash': senha_hash, 'funcao': 'admin',
+                 'status': 'Ativo', 'precisa_trocar_senha': False}]
+    usuarios += [{'nome_completo': f"Fisio {_nome(rng)}", 'email': f"fisio{i}@bench", 'senha_hash': senha_hash,
+                  'funcao': 'fisioterapeuta', 'status': 'Ativo', 'precisa_trocar_senha': False} for i in range(fisioterapeutas)]
+    _inserir(Usuario, usuarios)
+    fisios = db.session.execute(db.select(Usuario.id, Usuario.nome_completo).order_by(Usuario.id)).all()
+    fisios = fisios[1:] or fisios
+
+    nomes_unidades = [f"Unidade {i + 1}" for i in range(unidades)]
+    _inserir(Unidade, [{'nome': nome, 'ordem': len(UNIDADES_PADRAO) + i, 'leitos_fixos': True} for i, nome in enumerate(nomes_unidades, 1)])
+    _inserir(Leito, [{'unidade': nome, 'numero': f"{leito:02d}", 'ordem': leito} for nome in nomes_unidades for leito in range(1, leitos + 1)])
+    internacoes = []  # (paciente, entrada, saida); saida None = ainda internado
+    for unidade in nomes_unidades:
+        for leito in rng.sample(range(1, leitos + 1), round(leitos * ocupacao)):
+            entrada = hoje - timedelta(days=rng.randint(0, 29))
+            internacoes.append(({'unidade': unidade, 'leito': f"{leito:02d}", 'status': 'Ativo'}, entrada, None))
+    janela = max(meses * 30, 31)
+    for _ in range(pacientes_inativos):
+        entrada = hoje - timedelta(days=rng.randint(31, janela))
+        saida = min(entrada + timedelta(days=rng.randint(2, 30)), hoje - timedelta(days=1))
+        internacoes.append(({'unidade': rng.choice(nomes_unidades), 'leito': f"{rng.randint(1, leitos):02d}", 'status': 'Inativo',
+                             'motivo_inativacao': rng.choice(['Alta', 'Alta', 'Alta', 'Transferência externa', 'Óbito']), 'inativado_em': saida},
+                            entrada, saida))
+
+    pacientes = []
+    for paciente, _, _ in internacoes:
+        paciente.update(nome=_nome(rng), diagnostico=rng.choice(DIAGNOSTICOS),
+                        data_nascimento=date(rng.randint(1930, 2005), rng.randint(1, 12), rng.randint(1, 28)))
+        paciente.setdefault('motivo_inativacao', None); paciente.setdefault('inativado_em', None)
+        pacientes.append(paciente)
+    _inserir(Paciente, pacientes)
+    ids = db.session.scalars(db.select(Paciente.id).order_by(Paciente.id)).all()
+
+    evolucoes, atendimentos = [], []
+    for paciente_id, (paciente, entrada, saida) in zip(ids, internacoes):
+        # Os pacientes da primeira unidade (tratada como UTI) têm evoluções com o modelo de ventilação mecânica
+        ventilado = paciente['unidade'] == nomes_unidades[0]
+        dia = entrada
+        while dia <= (saida or hoje):
+            for i in range(evolucoes_por_dia):
+                hora = time(8 + (10 * i) // max(evolucoes_por_dia, 1), rng.randint(0, 59))
+                texto, modelo, dados = ' '.join(rng.sample(FRASES, 3)), None, None
+                if ventilado:
+                    modelo = 'ventilacao_mecanica'
+                    dados = {'modo': rng.choice(['PCV', 'PSV', 'VCV']), 'peep': rng.randint(5, 14), 'fio2': rng.randint(25, 70), 'fr': rng.randint(12, 28)}
+                    texto = montar_texto(modelo, dados, texto)
+                usuario_id, fisio = rng.choice(fisios)
+                evolucoes.append({'data': datetime.combine(dia, hora), 'fisio': fisio, 'usuario_id': usuario_id, 'paciente_id': paciente_id,
+                                  'texto': texto, 'texto_html': texto_para_html(texto), 'modelo': modelo, 'dados': dados})
+            atendimentos.append({'data': dia, 'paciente_id': paciente_id, 'turno_manha': evolucoes_por_dia >= 1, 'turno_tarde': evolucoes_por_dia >= 2})
+            dia += timedelta(days=1)
+        if len(evolucoes) >= TAMANHO_LOTE:
+            _inserir(Evolucao, evolucoes); evolucoes = []
+        if len(atendimentos) >= TAMANHO_LOTE:
+            _inserir(Atendimento, atendimentos); atendimentos = []
+    _inserir(Evolucao, evolucoes)
+    _inserir(Atendimento, atendimentos)
+    db.session.commit()
+
+    recriar_indice_busca()
+    reconstruir_resumos()
+    return {
+        'usuarios': len(usuarios),
+        'unidades': unidades,
+        'leitos': unidades * leitos,
+        'pacientes_ativos': sum(1 for _, _, saida in internacoes if saida is None),
+        'pacientes_inativos': pacientes_inativos,
+        'evolucoes': db.session.scalar(db.select(db.func.count()).select_from(Evolucao)),
+        'atendimentos': db.session.scalar(db.select(db.func.count()).select_from(Atendimento)),
+    }
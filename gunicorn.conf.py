@@ -0,0 +1,48 @@
+# gunicorn.conf.py
+# Configuração do gunicorn para o Passa Plantão: gunicorn -c gunicorn.conf.py wsgi:app
+import multiprocessing
+import os
+
+from config import Config
+
+# Com vários workers a chave precisa ser a mesma em todos (e entre reinícios), senão as sessões são perdidas
+if not os.environ.get('SECRET_KEY'):
+    raise RuntimeError('Defina a variável de ambiente SECRET_KEY antes de iniciar o servidor de produção.')
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+
+# Workers gthread: poucos processos com várias threads cada. O SQLite aceita um único escritor por vez,
+# então mais processos não aumentam a vazão de escrita; as threads atendem as leituras (WAL) em paralelo
+# e cada processo usa seu próprio pool de conexões (DB_POOL_SIZE deve ser >= threads).
+worker_class = 'gthread'
+workers = int(os.environ.get('GUNICORN_WORKERS', min(multiprocessing.cpu_count(), 4)))
+# Cada painel ao vivo conectado (/painel/eventos) ocupa uma thread enquanto está aberto, mas não uma conexão do
+# pool. As threads são as PAINEL_AO_VIVO_CONEXOES dos painéis mais GUNICORN_THREADS_REQUISICOES para as demais
+# requisições (dimensionamento para os tablets de uma unidade: ver config.py).
+conexoes_painel = Config.PAINEL_AO_VIVO_CONEXOES
+threads = int(os.environ.get('GUNICORN_THREADS', conexoes_painel + int(os.environ.get('GUNICORN_THREADS_REQUISICOES', 8))))
+if threads <= conexoes_painel:
+    raise RuntimeError(f'GUNICORN_THREADS ({threads}) precisa ser maior que PAINEL_AO_VIVO_CONEXOES ({conexoes_painel}): '
+                       'com os painéis ao vivo ocupando todas as threads, as outras requisições ficam sem resposta.')
+
+# O timeout fica bem acima do busy_timeout do SQLite (SQLITE_BUSY_TIMEOUT_MS, 5 s por padrão), para que uma
+# requisição esperando pelo lock de escrita não seja morta no meio da transação.
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = 5
+
+# Recicla os workers de tempos em tempos para conter vazamentos de memória
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 2000))
+max_requests_jitter = 200
+
+# Cada worker cria o próprio engine depois do fork (conexões SQLite não podem ser compartilhadas entre processos)
+preload_app = False
+
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG', '-')
+errorlog = '-'
+
+
+def worker_exit(server, worker):
+    # Grava os registros de auditoria ainda no buffer antes de o worker terminar (reinício, max_requests, SIGTERM)
+    from auditoria import escritor_auditoria
+    escritor_auditoria.descarregar()
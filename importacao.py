@@ -0,0 +1,163 @@
+# importacao.py
+# Importação do censo (internações, transferências e altas) a partir de um CSV, pelo comando `flask import-census`.
+# As linhas são aplicadas em lotes, um lote por transação. O mapa de leitos e a ocupação são carregados uma vez e
+# mantidos em memória, e os pacientes de cada lote são buscados numa consulta só pelo par (nome, data de nascimento),
+# em vez das consultas e do commit por paciente do formulário de cadastro.
+import csv
+from collections import Counter
+from datetime import date, datetime
+
+from sqlalchemy.exc import IntegrityError
+
+from arquivo_morto import arquivo_morto
+from leitos import carregar_mapa, leito_ocupado, validar_leito
+from models import db, Paciente, OcupacaoLeito
+from relatorios import atualizar_resumo_atendimentos
+
+TAMANHO_LOTE = 500
+COLUNAS_OBRIGATORIAS = ['acao', 'nome', 'data_nascimento']
+# Colunas opcionais: unidade, leito, diagnostico e motivo (da alta)
+ACOES = {'internacao': 'internacao', 'internação': 'internacao', 'transferencia': 'transferencia',
+         'transferência': 'transferencia', 'alta': 'alta'}
+
+def ler_data(valor):
+    # DD/MM/AAAA, como nos formulários, ou AAAA-MM-DD, como sai da exportação
+    for formato in ('%d/%m/%Y', '%Y-%m-%d'):
+        try:
+            return datetime.strptime(valor, formato).date()
+        except ValueError:
+            pass
+    return None
+
+def ler_censo(arquivo):
+    """Gera (número da linha, {coluna: valor}) a partir do CSV aberto; aceita vírgula ou ponto e vírgula como separador."""
+    amostra = arquivo.read(4096); arquivo.seek(0)
+    try:
+        dialeto = csv.Sniffer().sniff(amostra, delimiters=',;')
+    except csv.Error:
+        dialeto = csv.excel
+    leitor = csv.DictReader(arquivo, dialect=dialeto)
+    faltando = [coluna for coluna in COLUNAS_OBRIGATORIAS if coluna not in (leitor.fieldnames or [])]
+    if faltando: raise ValueError(f"Colunas obrigatórias ausentes no CSV: {', '.join(faltando)}.")
+    for linha in leitor:
+        yield leitor.line_num, {coluna: (valor or '').strip() for coluna, valor in linha.items() if coluna}
+
+def _lotes(linhas, tamanho):
+    lote = []
+    for linha in linhas:
+        lote.append(linha)
+        if len(lote) == tamanho:
+            yield lote; lote = []
+    if lote: yield lote
+
+def _ocupados():
+    return set(db.session.execute(db.select(OcupacaoLeito.unidade, OcupacaoLeito.leito)).all())
+
+class _Lote:
+    """Aplica as linhas de um lote na sessão, validando contra o mapa de leitos e a ocupação em memória."""
+    def __init__(self, linhas, mapa, ocupados):
+        self.linhas, self.mapa, self.ocupados = linhas, mapa, ocupados
+        self.contagem, self.erros = Counter(), []
+        self.liberados = set()  # leitos desocupados neste lote desde o último flush
+
+    def aplicar(self):
+        datas = {numero: ler_data(linha['data_nascimento']) for numero, linha in self.linhas}
+        chaves = {(linha['nome'], datas[numero]) for numero, linha in self.linhas if datas[numero]}
+        self.pacientes = {}
+        if chaves:
+            # Um paciente ativo tem preferência sobre cadastros inativos com o mesmo nome e data de nascimento
+            for paciente in db.session.scalars(db.select(Paciente).where(db.tuple_(Paciente.nome, Paciente.data_nascimento).in_(chaves))
+                                               .order_by((Paciente.status == 'Ativo').desc(), Paciente.id)):
+                self.pacientes.setdefault((paciente.nome, paciente.data_nascimento), paciente)
+        # Internação de quem está no arquivo morto: o paciente volta com o histórico, na transação do lote
+        internacoes = {(linha['nome'], datas[numero]) for numero, linha in self.linhas
+                       if datas[numero] and ACOES.get(linha['acao'].lower()) == 'internacao'}
+        arquivados = arquivo_morto.buscar(internacoes - set(self.pacientes))
+        if arquivados:
+            arquivo_morto.restaurar(arquivados)
+            for paciente in db.session.scalars(db.select(Paciente).where(Paciente.id.in_(arquivados))):
+                self.pacientes.setdefault((paciente.nome, paciente.data_nascimento), paciente)
+        for numero, linha in self.linhas:
+            acao = ACOES.get(linha['acao'].lower())
+            if acao is None: erro = f"Ação '{linha['acao']}' desconhecida (use internacao, transferencia ou alta)."
+            elif not linha['nome']: erro = 'Informe o nome do paciente.'
+            elif not datas[numero]: erro = 'Data de nascimento inválida. Use o formato DD/MM/AAAA.'
+            else: erro = getattr(self, acao)(linha, (linha['nome'], datas[numero]))
+            if erro: self.erros.append((numero, erro))
+        if self.contagem['transferencias']: atualizar_resumo_atendimentos(date.today())
+
+    def _ocupar(self, paciente, unidade, leito):
+        if (unidade, leito) in self.liberados:
+            # O UPDATE de quem saiu precisa chegar ao banco antes, senão o índice do leito ativo acusa conflito
+            db.session.flush(); self.liberados.clear()
+        paciente.unidade, paciente.leito = unidade, leito
+        self.ocupados.add((unidade, leito))
+
+    def _liberar(self, paciente):
+        self.ocupados.discard((paciente.unidade, paciente.leito))
+        self.liberados.add((paciente.unidade, paciente.leito))
+
+    def internacao(self, linha, chave):
+        paciente = self.pacientes.get(chave)
+        if paciente is not None and paciente.status == 'Ativo': return f"O paciente '{linha['nome']}' já está ativo."
+        unidade, leito = linha.get('unidade', ''), linha.get('leito', '')
+        erro = validar_leito(unidade, leito, self.mapa)
+        if erro: return erro
+        if (unidade, leito) in self.ocupados: return f"O leito {leito} na {unidade} já está ocupado."
+        if paciente is None:
+            paciente = Paciente(nome=chave[0], data_nascimento=chave[1], diagnostico=linha.get('diagnostico') or None, status='Ativo')
+            self._ocupar(paciente, unidade, leito)
+            db.session.add(paciente); self.pacientes[chave] = paciente
+            self.contagem['internacoes'] += 1
+        else:
+            self._ocupar(paciente, unidade, leito)
+            paciente.status, paciente.motivo_inativacao, paciente.inativado_em = 'Ativo', None, None
+            if linha.get('diagnostico'): paciente.diagnostico = linha['diagnostico']
+            self.contagem['reativacoes'] += 1
+
+    def transferencia(self, linha, chave):
+        paciente = self.pacientes.get(chave)
+        if paciente is None or paciente.status != 'Ativo': return f"O paciente '{linha['nome']}' não está internado."
+        unidade, leito = linha.get('unidade', ''), linha.get('leito') or paciente.leito
+        erro = validar_leito(unidade, leito, self.mapa)
+        if erro: return erro
+        if (unidade, leito) == (paciente.unidade, paciente.leito): return None
+        if (unidade, leito) in self.ocupados: return f"O leito {leito} na {unidade} já está ocupado."
+        self._liberar(paciente)
+        self._ocupar(paciente, unidade, leito)
+        self.contagem['transferencias'] += 1
+
+    def alta(self, linha, chave):
+        paciente = self.pacientes.get(chave)
+        if paciente is None or paciente.status != 'Ativo': return f"O paciente '{linha['nome']}' não está internado."
+        self._liberar(paciente)
+        paciente.status, paciente.motivo_inativacao, paciente.inativado_em = 'Inativo', (linha.get('motivo') or 'Alta')[:100], date.today()
+        self.contagem['altas'] += 1
+
+def importar_censo(linhas, tamanho_lote=TAMANHO_LOTE, simular=False):
+    """Aplica as linhas de ler_censo() em lotes de `tamanho_lote`, com um commit por lote.
+
+    Linhas inválidas são puladas e voltam em `erros` [(número da linha, mensagem)]. Um lote que esbarra num leito
+    ocupado por outra gravação ao mesmo tempo é desfeito inteiro e também vai para `erros`. Com `simular` tudo roda
+    numa transação só, desfeita no fim (as escritas do banco ficam bloqueadas até lá). Devolve (contagem, erros).
+    """
+    mapa, ocupados = carregar_mapa(), _ocupados()
+    contagem, erros = Counter(), []
+    try:
+        for linhas_lote in _lotes(linhas, tamanho_lote):
+            lote = _Lote(linhas_lote, mapa, ocupados)
+            try:
+                lote.aplicar()
+                if simular: db.session.flush()
+                else: db.session.commit()
+            except IntegrityError as erro:
+                if simular or not leito_ocupado(erro): raise
+                db.session.rollback()
+                ocupados = _ocupados()
+                erros.append((linhas_lote[0][0], f"Lote das linhas {linhas_lote[0][0]} a {linhas_lote[-1][0]} desfeito: "
+                                                 "um dos leitos foi ocupado por outra gravação. Importe essas linhas de novo."))
+                continue
+            contagem.update(lote.contagem); erros.extend(lote.erros)
+    finally:
+        if simular: db.session.rollback()
+    return contagem, erros
@@ -0,0 +1,71 @@
+# leitos.py
+# Regras de leitos do lado do servidor (antes só existiam no form_paciente.js) e censo de ocupação.
+# O mapa vem das tabelas unidades/leitos; a ocupação, da tabela ocupacao_leitos, mantida por triggers em pacientes.
+# Que um leito tenha um único paciente ativo continua garantido pelo índice uq_pacientes_leito_ativo.
+from models import db, Unidade, Leito, OcupacaoLeito
+
+def listar_unidades():
+    return db.session.scalars(db.select(Unidade).order_by(Unidade.ordem, Unidade.nome)).all()
+
+def carregar_mapa(unidade=None):
+    """{unidade: números dos leitos (set), ou None nas unidades de leito livre}; de todas as unidades ou de uma só."""
+    unidades = db.select(Unidade.nome, Unidade.leitos_fixos)
+    leitos = db.select(Leito.unidade, Leito.numero)
+    if unidade is not None:
+        unidades, leitos = unidades.where(Unidade.nome == unidade), leitos.where(Leito.unidade == unidade)
+    mapa = {nome: set() if leitos_fixos else None for nome, leitos_fixos in db.session.execute(unidades)}
+    for nome, numero in db.session.execute(leitos):
+        if mapa.get(nome) is not None: mapa[nome].add(numero)
+    return mapa
+
+def validar_leito(unidade, leito, mapa=None):
+    """Mensagem de erro se `leito` não pode ser usado na `unidade`, ou None se pode.
+
+    Para validar muitos leitos (importação do censo), passe o `mapa` de carregar_mapa() e nada é consultado.
+    """
+    if mapa is None: mapa = carregar_mapa(unidade)
+    if unidade not in mapa:
+        return f"A unidade '{unidade}' não está cadastrada."
+    if not leito:
+        return 'Informe o leito.'
+    if mapa[unidade] is not None and leito not in mapa[unidade]:
+        return f"O leito {leito} não existe na {unidade}."
+    return None
+
+# Mensagem do SQLite quando o índice uq_pacientes_leito_ativo é violado
+_ERRO_LEITO_OCUPADO = 'UNIQUE constraint failed: pacientes.unidade, pacientes.leito'
+
+def leito_ocupado(erro):
+    """Se a IntegrityError `erro` veio do índice uq_pacientes_leito_ativo (e não de outra restrição)."""
+    return _ERRO_LEITO_OCUPADO in str(erro.orig)
+
+def censo(unidade=None, paciente_id=None):
+    """Ocupação por unidade, na ordem das unidades: capacidade (None para leitos de texto livre), ocupados e livres.
+
+    Com `paciente_id`, o leito desse paciente conta como livre (para o seletor de leitos de quem está sendo
+    editado ou transferido). São três consultas pequenas, sem percorrer a tabela de pacientes.
+    """
+    unidades = db.select(Unidade).order_by(Unidade.ordem, Unidade.nome)
+    if unidade is not None: unidades = unidades.where(Unidade.nome == unidade)
+    unidades = db.session.scalars(unidades).all()
+    nomes = [registro.nome for registro in unidades]
+
+    ocupacao = db.select(OcupacaoLeito.unidade, db.func.count()).where(OcupacaoLeito.unidade.in_(nomes))
+    if paciente_id is not None: ocupacao = ocupacao.where(OcupacaoLeito.paciente_id != paciente_id)
+    ocupados = dict(db.session.execute(ocupacao.group_by(OcupacaoLeito.unidade)).all())
+
+    condicao = db.and_(OcupacaoLeito.unidade == Leito.unidade, OcupacaoLeito.leito == Leito.numero)
+    if paciente_id is not None: condicao = db.and_(condicao, OcupacaoLeito.paciente_id != paciente_id)
+    livres, capacidade = {}, {}
+    for nome, numero, ocupante in db.session.execute(
+            db.select(Leito.unidade, Leito.numero, OcupacaoLeito.paciente_id).outerjoin(OcupacaoLeito, condicao)
+            .where(Leito.unidade.in_(nomes)).order_by(Leito.unidade, Leito.ordem)):
+        capacidade[nome] = capacidade.get(nome, 0) + 1
+        if ocupante is None: livres.setdefault(nome, []).append(numero)
+
+    return [{'unidade': registro.nome,
+             'leitos_fixos': registro.leitos_fixos,
+             'capacidade': capacidade.get(registro.nome, 0) if registro.leitos_fixos else None,
+             'ocupados': ocupados.get(registro.nome, 0),
+             'livres': livres.get(registro.nome, []) if registro.leitos_fixos else None}
+            for registro in unidades]
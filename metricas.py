@@ -0,0 +1,139 @@
+# metricas.py
+# Instrumentação opcional (METRICAS_ATIVAS=1): latência, número de consultas e tempo de SQL por endpoint,
+# as consultas mais lentas e os padrões N+1 (o mesmo comando repetido muitas vezes numa requisição).
+# Os números ficam em memória, por processo; com vários workers do gunicorn cada um tem os seus (rótulo "worker").
+import heapq
+import os
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime
+
+from flask import g, has_app_context, request
+from sqlalchemy import event
+
+from models import db
+
+FAIXAS_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+class EstatisticaEndpoint:
+    def __init__(self):
+        self.requisicoes = 0
+        self.segundos = 0.0
+        self.maximo = 0.0
+        self.consultas = 0
+        self.segundos_sql = 0.0
+        self.n_mais_1 = 0
+        self.faixas = [0] * len(FAIXAS_LATENCIA)
+
+    def registrar(self, duracao, consultas, segundos_sql, n_mais_1):
+        self.requisicoes += 1
+        self.segundos += duracao
+        self.maximo = max(self.maximo, duracao)
+        self.consultas += consultas
+        self.segundos_sql += segundos_sql
+        self.n_mais_1 += n_mais_1
+        for i, limite in enumerate(FAIXAS_LATENCIA):
+            if duracao <= limite: self.faixas[i] += 1
+
+class Metricas:
+    """Coleta as métricas das requisições a partir dos hooks do Flask e dos eventos de cursor do SQLAlchemy."""
+    def __init__(self):
+        self.ativo = False
+        self._lock = threading.Lock()
+        self.zerar()
+
+    def init_app(self, app):
+        self.ativo = app.config['METRICAS_ATIVAS']
+        if not self.ativo: return
+        self.limite_repeticoes = app.config['METRICAS_LIMITE_REPETICOES']
+        self.tamanho_lentas = app.config['METRICAS_CONSULTAS_LENTAS']
+        app.before_request(self._inicio_requisicao)
+        app.teardown_request(self._fim_requisicao)
+        self._logger = app.logger
+        with app.app_context():
+            event.listen(db.engine, 'before_cursor_execute', self._antes_do_comando)
+            event.listen(db.engine, 'after_cursor_execute', self._depois_do_comando)
+
+    def zerar(self):
+        with self._lock:
+            self.endpoints = {}
+            self.lentas = []  # heap (duração, ordem, comando, endpoint, data) com as mais lentas
+            self.ocorrencias_n_mais_1 = deque(maxlen=50)
+            self.desde = datetime.now()
+            self._ordem = 0
+
+    # --- Hooks ---
+    def _inicio_requisicao(self):
+        g._metricas = {'inicio': time.perf_counter(), 'consultas': 0, 'segundos_sql': 0.0, 'comandos': Counter()}
+
+    def _antes_do_comando(self, conexao, cursor, comando, parametros, contexto, executemany):
+        if contexto is not None: contexto._inicio_metricas = time.perf_counter()
+
+    def _depois_do_comando(self, conexao, cursor, comando, parametros, contexto, executemany):
+        inicio = getattr(contexto, '_inicio_metricas', None)
+        if inicio is None or not has_app_context(): return
+        estado = g.get('_metricas')
+        if estado is None: return  # comando fora de uma requisição (CLI, thread da auditoria)
+        duracao = time.perf_counter() - inicio
+        estado['consultas'] += 1
+        estado['segundos_sql'] += duracao
+        estado['comandos'][comando] += 1
+        with self._lock:
+            if len(self.lentas) < self.tamanho_lentas or duracao > self.lentas[0][0]:
+                self._ordem += 1
+                item = (duracao, self._ordem, comando[:1000], request.endpoint, datetime.now())
+                if len(self.lentas) < self.tamanho_lentas: heapq.heappush(self.lentas, item)
+                else: heapq.heapreplace(self.lentas, item)
+
+    def _fim_requisicao(self, erro=None):
+        estado = g.pop('_metricas', None)
+        if estado is None or request.endpoint in (None, 'static'): return
+        duracao = time.perf_counter() - estado['inicio']
+        repetidos = [(comando, vezes) for comando, vezes in estado['comandos'].items()
+                     if self.limite_repeticoes and vezes > self.limite_repeticoes]
+        for comando, vezes in repetidos:
+            self._logger.warning('Possível N+1 em %s: comando executado %d vezes na mesma requisição: %s',
+                                 request.endpoint, vezes, ' '.join(comando.split())[:300])
+        with self._lock:
+            self.endpoints.setdefault(request.endpoint, EstatisticaEndpoint()).registrar(
+                duracao, estado['consultas'], estado['segundos_sql'], len(repetidos))
+            for comando, vezes in repetidos:
+                self.ocorrencias_n_mais_1.append((datetime.now(), request.endpoint, vezes, comando[:1000]))
+
+    # --- Leitura ---
+    def por_endpoint(self):
+        """Endpoints ordenados pelo tempo total gasto, do maior para o menor."""
+        with self._lock:
+            return sorted(self.endpoints.items(), key=lambda item: item[1].segundos, reverse=True)
+
+    def consultas_lentas(self):
+        with self._lock:
+            return sorted(self.lentas, reverse=True)
+
+    def texto_prometheus(self):
+        """Exporta os contadores no formato de texto do Prometheus."""
+        worker = os.getpid()
+        linhas = [
+            '# HELP passa_plantao_requisicao_duracao_segundos Latência das requisições por endpoint.',
+            '# TYPE passa_plantao_requisicao_duracao_segundos histogram',
+        ]
+        with self._lock:
+            endpoints = sorted(self.endpoints.items())
+            for endpoint, est in endpoints:
+                rotulos = f'endpoint="{endpoint}",worker="{worker}"'
+                for limite, quantidade in zip(FAIXAS_LATENCIA, est.faixas):
+                    linhas.append(f'passa_plantao_requisicao_duracao_segundos_bucket{{{rotulos},le="{limite}"}} {quantidade}')
+                linhas.append(f'passa_plantao_requisicao_duracao_segundos_bucket{{{rotulos},le="+Inf"}} {est.requisicoes}')
+                linhas.append(f'passa_plantao_requisicao_duracao_segundos_sum{{{rotulos}}} {est.segundos:.6f}')
+                linhas.append(f'passa_plantao_requisicao_duracao_segundos_count{{{rotulos}}} {est.requisicoes}')
+            for nome, ajuda, atributo, formato in [
+                    ('passa_plantao_consultas_sql_total', 'Comandos SQL executados, por endpoint.', 'consultas', '{}'),
+                    ('passa_plantao_sql_duracao_segundos_total', 'Tempo gasto em SQL, por endpoint.', 'segundos_sql', '{:.6f}'),
+                    ('passa_plantao_n_mais_1_total', 'Requisições com comando repetido acima do limite, por endpoint.', 'n_mais_1', '{}')]:
+                linhas += [f'# HELP {nome} {ajuda}', f'# TYPE {nome} counter']
+                for endpoint, est in endpoints:
+                    linhas.append(f'{nome}{{endpoint="{endpoint}",worker="{worker}"}} ' + formato.format(getattr(est, atributo)))
+        return '\n'.join(linhas) + '\n'
+
+metricas = Metricas()
@@ -0,0 +1,53 @@
+"""Liga as evoluções ao usuário
+
+Revision ID: 0c5fe80761b1
+Revises: 47bffe23c3dd
+Create Date: 2026-10-18 21:04:14.207431
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0c5fe80761b1'
+down_revision = '47bffe23c3dd'
+branch_labels = None
+depends_on = None
+
+TAMANHO_LOTE = 5000
+
+
+def preencher_em_lotes():
+    """Preenche evolucoes.usuario_id pelo nome gravado em fisio, em lotes pela chave primária.
+
+    Nomes que não correspondem a exatamente um usuário (renomeados ou repetidos) ficam com usuario_id nulo.
+    """
+    conexao = op.get_bind()
+    usuarios = conexao.execute(sa.text("SELECT nome_completo, MIN(id) FROM usuarios GROUP BY nome_completo HAVING COUNT(*) = 1")).fetchall()
+    usuario_por_nome = dict(usuarios)
+    ultimo_id = 0
+    while True:
+        linhas = conexao.execute(
+            sa.text("SELECT id, fisio FROM evolucoes WHERE id > :ultimo_id ORDER BY id LIMIT :lote"),
+            {'ultimo_id': ultimo_id, 'lote': TAMANHO_LOTE}).fetchall()
+        if not linhas:
+            break
+        parametros = [{'id': id_, 'usuario_id': usuario_por_nome[fisio]} for id_, fisio in linhas if fisio in usuario_por_nome]
+        if parametros:
+            conexao.execute(sa.text("UPDATE evolucoes SET usuario_id = :usuario_id WHERE id = :id"), parametros)
+        ultimo_id = linhas[-1][0]
+
+
+# ADD/DROP COLUMN simples, sem batch_alter_table: recriar evolucoes apagaria os triggers da busca e das versões.
+# O SQLite aceita REFERENCES num ADD COLUMN quando a coluna pode ser nula.
+def upgrade():
+    op.execute("ALTER TABLE evolucoes ADD COLUMN usuario_id INTEGER REFERENCES usuarios (id)")
+    preencher_em_lotes()
+    # O índice é criado depois do preenchimento, numa passada só, em vez de ser atualizado a cada lote
+    op.create_index('ix_evolucoes_usuario_id_data', 'evolucoes', ['usuario_id', 'data'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_evolucoes_usuario_id_data', table_name='evolucoes')
+    op.drop_column('evolucoes', 'usuario_id')
@@ -0,0 +1,123 @@
+"""Converte datas de texto para DATE
+
+Revision ID: 1c6986e82577
+Revises: ebc08aaedbec
+Create Date: 2026-10-18 11:26:05.917342
+
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '1c6986e82577'
+down_revision = 'ebc08aaedbec'
+branch_labels = None
+depends_on = None
+
+TAMANHO_LOTE = 1000
+
+# Recriar a tabela pacientes (batch_alter_table no SQLite) apaga os triggers do índice de busca
+TRIGGERS_BUSCA_PACIENTES = [
+    """CREATE TRIGGER busca_pacientes_ai AFTER INSERT ON pacientes BEGIN
+        INSERT INTO busca_pacientes(rowid, nome, diagnostico) VALUES (new.id, new.nome, new.diagnostico);
+    END""",
+    """CREATE TRIGGER busca_pacientes_ad AFTER DELETE ON pacientes BEGIN
+        INSERT INTO busca_pacientes(busca_pacientes, rowid, nome, diagnostico) VALUES ('delete', old.id, old.nome, old.diagnostico);
+    END""",
+    """CREATE TRIGGER busca_pacientes_au AFTER UPDATE OF nome, diagnostico ON pacientes BEGIN
+        INSERT INTO busca_pacientes(busca_pacientes, rowid, nome, diagnostico) VALUES ('delete', old.id, old.nome, old.diagnostico);
+        INSERT INTO busca_pacientes(rowid, nome, diagnostico) VALUES (new.id, new.nome, new.diagnostico);
+    END""",
+]
+
+
+def recriar_triggers_busca_pacientes():
+    for trigger in ['busca_pacientes_ai', 'busca_pacientes_ad', 'busca_pacientes_au']:
+        op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    for comando in TRIGGERS_BUSCA_PACIENTES:
+        op.execute(comando)
+
+
+def converter_em_lotes(converter):
+    """Reescreve pacientes.data_nascimento em lotes, percorrendo a tabela pela chave primária."""
+    conexao = op.get_bind()
+    ultimo_id, invalidos = 0, []
+    while True:
+        linhas = conexao.execute(
+            sa.text("SELECT id, data_nascimento FROM pacientes WHERE id > :ultimo_id ORDER BY id LIMIT :lote"),
+            {'ultimo_id': ultimo_id, 'lote': TAMANHO_LOTE}).fetchall()
+        if not linhas:
+            break
+        atualizacoes = []
+        for id_, valor in linhas:
+            convertido = converter(valor)
+            if convertido is None:
+                invalidos.append(id_)
+            elif convertido != valor:
+                atualizacoes.append({'id': id_, 'valor': convertido})
+        if atualizacoes:
+            conexao.execute(sa.text("UPDATE pacientes SET data_nascimento = :valor WHERE id = :id"), atualizacoes)
+        ultimo_id = linhas[-1][0]
+    if invalidos:
+        raise RuntimeError(f"Datas de nascimento inválidas nos pacientes {invalidos}; corrija-as e rode a migração novamente.")
+
+
+def br_para_iso(valor):
+    # Aceita também valores já convertidos, para que a migração possa ser repetida após uma correção
+    for formato in ('%d/%m/%Y', '%Y-%m-%d'):
+        try:
+            return datetime.strptime((valor or '').strip(), formato).date().isoformat()
+        except ValueError:
+            pass
+    return None
+
+
+def iso_para_br(valor):
+    try:
+        return datetime.strptime(valor, '%Y-%m-%d').strftime('%d/%m/%Y')
+    except (ValueError, TypeError):
+        return valor
+
+
+def upgrade():
+    # DATE no SQLite é texto ISO (AAAA-MM-DD); atendimentos.data já está nesse formato
+    converter_em_lotes(br_para_iso)
+
+    # reflect_args declara as colunas já como Date: sem isso o batch copiaria os dados com
+    # CAST(... AS DATE), que no SQLite transforma '1950-03-01' no número 1950.
+    with op.batch_alter_table('pacientes', schema=None,
+                              reflect_args=[sa.Column('data_nascimento', sa.Date(), nullable=False)]) as batch_op:
+        batch_op.alter_column('data_nascimento',
+               existing_type=sa.VARCHAR(length=10),
+               type_=sa.Date(),
+               existing_nullable=False)
+    recriar_triggers_busca_pacientes()
+
+    with op.batch_alter_table('atendimentos', schema=None,
+                              reflect_args=[sa.Column('data', sa.Date(), nullable=False)]) as batch_op:
+        batch_op.alter_column('data',
+               existing_type=sa.VARCHAR(length=10),
+               type_=sa.Date(),
+               existing_nullable=False)
+        batch_op.create_index('ix_atendimentos_data', ['data'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('atendimentos', schema=None) as batch_op:
+        batch_op.drop_index('ix_atendimentos_data')
+        batch_op.alter_column('data',
+               existing_type=sa.Date(),
+               type_=sa.VARCHAR(length=10),
+               existing_nullable=False)
+
+    with op.batch_alter_table('pacientes', schema=None) as batch_op:
+        batch_op.alter_column('data_nascimento',
+               existing_type=sa.Date(),
+               type_=sa.VARCHAR(length=10),
+               existing_nullable=False)
+    recriar_triggers_busca_pacientes()
+
+    converter_em_lotes(iso_para_br)
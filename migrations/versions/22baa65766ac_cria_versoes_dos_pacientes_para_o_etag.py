@@ -0,0 +1,95 @@
+"""Cria versões dos pacientes e data de alteração para o ETag
+
+Revision ID: 22baa65766ac
+Revises: cbc9ea0a7827
+Create Date: 2026-10-18 18:20:37.104226
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '22baa65766ac'
+down_revision = 'cbc9ea0a7827'
+branch_labels = None
+depends_on = None
+
+AGORA = "((julianday('now') - 2440587.5) * 86400.0)"
+
+
+def triggers_versoes_painel(incrementar, incrementar_atendimento):
+    return {
+        'versoes_painel_pacientes_ai': f"CREATE TRIGGER versoes_painel_pacientes_ai AFTER INSERT ON pacientes BEGIN {incrementar.format(unidade='new.unidade')} END",
+        'versoes_painel_pacientes_au': f"""CREATE TRIGGER versoes_painel_pacientes_au AFTER UPDATE ON pacientes BEGIN
+            {incrementar.format(unidade='old.unidade')}
+            {incrementar.format(unidade='new.unidade')}
+        END""",
+        'versoes_painel_pacientes_ad': f"CREATE TRIGGER versoes_painel_pacientes_ad AFTER DELETE ON pacientes BEGIN {incrementar.format(unidade='old.unidade')} END",
+        'versoes_painel_atendimentos_ai': f"CREATE TRIGGER versoes_painel_atendimentos_ai AFTER INSERT ON atendimentos BEGIN {incrementar_atendimento.format(paciente_id='new.paciente_id')} END",
+        'versoes_painel_atendimentos_au': f"CREATE TRIGGER versoes_painel_atendimentos_au AFTER UPDATE ON atendimentos BEGIN {incrementar_atendimento.format(paciente_id='new.paciente_id')} END",
+        'versoes_painel_atendimentos_ad': f"CREATE TRIGGER versoes_painel_atendimentos_ad AFTER DELETE ON atendimentos BEGIN {incrementar_atendimento.format(paciente_id='old.paciente_id')} END",
+    }
+
+
+# Triggers de versoes_painel antes (800506e127a8) e depois desta migração, que passa a gravar alterado_em
+TRIGGERS_PAINEL_ANTIGOS = triggers_versoes_painel(
+    "INSERT INTO versoes_painel (unidade, versao) VALUES ({unidade}, 1) ON CONFLICT (unidade) DO UPDATE SET versao = versao + 1;",
+    "INSERT INTO versoes_painel (unidade, versao) SELECT unidade, 1 FROM pacientes WHERE id = {paciente_id} "
+    "ON CONFLICT (unidade) DO UPDATE SET versao = versao + 1;")
+TRIGGERS_PAINEL = triggers_versoes_painel(
+    f"INSERT INTO versoes_painel (unidade, versao, alterado_em) VALUES ({{unidade}}, 1, {AGORA}) "
+    "ON CONFLICT (unidade) DO UPDATE SET versao = versao + 1, alterado_em = excluded.alterado_em;",
+    f"INSERT INTO versoes_painel (unidade, versao, alterado_em) SELECT unidade, 1, {AGORA} FROM pacientes WHERE id = {{paciente_id}} "
+    "ON CONFLICT (unidade) DO UPDATE SET versao = versao + 1, alterado_em = excluded.alterado_em;")
+
+INCREMENTAR_VERSAO_PACIENTE = (f"INSERT INTO versoes_paciente (paciente_id, versao, alterado_em) VALUES ({{paciente_id}}, 1, {AGORA}) "
+                               "ON CONFLICT (paciente_id) DO UPDATE SET versao = versao + 1, alterado_em = excluded.alterado_em;")
+INCREMENTAR_VERSAO_EVOLUCAO = f"UPDATE versoes_paciente SET versao = versao + 1, alterado_em = {AGORA} WHERE paciente_id = {{paciente_id}};"
+
+TRIGGERS_PACIENTE = {
+    'versoes_paciente_pacientes_ai': f"CREATE TRIGGER versoes_paciente_pacientes_ai AFTER INSERT ON pacientes BEGIN {INCREMENTAR_VERSAO_PACIENTE.format(paciente_id='new.id')} END",
+    'versoes_paciente_pacientes_au': f"CREATE TRIGGER versoes_paciente_pacientes_au AFTER UPDATE ON pacientes BEGIN {INCREMENTAR_VERSAO_PACIENTE.format(paciente_id='new.id')} END",
+    'versoes_paciente_pacientes_ad': "CREATE TRIGGER versoes_paciente_pacientes_ad AFTER DELETE ON pacientes BEGIN DELETE FROM versoes_paciente WHERE paciente_id = old.id; END",
+    'versoes_paciente_evolucoes_ai': f"CREATE TRIGGER versoes_paciente_evolucoes_ai AFTER INSERT ON evolucoes BEGIN {INCREMENTAR_VERSAO_EVOLUCAO.format(paciente_id='new.paciente_id')} END",
+    'versoes_paciente_evolucoes_au': f"""CREATE TRIGGER versoes_paciente_evolucoes_au AFTER UPDATE ON evolucoes BEGIN
+            {INCREMENTAR_VERSAO_EVOLUCAO.format(paciente_id='old.paciente_id')}
+            {INCREMENTAR_VERSAO_EVOLUCAO.format(paciente_id='new.paciente_id')}
+        END""",
+    'versoes_paciente_evolucoes_ad': f"CREATE TRIGGER versoes_paciente_evolucoes_ad AFTER DELETE ON evolucoes BEGIN {INCREMENTAR_VERSAO_EVOLUCAO.format(paciente_id='old.paciente_id')} END",
+}
+
+
+def recriar_triggers(triggers):
+    for trigger, comando in triggers.items():
+        op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        op.execute(comando)
+
+
+def upgrade():
+    # ADD COLUMN simples (sem recriar a tabela); o valor padrão só serve para as linhas já existentes
+    op.add_column('versoes_painel', sa.Column('alterado_em', sa.Float(), nullable=False, server_default='0'))
+    op.execute(f"UPDATE versoes_painel SET alterado_em = {AGORA}")
+    recriar_triggers(TRIGGERS_PAINEL)
+
+    op.create_table('versoes_paciente',
+    sa.Column('paciente_id', sa.Integer(), nullable=False),
+    sa.Column('versao', sa.Integer(), nullable=False),
+    sa.Column('alterado_em', sa.Float(), nullable=False),
+    sa.PrimaryKeyConstraint('paciente_id')
+    )
+    op.execute(f"INSERT INTO versoes_paciente (paciente_id, versao, alterado_em) SELECT id, 1, {AGORA} FROM pacientes")
+    recriar_triggers(TRIGGERS_PACIENTE)
+
+
+def downgrade():
+    for trigger in TRIGGERS_PACIENTE:
+        op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    op.drop_table('versoes_paciente')
+
+    # Os triggers saem antes: o SQLite valida os triggers que citam versoes_painel ao renomear a tabela recriada
+    for trigger in TRIGGERS_PAINEL:
+        op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    with op.batch_alter_table('versoes_painel', schema=None) as batch_op:
+        batch_op.drop_column('alterado_em')
+    recriar_triggers(TRIGGERS_PAINEL_ANTIGOS)
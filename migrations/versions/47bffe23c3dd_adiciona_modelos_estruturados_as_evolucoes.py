@@ -0,0 +1,45 @@
+"""Adiciona modelos estruturados às evoluções
+
+Revision ID: 47bffe23c3dd
+Revises: 4e04c37a4442
+Create Date: 2026-10-18 20:31:07.553812
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '47bffe23c3dd'
+down_revision = '4e04c37a4442'
+branch_labels = None
+depends_on = None
+
+COLUNAS_GERADAS = ['peep', 'fio2', 'fr', 'spo2']
+
+
+# ADD/DROP COLUMN simples, sem batch_alter_table: recriar evolucoes apagaria os triggers da busca e das versões.
+# O SQLite só aceita incluir colunas geradas VIRTUAL (calculadas na leitura) com ALTER TABLE.
+def upgrade():
+    op.add_column('evolucoes', sa.Column('modelo', sa.String(length=50), nullable=True))
+    op.add_column('evolucoes', sa.Column('dados', sa.JSON(none_as_null=True), nullable=True))
+    for coluna in COLUNAS_GERADAS:
+        op.add_column('evolucoes', sa.Column(coluna, sa.Float(), sa.Computed(f"json_extract(dados, '$.{coluna}')", persisted=False), nullable=True))
+
+    op.create_index('ix_evolucoes_paciente_id_modelo_data', 'evolucoes', ['paciente_id', 'modelo', 'data'], unique=False,
+                    sqlite_where=sa.text('modelo IS NOT NULL'))
+    op.create_index('ix_evolucoes_modelo_data', 'evolucoes', ['modelo', 'data'], unique=False, sqlite_where=sa.text('modelo IS NOT NULL'))
+    op.create_index('ix_evolucoes_peep_data', 'evolucoes', ['peep', 'data'], unique=False, sqlite_where=sa.text('peep IS NOT NULL'))
+    op.create_index('ix_evolucoes_fio2_data', 'evolucoes', ['fio2', 'data'], unique=False, sqlite_where=sa.text('fio2 IS NOT NULL'))
+
+
+def downgrade():
+    op.drop_index('ix_evolucoes_fio2_data', table_name='evolucoes')
+    op.drop_index('ix_evolucoes_peep_data', table_name='evolucoes')
+    op.drop_index('ix_evolucoes_modelo_data', table_name='evolucoes')
+    op.drop_index('ix_evolucoes_paciente_id_modelo_data', table_name='evolucoes')
+
+    for coluna in reversed(COLUNAS_GERADAS):
+        op.drop_column('evolucoes', coluna)
+    op.drop_column('evolucoes', 'dados')
+    op.drop_column('evolucoes', 'modelo')
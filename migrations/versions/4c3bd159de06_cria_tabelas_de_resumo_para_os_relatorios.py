@@ -0,0 +1,50 @@
+"""Cria tabelas de resumo para os relatórios
+
+Revision ID: 4c3bd159de06
+Revises: d5a1e2769a48
+Create Date: 2026-10-18 13:02:37.415208
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4c3bd159de06'
+down_revision = 'd5a1e2769a48'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('resumo_atendimentos',
+    sa.Column('data', sa.Date(), nullable=False),
+    sa.Column('unidade', sa.String(length=50), nullable=False),
+    sa.Column('pacientes', sa.Integer(), nullable=False),
+    sa.Column('turnos_manha', sa.Integer(), nullable=False),
+    sa.Column('turnos_tarde', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('data', 'unidade')
+    )
+    op.create_table('resumo_evolucoes',
+    sa.Column('data', sa.Date(), nullable=False),
+    sa.Column('unidade', sa.String(length=50), nullable=False),
+    sa.Column('fisio', sa.String(length=100), nullable=False),
+    sa.Column('total', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('data', 'unidade', 'fisio')
+    )
+
+    # Preenche os resumos com o histórico existente (o mesmo que `flask reconstruir-relatorios`)
+    op.execute("""INSERT INTO resumo_evolucoes (data, unidade, fisio, total)
+        SELECT date(evolucoes.data), pacientes.unidade, evolucoes.fisio, count(*)
+        FROM evolucoes JOIN pacientes ON pacientes.id = evolucoes.paciente_id
+        GROUP BY date(evolucoes.data), pacientes.unidade, evolucoes.fisio""")
+    op.execute("""INSERT INTO resumo_atendimentos (data, unidade, pacientes, turnos_manha, turnos_tarde)
+        SELECT atendimentos.data, pacientes.unidade, count(*), sum(atendimentos.turno_manha), sum(atendimentos.turno_tarde)
+        FROM atendimentos JOIN pacientes ON pacientes.id = atendimentos.paciente_id
+        WHERE atendimentos.turno_manha OR atendimentos.turno_tarde
+        GROUP BY atendimentos.data, pacientes.unidade""")
+
+
+def downgrade():
+    op.drop_table('resumo_evolucoes')
+    op.drop_table('resumo_atendimentos')
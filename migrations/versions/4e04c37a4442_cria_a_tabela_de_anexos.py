@@ -0,0 +1,60 @@
+"""Cria a tabela de anexos
+
+Revision ID: 4e04c37a4442
+Revises: d62d6ea91a99
+Create Date: 2026-10-18 19:48:51.276310
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4e04c37a4442'
+down_revision = 'd62d6ea91a99'
+branch_labels = None
+depends_on = None
+
+AGORA = "((julianday('now') - 2440587.5) * 86400.0)"
+INCREMENTAR_VERSAO = f"UPDATE versoes_paciente SET versao = versao + 1, alterado_em = {AGORA} WHERE paciente_id = {{paciente_id}};"
+
+# Anexos novos ou removidos mudam a página do paciente (ETag de detalhes_paciente)
+TRIGGERS = {
+    'versoes_paciente_anexos_ai': f"CREATE TRIGGER versoes_paciente_anexos_ai AFTER INSERT ON anexos BEGIN {INCREMENTAR_VERSAO.format(paciente_id='new.paciente_id')} END",
+    'versoes_paciente_anexos_au': f"""CREATE TRIGGER versoes_paciente_anexos_au AFTER UPDATE ON anexos BEGIN
+            {INCREMENTAR_VERSAO.format(paciente_id='old.paciente_id')}
+            {INCREMENTAR_VERSAO.format(paciente_id='new.paciente_id')}
+        END""",
+    'versoes_paciente_anexos_ad': f"CREATE TRIGGER versoes_paciente_anexos_ad AFTER DELETE ON anexos BEGIN {INCREMENTAR_VERSAO.format(paciente_id='old.paciente_id')} END",
+}
+
+
+def upgrade():
+    op.create_table('anexos',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('paciente_id', sa.Integer(), nullable=False),
+    sa.Column('nome', sa.String(length=255), nullable=False),
+    sa.Column('tipo', sa.String(length=100), nullable=False),
+    sa.Column('tamanho', sa.Integer(), nullable=False),
+    sa.Column('sha256', sa.String(length=64), nullable=False),
+    sa.Column('enviado_em', sa.DateTime(), nullable=False),
+    sa.Column('enviado_por', sa.String(length=100), nullable=False),
+    sa.ForeignKeyConstraint(['paciente_id'], ['pacientes.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('anexos', schema=None) as batch_op:
+        batch_op.create_index('ix_anexos_paciente_id_enviado_em', ['paciente_id', 'enviado_em'], unique=False)
+        batch_op.create_index('ix_anexos_sha256', ['sha256'], unique=False)
+
+    for comando in TRIGGERS.values():
+        op.execute(comando)
+
+
+def downgrade():
+    for trigger in TRIGGERS:
+        op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    with op.batch_alter_table('anexos', schema=None) as batch_op:
+        batch_op.drop_index('ix_anexos_sha256')
+        batch_op.drop_index('ix_anexos_paciente_id_enviado_em')
+
+    op.drop_table('anexos')
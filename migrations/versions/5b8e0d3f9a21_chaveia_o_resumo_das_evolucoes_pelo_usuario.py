@@ -0,0 +1,52 @@
+"""Chaveia o resumo das evoluções pelo usuário
+
+Revision ID: 5b8e0d3f9a21
+Revises: e626a18600a3
+Create Date: 2026-10-18 23:12:40.518233
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5b8e0d3f9a21'
+down_revision = 'e626a18600a3'
+branch_labels = None
+depends_on = None
+
+# Usuários cujo nome não se repete: só esses nomes podem ser trocados pelo id com segurança
+USUARIOS_UNICOS = "SELECT nome_completo, MIN(id) AS id FROM usuarios GROUP BY nome_completo HAVING COUNT(*) = 1"
+
+
+def upgrade():
+    op.create_table('resumo_evolucoes_novo',
+    sa.Column('data', sa.Date(), nullable=False),
+    sa.Column('unidade', sa.String(length=50), nullable=False),
+    sa.Column('usuario_id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('total', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('data', 'unidade', 'usuario_id')
+    )
+    # Os nomes que não são de exatamente um usuário ficam com usuario_id 0 (sem usuário identificado)
+    op.execute(f"""INSERT INTO resumo_evolucoes_novo (data, unidade, usuario_id, total)
+        SELECT resumo.data, resumo.unidade, COALESCE(usuarios.id, 0), SUM(resumo.total)
+        FROM resumo_evolucoes AS resumo LEFT JOIN ({USUARIOS_UNICOS}) AS usuarios ON usuarios.nome_completo = resumo.fisio
+        GROUP BY resumo.data, resumo.unidade, COALESCE(usuarios.id, 0)""")
+    op.drop_table('resumo_evolucoes')
+    op.rename_table('resumo_evolucoes_novo', 'resumo_evolucoes')
+
+
+def downgrade():
+    op.create_table('resumo_evolucoes_antigo',
+    sa.Column('data', sa.Date(), nullable=False),
+    sa.Column('unidade', sa.String(length=50), nullable=False),
+    sa.Column('fisio', sa.String(length=100), nullable=False),
+    sa.Column('total', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('data', 'unidade', 'fisio')
+    )
+    op.execute("""INSERT INTO resumo_evolucoes_antigo (data, unidade, fisio, total)
+        SELECT resumo.data, resumo.unidade, COALESCE(usuarios.nome_completo, 'Sem usuário identificado'), SUM(resumo.total)
+        FROM resumo_evolucoes AS resumo LEFT JOIN usuarios ON usuarios.id = resumo.usuario_id
+        GROUP BY resumo.data, resumo.unidade, COALESCE(usuarios.nome_completo, 'Sem usuário identificado')""")
+    op.drop_table('resumo_evolucoes')
+    op.rename_table('resumo_evolucoes_antigo', 'resumo_evolucoes')
@@ -0,0 +1,49 @@
+"""Cria versões do painel para o cache de fragmentos
+
+Revision ID: 800506e127a8
+Revises: f1471725d300
+Create Date: 2026-10-18 14:31:09.772415
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '800506e127a8'
+down_revision = 'f1471725d300'
+branch_labels = None
+depends_on = None
+
+INCREMENTAR_VERSAO = "INSERT INTO versoes_painel (unidade, versao) VALUES ({unidade}, 1) ON CONFLICT (unidade) DO UPDATE SET versao = versao + 1;"
+INCREMENTAR_VERSAO_ATENDIMENTO = ("INSERT INTO versoes_painel (unidade, versao) SELECT unidade, 1 FROM pacientes WHERE id = {paciente_id} "
+                                  "ON CONFLICT (unidade) DO UPDATE SET versao = versao + 1;")
+
+TRIGGERS = {
+    'versoes_painel_pacientes_ai': f"CREATE TRIGGER versoes_painel_pacientes_ai AFTER INSERT ON pacientes BEGIN {INCREMENTAR_VERSAO.format(unidade='new.unidade')} END",
+    'versoes_painel_pacientes_au': f"""CREATE TRIGGER versoes_painel_pacientes_au AFTER UPDATE ON pacientes BEGIN
+            {INCREMENTAR_VERSAO.format(unidade='old.unidade')}
+            {INCREMENTAR_VERSAO.format(unidade='new.unidade')}
+        END""",
+    'versoes_painel_pacientes_ad': f"CREATE TRIGGER versoes_painel_pacientes_ad AFTER DELETE ON pacientes BEGIN {INCREMENTAR_VERSAO.format(unidade='old.unidade')} END",
+    'versoes_painel_atendimentos_ai': f"CREATE TRIGGER versoes_painel_atendimentos_ai AFTER INSERT ON atendimentos BEGIN {INCREMENTAR_VERSAO_ATENDIMENTO.format(paciente_id='new.paciente_id')} END",
+    'versoes_painel_atendimentos_au': f"CREATE TRIGGER versoes_painel_atendimentos_au AFTER UPDATE ON atendimentos BEGIN {INCREMENTAR_VERSAO_ATENDIMENTO.format(paciente_id='new.paciente_id')} END",
+    'versoes_painel_atendimentos_ad': f"CREATE TRIGGER versoes_painel_atendimentos_ad AFTER DELETE ON atendimentos BEGIN {INCREMENTAR_VERSAO_ATENDIMENTO.format(paciente_id='old.paciente_id')} END",
+}
+
+
+def upgrade():
+    op.create_table('versoes_painel',
+    sa.Column('unidade', sa.String(length=50), nullable=False),
+    sa.Column('versao', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('unidade')
+    )
+    op.execute("INSERT INTO versoes_painel (unidade, versao) SELECT DISTINCT unidade, 1 FROM pacientes")
+    for comando in TRIGGERS.values():
+        op.execute(comando)
+
+
+def downgrade():
+    for trigger in TRIGGERS:
+        op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    op.drop_table('versoes_painel')
@@ -0,0 +1,42 @@
+"""Recalcula o resumo das evoluções pelo usuario_id
+
+Revision ID: 9d2c4a7e1f36
+Revises: 5b8e0d3f9a21
+Create Date: 2026-10-18 23:41:05.902117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9d2c4a7e1f36'
+down_revision = '5b8e0d3f9a21'
+branch_labels = None
+depends_on = None
+
+ESQUEMA_ARQUIVO_MORTO = 'arquivo_morto'
+
+
+def evolucoes_por_dia(esquema):
+    return (f"SELECT date(e.data) AS data, p.unidade AS unidade, COALESCE(e.usuario_id, 0) AS usuario_id "
+            f"FROM {esquema}.evolucoes AS e JOIN {esquema}.pacientes AS p ON p.id = e.paciente_id")
+
+
+# A migração anterior converteu os resumos pelos nomes; as evoluções já sabem o autor (usuario_id), inclusive as
+# gravadas por usuários de nome repetido, então o resumo é refeito a partir delas (o mesmo que `flask reconstruir-relatorios`).
+def upgrade():
+    consultas = [evolucoes_por_dia('main')]
+    # Com o arquivo morto anexado, as evoluções dele também entram (menos as dos pacientes já restaurados)
+    if ESQUEMA_ARQUIVO_MORTO in {linha[1] for linha in op.get_bind().execute(sa.text("PRAGMA database_list"))}:
+        consultas.append(f"{evolucoes_por_dia(ESQUEMA_ARQUIVO_MORTO)} "
+                         "WHERE NOT EXISTS (SELECT 1 FROM main.pacientes WHERE id = p.id)")
+    op.execute("DELETE FROM resumo_evolucoes")
+    op.execute(f"""INSERT INTO resumo_evolucoes (data, unidade, usuario_id, total)
+        SELECT data, unidade, usuario_id, count(*) FROM ({' UNION ALL '.join(consultas)})
+        GROUP BY data, unidade, usuario_id""")
+
+
+def downgrade():
+    # Os totais continuam valendo com a chave da revisão anterior
+    pass
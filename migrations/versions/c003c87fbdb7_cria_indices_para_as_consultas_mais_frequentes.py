@@ -0,0 +1,44 @@
+"""Cria índices para as consultas mais frequentes
+
+Revision ID: c003c87fbdb7
+Revises: 814a02305260
+Create Date: 2026-10-18 09:12:41.503118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c003c87fbdb7'
+down_revision = '814a02305260'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('pacientes', schema=None) as batch_op:
+        # Painel (status, unidade) e verificação de leito (status, unidade, leito)
+        batch_op.create_index('ix_pacientes_status_unidade_leito', ['status', 'unidade', 'leito'], unique=False)
+        # Busca de paciente existente na reativação
+        batch_op.create_index('ix_pacientes_nome_data_nascimento', ['nome', 'data_nascimento'], unique=False)
+
+    # Índice único parcial: no máximo um paciente ativo por leito.
+    # Falha se já houver leitos duplicados no banco; nesse caso corrija os dados antes de migrar.
+    op.create_index('uq_pacientes_leito_ativo', 'pacientes', ['unidade', 'leito'], unique=True,
+                    sqlite_where=sa.text("status = 'Ativo'"))
+
+    with op.batch_alter_table('evolucoes', schema=None) as batch_op:
+        # Histórico do paciente, ordenado por data
+        batch_op.create_index('ix_evolucoes_paciente_id_data', ['paciente_id', 'data'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('evolucoes', schema=None) as batch_op:
+        batch_op.drop_index('ix_evolucoes_paciente_id_data')
+
+    op.drop_index('uq_pacientes_leito_ativo', table_name='pacientes')
+
+    with op.batch_alter_table('pacientes', schema=None) as batch_op:
+        batch_op.drop_index('ix_pacientes_nome_data_nascimento')
+        batch_op.drop_index('ix_pacientes_status_unidade_leito')
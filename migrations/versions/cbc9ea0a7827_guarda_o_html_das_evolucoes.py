@@ -0,0 +1,78 @@
+"""Guarda o HTML das evoluções
+
+Revision ID: cbc9ea0a7827
+Revises: 800506e127a8
+Create Date: 2026-10-18 17:42:10.318655
+
+"""
+import re
+
+from alembic import op
+import sqlalchemy as sa
+from markupsafe import escape
+
+
+# revision identifiers, used by Alembic.
+revision = 'cbc9ea0a7827'
+down_revision = '800506e127a8'
+branch_labels = None
+depends_on = None
+
+TAMANHO_LOTE = 1000
+
+_paragraph_re = re.compile(r'(?:\r\n|\r|\n){2,}')
+
+# Recriar a tabela evolucoes (batch_alter_table no SQLite) apaga os triggers do índice de busca
+TRIGGERS_BUSCA_EVOLUCOES = [
+    """CREATE TRIGGER busca_evolucoes_ai AFTER INSERT ON evolucoes BEGIN
+        INSERT INTO busca_evolucoes(rowid, texto, paciente_id) VALUES (new.id, new.texto, new.paciente_id);
+    END""",
+    """CREATE TRIGGER busca_evolucoes_ad AFTER DELETE ON evolucoes BEGIN
+        INSERT INTO busca_evolucoes(busca_evolucoes, rowid, texto, paciente_id) VALUES ('delete', old.id, old.texto, old.paciente_id);
+    END""",
+    """CREATE TRIGGER busca_evolucoes_au AFTER UPDATE OF texto, paciente_id ON evolucoes BEGIN
+        INSERT INTO busca_evolucoes(busca_evolucoes, rowid, texto, paciente_id) VALUES ('delete', old.id, old.texto, old.paciente_id);
+        INSERT INTO busca_evolucoes(rowid, texto, paciente_id) VALUES (new.id, new.texto, new.paciente_id);
+    END""",
+]
+
+
+def recriar_triggers_busca_evolucoes():
+    for trigger in ['busca_evolucoes_ai', 'busca_evolucoes_ad', 'busca_evolucoes_au']:
+        op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    for comando in TRIGGERS_BUSCA_EVOLUCOES:
+        op.execute(comando)
+
+
+def texto_para_html(texto):
+    # Cópia de models.texto_para_html no momento desta migração
+    if texto is None: return ""
+    texto_escapado = escape(texto)
+    return u'\n\n'.join(u'<p>%s</p>' % p.replace('\n', '<br>\n') for p in _paragraph_re.split(texto_escapado))
+
+
+def preencher_em_lotes():
+    """Gera evolucoes.texto_html dos registros existentes em lotes, percorrendo a tabela pela chave primária."""
+    conexao = op.get_bind()
+    ultimo_id = 0
+    while True:
+        linhas = conexao.execute(
+            sa.text("SELECT id, texto FROM evolucoes WHERE id > :ultimo_id AND texto_html IS NULL ORDER BY id LIMIT :lote"),
+            {'ultimo_id': ultimo_id, 'lote': TAMANHO_LOTE}).fetchall()
+        if not linhas:
+            break
+        conexao.execute(sa.text("UPDATE evolucoes SET texto_html = :html WHERE id = :id"),
+                        [{'id': id_, 'html': texto_para_html(texto)} for id_, texto in linhas])
+        ultimo_id = linhas[-1][0]
+
+
+def upgrade():
+    # add_column vira um ALTER TABLE ADD COLUMN simples: a tabela não é recriada e os triggers ficam
+    op.add_column('evolucoes', sa.Column('texto_html', sa.Text(), nullable=True))
+    preencher_em_lotes()
+
+
+def downgrade():
+    with op.batch_alter_table('evolucoes', schema=None) as batch_op:
+        batch_op.drop_column('texto_html')
+    recriar_triggers_busca_evolucoes()
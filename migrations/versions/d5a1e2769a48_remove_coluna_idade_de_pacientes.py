@@ -0,0 +1,52 @@
+"""Remove a coluna idade de pacientes
+
+Revision ID: d5a1e2769a48
+Revises: 1c6986e82577
+Create Date: 2026-10-18 12:08:44.610927
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd5a1e2769a48'
+down_revision = '1c6986e82577'
+branch_labels = None
+depends_on = None
+
+# Recriar a tabela pacientes (batch_alter_table no SQLite) apaga os triggers do índice de busca
+TRIGGERS_BUSCA_PACIENTES = [
+    """CREATE TRIGGER busca_pacientes_ai AFTER INSERT ON pacientes BEGIN
+        INSERT INTO busca_pacientes(rowid, nome, diagnostico) VALUES (new.id, new.nome, new.diagnostico);
+    END""",
+    """CREATE TRIGGER busca_pacientes_ad AFTER DELETE ON pacientes BEGIN
+        INSERT INTO busca_pacientes(busca_pacientes, rowid, nome, diagnostico) VALUES ('delete', old.id, old.nome, old.diagnostico);
+    END""",
+    """CREATE TRIGGER busca_pacientes_au AFTER UPDATE OF nome, diagnostico ON pacientes BEGIN
+        INSERT INTO busca_pacientes(busca_pacientes, rowid, nome, diagnostico) VALUES ('delete', old.id, old.nome, old.diagnostico);
+        INSERT INTO busca_pacientes(rowid, nome, diagnostico) VALUES (new.id, new.nome, new.diagnostico);
+    END""",
+]
+
+
+def recriar_triggers_busca_pacientes():
+    for trigger in ['busca_pacientes_ai', 'busca_pacientes_ad', 'busca_pacientes_au']:
+        op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    for comando in TRIGGERS_BUSCA_PACIENTES:
+        op.execute(comando)
+
+
+def upgrade():
+    # A idade passa a ser calculada a partir de data_nascimento (Paciente.idade é um hybrid_property)
+    with op.batch_alter_table('pacientes', schema=None) as batch_op:
+        batch_op.drop_column('idade')
+    recriar_triggers_busca_pacientes()
+
+
+def downgrade():
+    with op.batch_alter_table('pacientes', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('idade', sa.Integer(), nullable=True))
+    op.execute("""UPDATE pacientes SET idade =
+        CAST(strftime('%Y', 'now', 'localtime') AS INTEGER) - CAST(strftime('%Y', data_nascimento) AS INTEGER)
+        - (strftime('%m-%d', data_nascimento) > strftime('%m-%d', 'now', 'localtime'))""")
@@ -0,0 +1,83 @@
+"""Cria o mapa de leitos e a ocupação
+
+Revision ID: d62d6ea91a99
+Revises: 22baa65766ac
+Create Date: 2026-10-18 19:05:12.418903
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd62d6ea91a99'
+down_revision = '22baa65766ac'
+branch_labels = None
+depends_on = None
+
+# Unidades e leitos que até aqui estavam fixos no form_paciente.js
+UNIDADES = {
+    '1ª Enfermaria': [str(numero) for numero in range(101, 115)],
+    '2ª Enfermaria': None,
+    '3ª Enfermaria': None,
+    'UTI': [str(numero) for numero in range(1, 7)],
+}
+
+OCUPAR_LEITO = ("INSERT INTO ocupacao_leitos (unidade, leito, paciente_id) SELECT new.unidade, new.leito, new.id "
+                "WHERE new.status = 'Ativo' AND new.leito IS NOT NULL;")
+TRIGGERS = {
+    'ocupacao_leitos_ai': f"CREATE TRIGGER ocupacao_leitos_ai AFTER INSERT ON pacientes BEGIN {OCUPAR_LEITO} END",
+    'ocupacao_leitos_au': f"""CREATE TRIGGER ocupacao_leitos_au AFTER UPDATE OF status, unidade, leito ON pacientes BEGIN
+        DELETE FROM ocupacao_leitos WHERE paciente_id = old.id;
+        {OCUPAR_LEITO}
+    END""",
+    'ocupacao_leitos_ad': "CREATE TRIGGER ocupacao_leitos_ad AFTER DELETE ON pacientes BEGIN DELETE FROM ocupacao_leitos WHERE paciente_id = old.id; END",
+}
+
+
+def upgrade():
+    unidades = op.create_table('unidades',
+    sa.Column('nome', sa.String(length=50), nullable=False),
+    sa.Column('ordem', sa.Integer(), nullable=False),
+    sa.Column('leitos_fixos', sa.Boolean(), nullable=False),
+    sa.PrimaryKeyConstraint('nome')
+    )
+    leitos = op.create_table('leitos',
+    sa.Column('unidade', sa.String(length=50), nullable=False),
+    sa.Column('numero', sa.String(length=20), nullable=False),
+    sa.Column('ordem', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['unidade'], ['unidades.nome'], ),
+    sa.PrimaryKeyConstraint('unidade', 'numero')
+    )
+    op.create_table('ocupacao_leitos',
+    sa.Column('unidade', sa.String(length=50), nullable=False),
+    sa.Column('leito', sa.String(length=20), nullable=False),
+    sa.Column('paciente_id', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('unidade', 'leito')
+    )
+    with op.batch_alter_table('ocupacao_leitos', schema=None) as batch_op:
+        batch_op.create_index('uq_ocupacao_leitos_paciente_id', ['paciente_id'], unique=True)
+
+    op.bulk_insert(unidades, [{'nome': nome, 'ordem': ordem, 'leitos_fixos': numeros is not None}
+                              for ordem, (nome, numeros) in enumerate(UNIDADES.items(), 1)])
+    op.bulk_insert(leitos, [{'unidade': nome, 'numero': numero, 'ordem': ordem}
+                            for nome, numeros in UNIDADES.items() for ordem, numero in enumerate(numeros or [], 1)])
+    # Unidades que já aparecem nos pacientes e não estão na lista acima continuam válidas, com leito digitado
+    op.execute(f"""INSERT INTO unidades (nome, ordem, leitos_fixos)
+        SELECT DISTINCT unidade, {len(UNIDADES) + 1}, 0 FROM pacientes WHERE unidade NOT IN (SELECT nome FROM unidades)""")
+
+    op.execute("""INSERT INTO ocupacao_leitos (unidade, leito, paciente_id)
+        SELECT unidade, leito, id FROM pacientes WHERE status = 'Ativo' AND leito IS NOT NULL""")
+    for comando in TRIGGERS.values():
+        op.execute(comando)
+
+
+def downgrade():
+    for trigger in TRIGGERS:
+        op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    with op.batch_alter_table('ocupacao_leitos', schema=None) as batch_op:
+        batch_op.drop_index('uq_ocupacao_leitos_paciente_id')
+
+    op.drop_table('ocupacao_leitos')
+    op.drop_table('leitos')
+    op.drop_table('unidades')
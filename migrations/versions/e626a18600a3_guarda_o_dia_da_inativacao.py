@@ -0,0 +1,33 @@
+"""Guarda o dia da inativação
+
+Revision ID: e626a18600a3
+Revises: 0c5fe80761b1
+Create Date: 2026-10-18 21:46:09.285802
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e626a18600a3'
+down_revision = '0c5fe80761b1'
+branch_labels = None
+depends_on = None
+
+
+# ADD/DROP COLUMN simples, sem batch_alter_table: recriar pacientes apagaria os triggers da busca, das versões e dos leitos.
+def upgrade():
+    op.add_column('pacientes', sa.Column('inativado_em', sa.Date(), nullable=True))
+    # Os inativos de antes desta migração ficam com o dia do último registro (evolução ou atendimento); sem nenhum, hoje
+    op.execute("""
+        UPDATE pacientes SET inativado_em = COALESCE((
+            SELECT MAX(ultima) FROM (SELECT date(data) AS ultima FROM evolucoes WHERE paciente_id = pacientes.id
+                                     UNION ALL SELECT data FROM atendimentos WHERE paciente_id = pacientes.id)
+        ), date('now'))
+        WHERE status = 'Inativo'
+    """)
+
+
+def downgrade():
+    op.drop_column('pacientes', 'inativado_em')
@@ -0,0 +1,56 @@
+"""Cria índice de busca FTS5 do arquivo
+
+Revision ID: ebc08aaedbec
+Revises: c003c87fbdb7
+Create Date: 2026-10-18 10:03:17.284561
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'ebc08aaedbec'
+down_revision = 'c003c87fbdb7'
+branch_labels = None
+depends_on = None
+
+TRIGGERS = ['busca_pacientes_ai', 'busca_pacientes_ad', 'busca_pacientes_au',
+            'busca_evolucoes_ai', 'busca_evolucoes_ad', 'busca_evolucoes_au']
+
+
+def upgrade():
+    # Tabelas FTS5 de conteúdo externo: guardam só o índice, o texto continua em pacientes/evolucoes
+    op.execute("CREATE VIRTUAL TABLE busca_pacientes USING fts5(nome, diagnostico, content='pacientes', content_rowid='id', tokenize='unicode61 remove_diacritics 2')")
+    op.execute("CREATE VIRTUAL TABLE busca_evolucoes USING fts5(texto, paciente_id UNINDEXED, content='evolucoes', content_rowid='id', tokenize='unicode61 remove_diacritics 2')")
+
+    op.execute("""CREATE TRIGGER busca_pacientes_ai AFTER INSERT ON pacientes BEGIN
+        INSERT INTO busca_pacientes(rowid, nome, diagnostico) VALUES (new.id, new.nome, new.diagnostico);
+    END""")
+    op.execute("""CREATE TRIGGER busca_pacientes_ad AFTER DELETE ON pacientes BEGIN
+        INSERT INTO busca_pacientes(busca_pacientes, rowid, nome, diagnostico) VALUES ('delete', old.id, old.nome, old.diagnostico);
+    END""")
+    op.execute("""CREATE TRIGGER busca_pacientes_au AFTER UPDATE OF nome, diagnostico ON pacientes BEGIN
+        INSERT INTO busca_pacientes(busca_pacientes, rowid, nome, diagnostico) VALUES ('delete', old.id, old.nome, old.diagnostico);
+        INSERT INTO busca_pacientes(rowid, nome, diagnostico) VALUES (new.id, new.nome, new.diagnostico);
+    END""")
+    op.execute("""CREATE TRIGGER busca_evolucoes_ai AFTER INSERT ON evolucoes BEGIN
+        INSERT INTO busca_evolucoes(rowid, texto, paciente_id) VALUES (new.id, new.texto, new.paciente_id);
+    END""")
+    op.execute("""CREATE TRIGGER busca_evolucoes_ad AFTER DELETE ON evolucoes BEGIN
+        INSERT INTO busca_evolucoes(busca_evolucoes, rowid, texto, paciente_id) VALUES ('delete', old.id, old.texto, old.paciente_id);
+    END""")
+    op.execute("""CREATE TRIGGER busca_evolucoes_au AFTER UPDATE OF texto, paciente_id ON evolucoes BEGIN
+        INSERT INTO busca_evolucoes(busca_evolucoes, rowid, texto, paciente_id) VALUES ('delete', old.id, old.texto, old.paciente_id);
+        INSERT INTO busca_evolucoes(rowid, texto, paciente_id) VALUES (new.id, new.texto, new.paciente_id);
+    END""")
+
+    # Indexa os registros já existentes
+    op.execute("INSERT INTO busca_pacientes(busca_pacientes) VALUES ('rebuild')")
+    op.execute("INSERT INTO busca_evolucoes(busca_evolucoes) VALUES ('rebuild')")
+
+
+def downgrade():
+    for trigger in TRIGGERS:
+        op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    op.execute("DROP TABLE IF EXISTS busca_evolucoes")
+    op.execute("DROP TABLE IF EXISTS busca_pacientes")
@@ -0,0 +1,50 @@
+"""Cria log de auditoria
+
+Revision ID: f1471725d300
+Revises: 4c3bd159de06
+Create Date: 2026-10-18 13:47:52.160934
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f1471725d300'
+down_revision = '4c3bd159de06'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('auditoria',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('data', sa.DateTime(), nullable=False),
+    sa.Column('usuario_id', sa.Integer(), nullable=True),
+    sa.Column('usuario_nome', sa.String(length=100), nullable=False),
+    sa.Column('origem', sa.String(length=100), nullable=False),
+    sa.Column('tabela', sa.String(length=50), nullable=False),
+    sa.Column('registro_id', sa.Integer(), nullable=False),
+    sa.Column('operacao', sa.String(length=20), nullable=False),
+    sa.Column('alteracoes', sa.JSON(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('auditoria', schema=None) as batch_op:
+        batch_op.create_index('ix_auditoria_tabela_registro_id', ['tabela', 'registro_id'], unique=False)
+
+    # O log é só de inclusão: alterações e exclusões são recusadas pelo próprio banco
+    op.execute("""CREATE TRIGGER auditoria_sem_update BEFORE UPDATE ON auditoria BEGIN
+        SELECT RAISE(ABORT, 'O log de auditoria não pode ser alterado');
+    END""")
+    op.execute("""CREATE TRIGGER auditoria_sem_delete BEFORE DELETE ON auditoria BEGIN
+        SELECT RAISE(ABORT, 'O log de auditoria não pode ser apagado');
+    END""")
+
+
+def downgrade():
+    op.execute("DROP TRIGGER IF EXISTS auditoria_sem_delete")
+    op.execute("DROP TRIGGER IF EXISTS auditoria_sem_update")
+    with op.batch_alter_table('auditoria', schema=None) as batch_op:
+        batch_op.drop_index('ix_auditoria_tabela_registro_id')
+
+    op.drop_table('auditoria')
@@ -0,0 +1,125 @@
+# modelos_evolucao.py
+# Modelos estruturados de evolução (ventilação mecânica, pós-operatório ortopédico, neurológico). Os campos
+# preenchidos são gravados em JSON em Evolucao.dados, e um resumo deles entra no texto da evolução. Os parâmetros
+# mais consultados da ventilação viram colunas geradas indexadas no SQLite (ver Evolucao em models.py), então as
+# séries e as listas de pacientes abaixo são buscas em índice, sem ler o texto das evoluções.
+from datetime import date, datetime, time, timedelta
+
+import pytz
+
+from models import db, Paciente, Evolucao
+
+# Campos numéricos têm 'minimo' e 'maximo'; os de escolha, 'opcoes'. Os nomes dos campos não se repetem entre modelos.
+MODELOS_EVOLUCAO = {
+    'ventilacao_mecanica': {
+        'titulo': 'Ventilação Mecânica',
+        'campos': [
+            {'nome': 'modo', 'rotulo': 'Modo', 'opcoes': ['VCV', 'PCV', 'PSV', 'SIMV', 'CPAP']},
+            {'nome': 'peep', 'rotulo': 'PEEP', 'unidade': 'cmH₂O', 'minimo': 0, 'maximo': 30},
+            {'nome': 'fio2', 'rotulo': 'FiO₂', 'unidade': '%', 'minimo': 21, 'maximo': 100},
+            {'nome': 'fr', 'rotulo': 'FR', 'unidade': 'irpm', 'minimo': 0, 'maximo': 80},
+            {'nome': 'volume_corrente', 'rotulo': 'Volume corrente', 'unidade': 'mL', 'minimo': 0, 'maximo': 2000},
+            {'nome': 'pressao_suporte', 'rotulo': 'Pressão de suporte', 'unidade': 'cmH₂O', 'minimo': 0, 'maximo': 40},
+            {'nome': 'spo2', 'rotulo': 'SpO₂', 'unidade': '%', 'minimo': 0, 'maximo': 100},
+        ],
+    },
+    'pos_operatorio_ortopedico': {
+        'titulo': 'Pós-Operatório Ortopédico',
+        'campos': [
+            {'nome': 'dor', 'rotulo': 'Dor (EVA)', 'minimo': 0, 'maximo': 10},
+            {'nome': 'flexao_joelho', 'rotulo': 'Flexão do joelho', 'unidade': '°', 'minimo': 0, 'maximo': 160},
+            {'nome': 'descarga_peso', 'rotulo': 'Descarga de peso', 'opcoes': ['Sem descarga', 'Parcial', 'Total']},
+            {'nome': 'deambulacao', 'rotulo': 'Deambulação', 'opcoes': ['Não deambula', 'Com auxílio', 'Independente']},
+        ],
+    },
+    'neurologico': {
+        'titulo': 'Neurológico',
+        'campos': [
+            {'nome': 'glasgow', 'rotulo': 'Glasgow', 'minimo': 3, 'maximo': 15},
+            {'nome': 'forca_mrc', 'rotulo': 'Força (MRC)', 'minimo': 0, 'maximo': 60},
+            {'nome': 'tonus', 'rotulo': 'Tônus', 'opcoes': ['Normal', 'Hipotonia', 'Espasticidade']},
+            {'nome': 'equilibrio_sentado', 'rotulo': 'Equilíbrio sentado', 'opcoes': ['Ausente', 'Com apoio', 'Sem apoio']},
+        ],
+    },
+}
+
+# Campos numéricos de todos os modelos, {nome: (modelo, campo)}, e os que têm coluna gerada em evolucoes
+CAMPOS_NUMERICOS = {campo['nome']: (chave, campo) for chave, modelo in MODELOS_EVOLUCAO.items()
+                    for campo in modelo['campos'] if 'minimo' in campo}
+COLUNAS_GERADAS = {'peep': Evolucao.peep, 'fio2': Evolucao.fio2, 'fr': Evolucao.fr, 'spo2': Evolucao.spo2}
+
+def _numero_br(valor):
+    return f"{valor:g}".replace('.', ',')
+
+def ler_dados(modelo, formulario):
+    """Valida os campos `campo_<nome>` do formulário para o `modelo`; devolve (dados, erro)."""
+    definicao = MODELOS_EVOLUCAO.get(modelo)
+    if definicao is None: return None, 'Modelo de evolução desconhecido.'
+    dados = {}
+    for campo in definicao['campos']:
+        valor = formulario.get(f"campo_{campo['nome']}", '').strip()
+        if not valor: continue
+        if 'opcoes' in campo:
+            if valor not in campo['opcoes']: return None, f"Valor inválido para {campo['rotulo']}."
+            dados[campo['nome']] = valor
+            continue
+        try:
+            numero = float(valor.replace(',', '.'))
+        except ValueError:
+            return None, f"{campo['rotulo']} deve ser um número."
+        if not campo['minimo'] <= numero <= campo['maximo']:
+            return None, f"{campo['rotulo']} deve estar entre {campo['minimo']} e {campo['maximo']}."
+        dados[campo['nome']] = int(numero) if numero.is_integer() else numero
+    if not dados: return None, 'Preencha ao menos um campo do modelo.'
+    return dados, None
+
+def resumo_dados(modelo, dados):
+    """Uma linha com os campos preenchidos, na ordem do modelo (ex.: "Ventilação Mecânica: Modo PCV | PEEP 8 cmH₂O")."""
+    definicao = MODELOS_EVOLUCAO[modelo]
+    partes = []
+    for campo in definicao['campos']:
+        if campo['nome'] not in dados: continue
+        valor = dados[campo['nome']]
+        valor = valor if isinstance(valor, str) else _numero_br(valor)
+        partes.append(f"{campo['rotulo']} {valor}{' ' + campo['unidade'] if campo.get('unidade') else ''}")
+    return f"{definicao['titulo']}: {' | '.join(partes)}"
+
+def montar_texto(modelo, dados, texto):
+    texto = texto.strip()
+    return resumo_dados(modelo, dados) + (f"\n\n{texto}" if texto else '')
+
+def parametros_do_paciente(paciente_id):
+    """Campos numéricos dos modelos que o paciente já teve, para o seletor do gráfico de tendências."""
+    modelos = db.session.scalars(db.select(Evolucao.modelo).distinct()
+                                 .where(Evolucao.paciente_id == paciente_id, Evolucao.modelo.is_not(None))).all()
+    return [campo for modelo, campo in CAMPOS_NUMERICOS.values() if modelo in modelos]
+
+def serie_temporal(paciente_id, parametro, dias=7):
+    """Valores de `parametro` nas evoluções do paciente dos últimos `dias` dias (contando hoje), em ordem de data.
+
+    Usa a coluna gerada do parâmetro quando existe; os demais campos saem do JSON, mas a busca continua restrita
+    às evoluções estruturadas do paciente pelo índice ix_evolucoes_paciente_id_modelo_data.
+    """
+    modelo, _ = CAMPOS_NUMERICOS[parametro]
+    coluna = COLUNAS_GERADAS.get(parametro, db.func.json_extract(Evolucao.dados, f"$.{parametro}"))
+    desde = datetime.combine(date.today() - timedelta(days=dias - 1), time())
+    linhas = db.session.execute(db.select(Evolucao.data, coluna)
+                                .where(Evolucao.paciente_id == paciente_id, Evolucao.modelo == modelo, Evolucao.data >= desde,
+                                       coluna.is_not(None))
+                                .order_by(Evolucao.data))
+    return [{'data': data.isoformat(timespec='minutes'), 'valor': valor} for data, valor in linhas]
+
+def pacientes_com_modelo(modelo, unidade=None, horas=24):
+    """Pacientes ativos com evolução do `modelo` nas últimas `horas` horas (ex.: ventilados da UTI), com a última delas."""
+    # As datas das evoluções são gravadas no horário de Brasília, sem fuso
+    desde = datetime.now(pytz.timezone("America/Sao_Paulo")).replace(tzinfo=None) - timedelta(hours=horas)
+    ultimas = (db.select(Evolucao.paciente_id, db.func.max(Evolucao.data).label('data'))
+               .where(Evolucao.modelo == modelo, Evolucao.data >= desde).group_by(Evolucao.paciente_id).subquery())
+    consulta = (db.select(Paciente.id, Paciente.nome, Paciente.unidade, Paciente.leito, Evolucao.data, Evolucao.dados)
+                .join(ultimas, ultimas.c.paciente_id == Paciente.id)
+                .join(Evolucao, db.and_(Evolucao.paciente_id == Paciente.id, Evolucao.modelo == modelo, Evolucao.data == ultimas.c.data))
+                .where(Paciente.status == 'Ativo').order_by(Paciente.unidade, Paciente.leito))
+    if unidade: consulta = consulta.where(Paciente.unidade == unidade)
+    return [{'paciente_id': paciente_id, 'nome': nome, 'unidade': unidade_paciente, 'leito': leito,
+             'data': data.isoformat(timespec='minutes'), 'dados': dados}
+            for paciente_id, nome, unidade_paciente, leito, data, dados in db.session.execute(consulta)]
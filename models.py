@@ -0,0 +1,496 @@
+# models.py
+from datetime import date, datetime, time, timedelta
+import re
+
+from flask_sqlalchemy import SQLAlchemy
+from flask_login import UserMixin
+from markupsafe import escape
+from sqlalchemy import event
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.hybrid import hybrid_property
+
+db = SQLAlchemy()
+
+# --- Configuração do Banco ---
+def aplicar_pragmas_sqlite(engine, pragmas):
+    """Registra os PRAGMAs para serem executados em cada nova conexão SQLite do pool."""
+    if engine.dialect.name != 'sqlite': return
+
+    @event.listens_for(engine, 'connect')
+    def ao_conectar(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for nome, valor in pragmas.items():
+            cursor.execute(f"PRAGMA {nome} = {valor}")
+        cursor.close()
+
+def incluir_no_autogenerate(objeto, nome, tipo, refletido, comparar_com):
+    # As tabelas do índice de busca (FTS5 e suas tabelas internas) são criadas à mão nas migrações
+    return not (tipo == 'table' and nome.startswith('busca_'))
+
+# --- Modelos de Banco de Dados ---
+class Usuario(UserMixin, db.Model):
+    __tablename__ = 'usuarios'
+    id = db.Column(db.Integer, primary_key=True)
+    nome_completo = db.Column(db.String(100), nullable=False)
+    email = db.Column(db.String(100), unique=True, nullable=False)
+    senha_hash = db.Column(db.String(200), nullable=False)
+    funcao = db.Column(db.String(20), nullable=False, default='fisioterapeuta')
+    status = db.Column(db.String(20), nullable=False, default='Ativo')
+    precisa_trocar_senha = db.Column(db.Boolean, nullable=False, default=False)
+
+class Paciente(db.Model):
+    __tablename__ = 'pacientes'
+    id = db.Column(db.Integer, primary_key=True)
+    nome = db.Column(db.String(100), nullable=False)
+    leito = db.Column(db.String(20))
+    unidade = db.Column(db.String(50), nullable=False)
+    diagnostico = db.Column(db.Text)
+    status = db.Column(db.String(20), nullable=False, default='Ativo')
+    motivo_inativacao = db.Column(db.String(100))
+    # Dia da inativação; conta o prazo para o paciente ir para o arquivo morto (arquivo_morto.py)
+    inativado_em = db.Column(db.Date)
+    data_nascimento = db.Column(db.Date, nullable=False)
+    evolucoes = db.relationship('Evolucao', backref='paciente', lazy='dynamic', cascade="all, delete-orphan")
+    atendimentos = db.relationship('Atendimento', backref='paciente', lazy='dynamic', cascade="all, delete-orphan")
+    anexos = db.relationship('Anexo', backref='paciente', lazy='dynamic', cascade="all, delete-orphan")
+    __table_args__ = (
+        db.Index('ix_pacientes_status_unidade_leito', 'status', 'unidade', 'leito'),
+        db.Index('ix_pacientes_nome_data_nascimento', 'nome', 'data_nascimento'),
+        # Um leito só pode ter um paciente ativo; a verificação fica a cargo do banco
+        db.Index('uq_pacientes_leito_ativo', 'unidade', 'leito', unique=True, sqlite_where=db.text("status = 'Ativo'")),
+    )
+
+    # A idade é derivada da data de nascimento na leitura, para nunca ficar desatualizada
+    @hybrid_property
+    def idade(self):
+        return calcular_idade(self.data_nascimento)
+
+    @idade.expression
+    def idade(cls):
+        # Mesma conta de calcular_idade, em SQL, para ordenar e filtrar por idade na própria consulta
+        hoje = date.today()
+        return (hoje.year - db.cast(db.func.strftime('%Y', cls.data_nascimento), db.Integer)
+                - db.case((db.func.strftime('%m-%d', cls.data_nascimento) > hoje.strftime('%m-%d'), 1), else_=0))
+
+    def to_dict(self):
+        """Converte o objeto Paciente num dicionário."""
+        return {
+            'id': self.id,
+            'nome': self.nome,
+            'idade': self.idade,
+            'leito': self.leito,
+            'unidade': self.unidade,
+            'diagnostico': self.diagnostico,
+            'data_nascimento': self.data_nascimento.strftime('%d/%m/%Y') if self.data_nascimento else None
+        }
+
+class Evolucao(db.Model):
+    __tablename__ = 'evolucoes'
+    id = db.Column(db.Integer, primary_key=True)
+    data = db.Column(db.DateTime, nullable=False)
+    # Nome de quem assinou, como estava no momento; as consultas por fisioterapeuta usam usuario_id
+    fisio = db.Column(db.String(100), nullable=False)
+    texto = db.Column(db.Text, nullable=False)
+    paciente_id = db.Column(db.Integer, db.ForeignKey('pacientes.id'), nullable=False)
+    # Nulo só em evoluções antigas cujo nome não corresponde a um único usuário
+    usuario_id = db.Column(db.Integer, db.ForeignKey('usuarios.id'))
+    # HTML do texto (escapado, com <p> e <br>), gerado uma vez ao gravar: o texto não muda depois disso
+    texto_html = db.Column(db.Text)
+    # Evoluções feitas com um modelo estruturado (modelos_evolucao.py): o modelo e os campos preenchidos, em JSON.
+    # O texto continua sendo gravado (com o resumo dos campos), para o histórico, a busca e a exportação.
+    modelo = db.Column(db.String(50))
+    dados = db.Column(db.JSON(none_as_null=True))
+    # Parâmetros da ventilação mecânica extraídos do JSON pelo próprio SQLite (colunas geradas virtuais, indexáveis)
+    peep = db.Column(db.Float, db.Computed("json_extract(dados, '$.peep')", persisted=False))
+    fio2 = db.Column(db.Float, db.Computed("json_extract(dados, '$.fio2')", persisted=False))
+    fr = db.Column(db.Float, db.Computed("json_extract(dados, '$.fr')", persisted=False))
+    spo2 = db.Column(db.Float, db.Computed("json_extract(dados, '$.spo2')", persisted=False))
+    __table_args__ = (
+        db.Index('ix_evolucoes_paciente_id_data', 'paciente_id', 'data'),
+        db.Index('ix_evolucoes_usuario_id_data', 'usuario_id', 'data'),
+        # Índices parciais: só as evoluções estruturadas entram neles
+        db.Index('ix_evolucoes_paciente_id_modelo_data', 'paciente_id', 'modelo', 'data', sqlite_where=db.text('modelo IS NOT NULL')),
+        db.Index('ix_evolucoes_modelo_data', 'modelo', 'data', sqlite_where=db.text('modelo IS NOT NULL')),
+        db.Index('ix_evolucoes_peep_data', 'peep', 'data', sqlite_where=db.text('peep IS NOT NULL')),
+        db.Index('ix_evolucoes_fio2_data', 'fio2', 'data', sqlite_where=db.text('fio2 IS NOT NULL')),
+    )
+
+    @db.validates('texto')
+    def gerar_texto_html(self, chave, texto):
+        self.texto_html = texto_para_html(texto)
+        return texto
+
+class Atendimento(db.Model):
+    __tablename__ = 'atendimentos'
+    id = db.Column(db.Integer, primary_key=True)
+    data = db.Column(db.Date, nullable=False)
+    turno_manha = db.Column(db.Boolean, nullable=False, default=False)
+    turno_tarde = db.Column(db.Boolean, nullable=False, default=False)
+    paciente_id = db.Column(db.Integer, db.ForeignKey('pacientes.id'), nullable=False)
+    __table_args__ = (
+        db.UniqueConstraint('paciente_id', 'data', name='_paciente_data_uc'),
+        db.Index('ix_atendimentos_data', 'data'),
+    )
+
+class Anexo(db.Model):
+    """Metadados de um arquivo anexado ao paciente. O conteúdo fica em disco, no armazém do anexos.py, pelo SHA-256."""
+    __tablename__ = 'anexos'
+    id = db.Column(db.Integer, primary_key=True)
+    paciente_id = db.Column(db.Integer, db.ForeignKey('pacientes.id'), nullable=False)
+    nome = db.Column(db.String(255), nullable=False)  # nome original, só para exibição e download
+    tipo = db.Column(db.String(100), nullable=False)  # identificado pelo conteúdo, não pelo navegador
+    tamanho = db.Column(db.Integer, nullable=False)
+    sha256 = db.Column(db.String(64), nullable=False)
+    enviado_em = db.Column(db.DateTime, nullable=False)
+    enviado_por = db.Column(db.String(100), nullable=False)
+    __table_args__ = (
+        db.Index('ix_anexos_paciente_id_enviado_em', 'paciente_id', 'enviado_em'),
+        db.Index('ix_anexos_sha256', 'sha256'),
+    )
+
+    @property
+    def imagem(self):
+        return self.tipo.startswith('image/')
+
+# Versão de cada unidade no painel, incrementada por triggers a cada mudança em pacientes ou atendimentos da unidade.
+# O cache de fragmentos (cache_fragmentos.py) usa a versão na chave da seção da unidade e o cache_http.py no ETag do painel.
+# Atenção: como os triggers da busca, estes somem se pacientes ou atendimentos forem recriadas por um batch_alter_table.
+class VersaoPainel(db.Model):
+    __tablename__ = 'versoes_painel'
+    unidade = db.Column(db.String(50), primary_key=True)
+    versao = db.Column(db.Integer, nullable=False, default=1)
+    alterado_em = db.Column(db.Float, nullable=False)  # segundos desde 1970 (UTC), gravado pelos triggers
+
+# Momento atual em segundos desde 1970, com milissegundos, calculado pelo próprio SQLite dentro dos triggers
+_AGORA = "((julianday('now') - 2440587.5) * 86400.0)"
+_INCREMENTAR_VERSAO = (f"INSERT INTO versoes_painel (unidade, versao, alterado_em) VALUES ({{unidade}}, 1, {_AGORA}) "
+                       "ON CONFLICT (unidade) DO UPDATE SET versao = versao + 1, alterado_em = excluded.alterado_em;")
+_INCREMENTAR_VERSAO_ATENDIMENTO = (f"INSERT INTO versoes_painel (unidade, versao, alterado_em) SELECT unidade, 1, {_AGORA} FROM pacientes WHERE id = {{paciente_id}} "
+                                   "ON CONFLICT (unidade) DO UPDATE SET versao = versao + 1, alterado_em = excluded.alterado_em;")
+DDL_VERSOES_PAINEL = {
+    'pacientes': [
+        f"CREATE TRIGGER versoes_painel_pacientes_ai AFTER INSERT ON pacientes BEGIN {_INCREMENTAR_VERSAO.format(unidade='new.unidade')} END",
+        f"""CREATE TRIGGER versoes_painel_pacientes_au AFTER UPDATE ON pacientes BEGIN
+            {_INCREMENTAR_VERSAO.format(unidade='old.unidade')}
+            {_INCREMENTAR_VERSAO.format(unidade='new.unidade')}
+        END""",
+        f"CREATE TRIGGER versoes_painel_pacientes_ad AFTER DELETE ON pacientes BEGIN {_INCREMENTAR_VERSAO.format(unidade='old.unidade')} END",
+    ],
+    'atendimentos': [
+        f"CREATE TRIGGER versoes_painel_atendimentos_ai AFTER INSERT ON atendimentos BEGIN {_INCREMENTAR_VERSAO_ATENDIMENTO.format(paciente_id='new.paciente_id')} END",
+        f"CREATE TRIGGER versoes_painel_atendimentos_au AFTER UPDATE ON atendimentos BEGIN {_INCREMENTAR_VERSAO_ATENDIMENTO.format(paciente_id='new.paciente_id')} END",
+        f"CREATE TRIGGER versoes_painel_atendimentos_ad AFTER DELETE ON atendimentos BEGIN {_INCREMENTAR_VERSAO_ATENDIMENTO.format(paciente_id='old.paciente_id')} END",
+    ],
+}
+for _modelo in (Paciente, Atendimento):
+    for comando in DDL_VERSOES_PAINEL[_modelo.__tablename__]:
+        event.listen(_modelo.__table__, 'after_create', db.DDL(comando).execute_if(dialect='sqlite'))
+
+# Versão da página de cada paciente (dados do paciente, evoluções e anexos), para o ETag de detalhes_paciente.
+# Mesmo cuidado dos triggers acima com batch_alter_table em pacientes, evolucoes ou anexos.
+class VersaoPaciente(db.Model):
+    __tablename__ = 'versoes_paciente'
+    paciente_id = db.Column(db.Integer, primary_key=True)
+    versao = db.Column(db.Integer, nullable=False, default=1)
+    alterado_em = db.Column(db.Float, nullable=False)
+
+_INCREMENTAR_VERSAO_PACIENTE = (f"INSERT INTO versoes_paciente (paciente_id, versao, alterado_em) VALUES ({{paciente_id}}, 1, {_AGORA}) "
+                                "ON CONFLICT (paciente_id) DO UPDATE SET versao = versao + 1, alterado_em = excluded.alterado_em;")
+# Evoluções e anexos só atualizam a versão de um paciente que ainda existe (UPDATE em vez de upsert)
+_INCREMENTAR_VERSAO_REGISTRO = f"UPDATE versoes_paciente SET versao = versao + 1, alterado_em = {_AGORA} WHERE paciente_id = {{paciente_id}};"
+DDL_VERSOES_PACIENTE = {
+    'pacientes': [
+        f"CREATE TRIGGER versoes_paciente_pacientes_ai AFTER INSERT ON pacientes BEGIN {_INCREMENTAR_VERSAO_PACIENTE.format(paciente_id='new.id')} END",
+        f"CREATE TRIGGER versoes_paciente_pacientes_au AFTER UPDATE ON pacientes BEGIN {_INCREMENTAR_VERSAO_PACIENTE.format(paciente_id='new.id')} END",
+        "CREATE TRIGGER versoes_paciente_pacientes_ad AFTER DELETE ON pacientes BEGIN DELETE FROM versoes_paciente WHERE paciente_id = old.id; END",
+    ],
+    'evolucoes': [
+        f"CREATE TRIGGER versoes_paciente_evolucoes_ai AFTER INSERT ON evolucoes BEGIN {_INCREMENTAR_VERSAO_REGISTRO.format(paciente_id='new.paciente_id')} END",
+        f"""CREATE TRIGGER versoes_paciente_evolucoes_au AFTER UPDATE ON evolucoes BEGIN
+            {_INCREMENTAR_VERSAO_REGISTRO.format(paciente_id='old.paciente_id')}
+            {_INCREMENTAR_VERSAO_REGISTRO.format(paciente_id='new.paciente_id')}
+        END""",
+        f"CREATE TRIGGER versoes_paciente_evolucoes_ad AFTER DELETE ON evolucoes BEGIN {_INCREMENTAR_VERSAO_REGISTRO.format(paciente_id='old.paciente_id')} END",
+    ],
+    'anexos': [
+        f"CREATE TRIGGER versoes_paciente_anexos_ai AFTER INSERT ON anexos BEGIN {_INCREMENTAR_VERSAO_REGISTRO.format(paciente_id='new.paciente_id')} END",
+        f"""CREATE TRIGGER versoes_paciente_anexos_au AFTER UPDATE ON anexos BEGIN
+            {_INCREMENTAR_VERSAO_REGISTRO.format(paciente_id='old.paciente_id')}
+            {_INCREMENTAR_VERSAO_REGISTRO.format(paciente_id='new.paciente_id')}
+        END""",
+        f"CREATE TRIGGER versoes_paciente_anexos_ad AFTER DELETE ON anexos BEGIN {_INCREMENTAR_VERSAO_REGISTRO.format(paciente_id='old.paciente_id')} END",
+    ],
+}
+for _modelo in (Paciente, Evolucao, Anexo):
+    for comando in DDL_VERSOES_PACIENTE[_modelo.__tablename__]:
+        event.listen(_modelo.__table__, 'after_create', db.DDL(comando).execute_if(dialect='sqlite'))
+
+# Mapa de leitos. Nas unidades com leitos_fixos só os leitos cadastrados em `leitos` são aceitos; nas demais o leito
+# é texto livre. A validação e o censo ficam em leitos.py.
+class Unidade(db.Model):
+    __tablename__ = 'unidades'
+    nome = db.Column(db.String(50), primary_key=True)
+    ordem = db.Column(db.Integer, nullable=False, default=0)
+    leitos_fixos = db.Column(db.Boolean, nullable=False, default=False)
+
+class Leito(db.Model):
+    __tablename__ = 'leitos'
+    unidade = db.Column(db.String(50), db.ForeignKey('unidades.nome'), primary_key=True)
+    numero = db.Column(db.String(20), primary_key=True)
+    ordem = db.Column(db.Integer, nullable=False, default=0)
+
+# Unidades e leitos do hospital (os mesmos da migração que criou as tabelas), gravados também pelo create_all
+UNIDADES_PADRAO = {
+    '1ª Enfermaria': [str(numero) for numero in range(101, 115)],
+    '2ª Enfermaria': None,
+    '3ª Enfermaria': None,
+    'UTI': [str(numero) for numero in range(1, 7)],
+}
+
+@event.listens_for(Unidade.__table__, 'after_create')
+def _semear_unidades(tabela, conexao, **kw):
+    conexao.execute(tabela.insert(), [{'nome': nome, 'ordem': ordem, 'leitos_fixos': leitos is not None}
+                                      for ordem, (nome, leitos) in enumerate(UNIDADES_PADRAO.items(), 1)])
+
+@event.listens_for(Leito.__table__, 'after_create')
+def _semear_leitos(tabela, conexao, **kw):
+    conexao.execute(tabela.insert(), [{'unidade': nome, 'numero': numero, 'ordem': ordem}
+                                      for nome, leitos in UNIDADES_PADRAO.items() for ordem, numero in enumerate(leitos or [], 1)])
+
+# Ocupação atual dos leitos (um registro por paciente ativo), mantida por triggers em pacientes na mesma transação
+# da internação, transferência ou alta. Mesmo cuidado dos outros triggers com batch_alter_table em pacientes.
+class OcupacaoLeito(db.Model):
+    __tablename__ = 'ocupacao_leitos'
+    unidade = db.Column(db.String(50), primary_key=True)
+    leito = db.Column(db.String(20), primary_key=True)
+    paciente_id = db.Column(db.Integer, nullable=False)
+    __table_args__ = (db.Index('uq_ocupacao_leitos_paciente_id', 'paciente_id', unique=True),)
+
+_OCUPAR_LEITO = ("INSERT INTO ocupacao_leitos (unidade, leito, paciente_id) SELECT new.unidade, new.leito, new.id "
+                 "WHERE new.status = 'Ativo' AND new.leito IS NOT NULL;")
+DDL_OCUPACAO_LEITOS = [
+    f"CREATE TRIGGER ocupacao_leitos_ai AFTER INSERT ON pacientes BEGIN {_OCUPAR_LEITO} END",
+    f"""CREATE TRIGGER ocupacao_leitos_au AFTER UPDATE OF status, unidade, leito ON pacientes BEGIN
+        DELETE FROM ocupacao_leitos WHERE paciente_id = old.id;
+        {_OCUPAR_LEITO}
+    END""",
+    "CREATE TRIGGER ocupacao_leitos_ad AFTER DELETE ON pacientes BEGIN DELETE FROM ocupacao_leitos WHERE paciente_id = old.id; END",
+]
+for comando in DDL_OCUPACAO_LEITOS:
+    event.listen(Paciente.__table__, 'after_create', db.DDL(comando).execute_if(dialect='sqlite'))
+
+# Agregados diários para os relatórios (mantidos pelo relatorios.py; podem ser reconstruídos a partir do histórico)
+class ResumoEvolucoes(db.Model):
+    __tablename__ = 'resumo_evolucoes'
+    data = db.Column(db.Date, primary_key=True)
+    unidade = db.Column(db.String(50), primary_key=True)
+    # Pelo id e não pelo nome, para que renomear o usuário não divida os totais (0: evoluções sem usuário identificado)
+    usuario_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    total = db.Column(db.Integer, nullable=False, default=0)
+
+class ResumoAtendimentos(db.Model):
+    __tablename__ = 'resumo_atendimentos'
+    data = db.Column(db.Date, primary_key=True)
+    unidade = db.Column(db.String(50), primary_key=True)
+    pacientes = db.Column(db.Integer, nullable=False, default=0)
+    turnos_manha = db.Column(db.Integer, nullable=False, default=0)
+    turnos_tarde = db.Column(db.Integer, nullable=False, default=0)
+
+class RegistroAuditoria(db.Model):
+    """Log de auditoria (só inclusão): gravado pelo auditoria.py, protegido contra UPDATE e DELETE por triggers."""
+    __tablename__ = 'auditoria'
+    id = db.Column(db.Integer, primary_key=True)
+    data = db.Column(db.DateTime, nullable=False)
+    usuario_id = db.Column(db.Integer)
+    usuario_nome = db.Column(db.String(100), nullable=False)
+    origem = db.Column(db.String(100), nullable=False)  # endpoint da requisição, ou 'cli'
+    tabela = db.Column(db.String(50), nullable=False)
+    registro_id = db.Column(db.Integer, nullable=False)
+    operacao = db.Column(db.String(20), nullable=False)  # inclusao, alteracao ou exclusao
+    alteracoes = db.Column(db.JSON, nullable=False)  # {campo: [antes, depois]}
+    __table_args__ = (db.Index('ix_auditoria_tabela_registro_id', 'tabela', 'registro_id'),)
+
+DDL_AUDITORIA_SO_INCLUSAO = [
+    """CREATE TRIGGER auditoria_sem_update BEFORE UPDATE ON auditoria BEGIN
+        SELECT RAISE(ABORT, 'O log de auditoria não pode ser alterado');
+    END""",
+    """CREATE TRIGGER auditoria_sem_delete BEFORE DELETE ON auditoria BEGIN
+        SELECT RAISE(ABORT, 'O log de auditoria não pode ser apagado');
+    END""",
+]
+for comando in DDL_AUDITORIA_SO_INCLUSAO:
+    event.listen(RegistroAuditoria.__table__, 'after_create', db.DDL(comando).execute_if(dialect='sqlite'))
+
+# --- Consultas e Funções de Ajuda ---
+_paragraph_re = re.compile(r'(?:\r\n|\r|\n){2,}')
+
+def texto_para_html(texto):
+    """Converte o texto digitado em HTML seguro: conteúdo escapado, parágrafos em <p> e quebras de linha em <br>."""
+    if texto is None: return ""
+    texto_escapado = escape(texto)
+    return u'\n\n'.join(u'<p>%s</p>' % p.replace('\n', '<br>\n') for p in _paragraph_re.split(texto_escapado))
+
+def calcular_idade(nascimento):
+    if not nascimento: return None
+    hoje = date.today()
+    return hoje.year - nascimento.year - ((hoje.month, hoje.day) < (nascimento.month, nascimento.day))
+
+def montar_painel(dia=None, unidades=None):
+    """Monta o painel do dia: pacientes ativos agrupados por unidade, com os atendimentos do dia.
+
+    Usa uma única consulta (LEFT JOIN com os atendimentos do dia), independente do número de pacientes.
+    `unidades` restringe o painel a essas unidades.
+    """
+    dia = dia or date.today()
+    consulta = (db.session.query(Paciente, Atendimento)
+                .outerjoin(Atendimento, db.and_(Atendimento.paciente_id == Paciente.id, Atendimento.data == dia))
+                .filter(Paciente.status == 'Ativo'))
+    if unidades is not None:
+        consulta = consulta.filter(Paciente.unidade.in_(unidades))
+    linhas = consulta.order_by(Paciente.unidade, Paciente.leito).all()
+    painel = {}
+    for paciente, atendimento in linhas:
+        paciente.atendimentos_hoje = {'manha': bool(atendimento and atendimento.turno_manha), 'tarde': bool(atendimento and atendimento.turno_tarde)}
+        painel.setdefault(paciente.unidade, []).append(paciente)
+    return painel
+
+TURNOS = {'manha': 'turno_manha', 'tarde': 'turno_tarde'}
+
+def registrar_atendimentos(alteracoes, dia=None):
+    """Grava um lote de marcações de turno {(paciente_id, turno): valor} na tabela de atendimentos.
+
+    Cada turno vira um único INSERT ... ON CONFLICT (paciente_id, data) DO UPDATE executado em lote,
+    então o lote inteiro custa no máximo dois comandos, na transação da sessão.
+    """
+    dia = dia or date.today()
+    for turno, coluna in TURNOS.items():
+        linhas = [{'paciente_id': paciente_id, 'data': dia, 'turno_manha': False, 'turno_tarde': False, coluna: valor}
+                  for (paciente_id, turno_alterado), valor in alteracoes.items() if turno_alterado == turno]
+        if not linhas: continue
+        comando = sqlite_insert(Atendimento)
+        comando = comando.on_conflict_do_update(index_elements=['paciente_id', 'data'], set_={coluna: getattr(comando.excluded, coluna)})
+        db.session.execute(comando, linhas)
+
+EVOLUCOES_POR_PAGINA = 20
+
+def codificar_cursor(evolucao):
+    return f"{evolucao.data.isoformat()}_{evolucao.id}"
+
+def decodificar_cursor(cursor):
+    try:
+        data_str, id_str = cursor.rsplit('_', 1)
+        return datetime.fromisoformat(data_str), int(id_str)
+    except (ValueError, AttributeError):
+        return None
+
+def buscar_evolucoes(paciente_id, cursor=None, limite=EVOLUCOES_POR_PAGINA):
+    """Retorna uma página do histórico (mais recentes primeiro) e o cursor da página seguinte.
+
+    Paginação por chave (data, id): cada página é uma busca direta no índice ix_evolucoes_paciente_id_data,
+    com custo constante independente do tamanho do histórico.
+    """
+    consulta = Evolucao.query.filter(Evolucao.paciente_id == paciente_id)
+    if cursor:
+        consulta = consulta.filter(db.tuple_(Evolucao.data, Evolucao.id) < cursor)
+    evolucoes = consulta.order_by(Evolucao.data.desc(), Evolucao.id.desc()).limit(limite + 1).all()
+    if len(evolucoes) <= limite:
+        return evolucoes, None
+    evolucoes = evolucoes[:limite]
+    return evolucoes, codificar_cursor(evolucoes[-1])
+
+def evolucoes_do_usuario(usuario_id, dia):
+    """Evoluções do usuário no dia, agrupadas por paciente: [(paciente, [evoluções, mais recentes primeiro])].
+
+    Uma faixa do índice ix_evolucoes_usuario_id_data, então o custo depende só do que o usuário escreveu no dia.
+    """
+    inicio = datetime.combine(dia, time())
+    linhas = db.session.execute(db.select(Evolucao, Paciente).join(Paciente, Paciente.id == Evolucao.paciente_id)
+                                .where(Evolucao.usuario_id == usuario_id, Evolucao.data >= inicio, Evolucao.data < inicio + timedelta(days=1))
+                                .order_by(Evolucao.data.desc(), Evolucao.id.desc()))
+    por_paciente = {}
+    for evolucao, paciente in linhas:
+        por_paciente.setdefault(paciente.id, (paciente, []))[1].append(evolucao)
+    return list(por_paciente.values())
+# --- Índice de Busca do Arquivo (SQLite FTS5) ---
+# Tabelas FTS5 de conteúdo externo sobre pacientes e evolucoes, mantidas em sincronia por triggers no próprio banco.
+# O tokenizer unicode61 com remove_diacritics ignora acentos e maiúsculas ("jose" encontra "José").
+# Atenção: recriar a tabela pacientes ou evolucoes (batch_alter_table no SQLite) apaga os triggers;
+# nesse caso rode `flask reindexar-busca`.
+DDL_INDICE_BUSCA = {
+    'pacientes': [
+        "CREATE VIRTUAL TABLE busca_pacientes USING fts5(nome, diagnostico, content='pacientes', content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+        """CREATE TRIGGER busca_pacientes_ai AFTER INSERT ON pacientes BEGIN
+            INSERT INTO busca_pacientes(rowid, nome, diagnostico) VALUES (new.id, new.nome, new.diagnostico);
+        END""",
+        """CREATE TRIGGER busca_pacientes_ad AFTER DELETE ON pacientes BEGIN
+            INSERT INTO busca_pacientes(busca_pacientes, rowid, nome, diagnostico) VALUES ('delete', old.id, old.nome, old.diagnostico);
+        END""",
+        """CREATE TRIGGER busca_pacientes_au AFTER UPDATE OF nome, diagnostico ON pacientes BEGIN
+            INSERT INTO busca_pacientes(busca_pacientes, rowid, nome, diagnostico) VALUES ('delete', old.id, old.nome, old.diagnostico);
+            INSERT INTO busca_pacientes(rowid, nome, diagnostico) VALUES (new.id, new.nome, new.diagnostico);
+        END""",
+    ],
+    'evolucoes': [
+        "CREATE VIRTUAL TABLE busca_evolucoes USING fts5(texto, paciente_id UNINDEXED, content='evolucoes', content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+        """CREATE TRIGGER busca_evolucoes_ai AFTER INSERT ON evolucoes BEGIN
+            INSERT INTO busca_evolucoes(rowid, texto, paciente_id) VALUES (new.id, new.texto, new.paciente_id);
+        END""",
+        """CREATE TRIGGER busca_evolucoes_ad AFTER DELETE ON evolucoes BEGIN
+            INSERT INTO busca_evolucoes(busca_evolucoes, rowid, texto, paciente_id) VALUES ('delete', old.id, old.texto, old.paciente_id);
+        END""",
+        """CREATE TRIGGER busca_evolucoes_au AFTER UPDATE OF texto, paciente_id ON evolucoes BEGIN
+            INSERT INTO busca_evolucoes(busca_evolucoes, rowid, texto, paciente_id) VALUES ('delete', old.id, old.texto, old.paciente_id);
+            INSERT INTO busca_evolucoes(rowid, texto, paciente_id) VALUES (new.id, new.texto, new.paciente_id);
+        END""",
+    ],
+}
+for _modelo in (Paciente, Evolucao):
+    for comando in DDL_INDICE_BUSCA[_modelo.__tablename__]:
+        event.listen(_modelo.__table__, 'after_create', db.DDL(comando).execute_if(dialect='sqlite'))
+    # O drop_all apaga o índice junto com a tabela (os triggers saem com ela), para o create_all seguinte recriá-lo
+    event.listen(_modelo.__table__, 'before_drop',
+                 db.DDL(f"DROP TABLE IF EXISTS main.busca_{_modelo.__tablename__}").execute_if(dialect='sqlite'))
+
+def recriar_indice_busca():
+    """Apaga e recria as tabelas FTS5 e os triggers, reindexando todo o histórico."""
+    # Com o arquivo morto anexado, um nome sem "main." que não existe no banco principal cairia nas tabelas dele
+    for trigger in ['busca_pacientes_ai', 'busca_pacientes_ad', 'busca_pacientes_au', 'busca_evolucoes_ai', 'busca_evolucoes_ad', 'busca_evolucoes_au']:
+        db.session.execute(db.text(f"DROP TRIGGER IF EXISTS main.{trigger}"))
+    db.session.execute(db.text("DROP TABLE IF EXISTS main.busca_pacientes"))
+    db.session.execute(db.text("DROP TABLE IF EXISTS main.busca_evolucoes"))
+    for comandos in DDL_INDICE_BUSCA.values():
+        for comando in comandos:
+            db.session.execute(db.text(comando))
+    db.session.execute(db.text("INSERT INTO busca_pacientes(busca_pacientes) VALUES ('rebuild')"))
+    db.session.execute(db.text("INSERT INTO busca_evolucoes(busca_evolucoes) VALUES ('rebuild')"))
+    db.session.commit()
+
+def montar_consulta_fts(termo):
+    # Cada palavra vira um prefixo entre aspas ("jos"* encontra "José"); aspas e operadores digitados são ignorados
+    palavras = re.findall(r'\w+', termo)
+    return ' '.join(f'"{p}"*' for p in palavras)
+
+def _consulta_inativos(esquema, incluir_evolucoes):
+    # bm25 é negativo: quanto menor, mais relevante. O nome pesa mais que o diagnóstico.
+    resultados = f"SELECT rowid AS paciente_id, rank FROM {esquema}.busca_pacientes WHERE busca_pacientes MATCH :consulta AND rank MATCH 'bm25(10.0, 1.0)'"
+    if incluir_evolucoes:
+        resultados += f" UNION ALL SELECT paciente_id, rank FROM {esquema}.busca_evolucoes WHERE busca_evolucoes MATCH :consulta"
+    colunas = ', '.join(f"p.{coluna.name}" for coluna in Paciente.__table__.columns)
+    return f"""
+        SELECT {colunas}, r.rank FROM {esquema}.pacientes AS p
+        JOIN (SELECT paciente_id, min(rank) AS rank FROM ({resultados}) GROUP BY paciente_id) AS r ON r.paciente_id = p.id
+        WHERE p.status = 'Inativo'"""
+
+def buscar_pacientes_inativos(termo, incluir_evolucoes=False, limite=100, arquivo_morto=None):
+    """Busca no arquivo por nome e diagnóstico (e, opcionalmente, no texto das evoluções), ordenando por relevância.
+
+    `arquivo_morto` é o esquema anexado com os pacientes arquivados (arquivo_morto.py), buscados junto com os do banco principal.
+    """
+    consulta_fts = montar_consulta_fts(termo)
+    if not consulta_fts: return []
+    sql = _consulta_inativos('main', incluir_evolucoes)
+    if arquivo_morto:
+        # Os já restaurados ficam de fora: a cópia que vale é a do banco principal
+        sql += f" UNION ALL {_consulta_inativos(arquivo_morto, incluir_evolucoes)} AND NOT EXISTS (SELECT 1 FROM main.pacientes WHERE id = p.id)"
+    sql = db.text(f"{sql} ORDER BY rank LIMIT :limite")
+    return db.session.scalars(db.select(Paciente).from_statement(sql), {'consulta': consulta_fts, 'limite': limite}).all()
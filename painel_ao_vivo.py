@@ -0,0 +1,142 @@
+# painel_ao_vivo.py
+# Painel ao vivo por Server-Sent Events. As rotas de escrita anunciam o que mudaram (anunciar_atendimentos,
+# anunciar_painel); os eventos ficam na sessão e só vão para o barramento em memória quando a transação é
+# confirmada. Cada painel conectado recebe as marcações de turno como deltas e, quando uma unidade muda de outra
+# forma (internação, transferência, alta) ou a mudança foi feita em outro worker, o HTML novo da seção da unidade.
+import json
+import queue
+import threading
+import time
+from collections import Counter
+from datetime import date
+
+from sqlalchemy import event
+
+from cache_fragmentos import secoes_unidades
+from models import db, Paciente, VersaoPainel
+
+# --- Anúncios nas Rotas de Escrita ---
+def anunciar_atendimentos(alteracoes):
+    """Anuncia as marcações de turno {(paciente_id, turno): valor} gravadas na transação atual.
+
+    Chamar antes do commit. As versões das unidades são lidas depois do flush, com a transação já dona do lock
+    de escrita: `depois` é exatamente a versão que o commit vai confirmar e `antes` a versão anterior às
+    marcações (cada linha gravada em atendimentos incrementa uma vez a versão da unidade, pelos triggers).
+    Um painel que estava em `antes` só precisa do delta; qualquer outro recebe a seção inteira.
+    """
+    db.session.flush()
+    ids = {paciente_id for paciente_id, _ in alteracoes}
+    linhas = db.session.execute(db.select(Paciente.id, Paciente.unidade, VersaoPainel.versao)
+                                .join(VersaoPainel, VersaoPainel.unidade == Paciente.unidade).where(Paciente.id.in_(ids))).all()
+    unidades = {paciente_id: unidade for paciente_id, unidade, _ in linhas}
+    versoes = {unidade: versao for _, unidade, versao in linhas}
+    marcacoes = Counter(unidades[paciente_id] for paciente_id, _ in alteracoes if paciente_id in unidades)
+    _guardar({'tipo': 'atendimentos',
+              'alteracoes': [{'paciente_id': paciente_id, 'turno': turno, 'valor': valor} for (paciente_id, turno), valor in alteracoes.items()],
+              'versoes': {unidade: (versoes[unidade] - quantidade, versoes[unidade]) for unidade, quantidade in marcacoes.items()}})
+
+def anunciar_painel():
+    """Anuncia uma mudança nos pacientes do painel: os painéis conectados conferem as versões e recebem as seções novas."""
+    _guardar({'tipo': 'painel'})
+
+def _guardar(evento):
+    db.session.info.setdefault('eventos_painel', []).append(evento)
+
+def _apos_commit(sessao):
+    for evento in sessao.info.pop('eventos_painel', []):
+        barramento.publicar(evento)
+
+def _apos_rollback(sessao):
+    sessao.info.pop('eventos_painel', None)
+
+# --- Barramento ---
+class Barramento:
+    """Publicação/assinatura entre as threads do processo: cada painel conectado assina uma fila.
+
+    Com vários workers cada um tem o seu barramento; o que acontece nos outros chega aos painéis pela
+    conferência periódica das versões (a cada `intervalo` segundos).
+    """
+    def __init__(self, conexoes=12, intervalo=5.0, duracao=600, espera=30, tamanho_fila=200):
+        self.conexoes, self.intervalo, self.duracao, self.espera, self.tamanho_fila = conexoes, intervalo, duracao, espera, tamanho_fila
+        self._filas = set()
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.conexoes = app.config['PAINEL_AO_VIVO_CONEXOES']
+        self.intervalo = app.config['PAINEL_AO_VIVO_INTERVALO']
+        self.duracao = app.config['PAINEL_AO_VIVO_DURACAO']
+        self.espera = app.config['PAINEL_AO_VIVO_ESPERA']
+        if not event.contains(db.session, 'after_commit', _apos_commit):
+            event.listen(db.session, 'after_commit', _apos_commit)
+            event.listen(db.session, 'after_rollback', _apos_rollback)
+
+    def assinar(self):
+        """Fila de eventos de uma nova conexão, ou None se o processo já atende o máximo de conexões."""
+        with self._lock:
+            if len(self._filas) >= self.conexoes: return None
+            fila = queue.Queue(self.tamanho_fila)
+            self._filas.add(fila)
+            return fila
+
+    def cancelar(self, fila):
+        with self._lock:
+            self._filas.discard(fila)
+
+    def publicar(self, evento):
+        with self._lock:
+            filas = list(self._filas)
+        for fila in filas:
+            try:
+                fila.put_nowait(evento)
+            except queue.Full:
+                pass  # conexão atrasada: perde o delta e recebe a seção inteira na próxima conferência das versões
+
+barramento = Barramento()
+
+# --- Fluxo de Eventos ---
+def _evento(tipo, dados):
+    return f"event: {tipo}\ndata: {json.dumps(dados, ensure_ascii=False)}\n\n"
+
+def _conferir_versoes(dia, conhecidas):
+    """Eventos 'unidade' com o HTML das seções cuja versão difere da que o painel conhece."""
+    versoes = db.session.execute(db.select(VersaoPainel.unidade, VersaoPainel.versao).order_by(VersaoPainel.unidade)).all()
+    mudaram = {unidade: versao for unidade, versao in versoes if conhecidas.get(unidade) != versao}
+    if not mudaram: return
+    secoes = secoes_unidades(dia, mudaram)
+    ordem = [unidade for unidade, _ in versoes]
+    for unidade, versao in mudaram.items():
+        mostrada = unidade in conhecidas
+        conhecidas[unidade] = versao
+        if not mostrada and not secoes[unidade]: continue  # unidade vazia, que o painel nem mostra
+        yield _evento('unidade', {'unidade': unidade, 'versao': versao, 'html': str(secoes[unidade]), 'ordem': ordem})
+
+def transmitir(fila, versoes):
+    """Gera o fluxo text/event-stream de um painel que mostra as seções `versoes` ({unidade: versao}).
+
+    Roda dentro do contexto da requisição (stream_with_context), para renderizar as seções. Entre uma
+    conferência e outra devolve a conexão do banco ao pool, para não prender uma por painel aberto.
+    """
+    dia = date.today()
+    conhecidas = dict(versoes)
+    fim = time.monotonic() + barramento.duracao
+    while True:
+        if date.today() != dia:
+            yield _evento('recarregar', {}); return
+        yield from _conferir_versoes(dia, conhecidas)
+        db.session.close()
+        if time.monotonic() >= fim: return
+        try:
+            eventos = [fila.get(timeout=barramento.intervalo)]
+        except queue.Empty:
+            yield ": ping\n\n"  # mantém a conexão viva e detecta painéis que foram fechados
+            continue
+        while True:
+            try: eventos.append(fila.get_nowait())
+            except queue.Empty: break
+        for evento in eventos:
+            if evento['tipo'] != 'atendimentos': continue  # 'painel': a conferência das versões no início do laço resolve
+            atualizadas = {}
+            for unidade, (antes, depois) in evento['versoes'].items():
+                if conhecidas.get(unidade) == antes:
+                    conhecidas[unidade] = atualizadas[unidade] = depois
+            yield _evento('atendimentos', {'alteracoes': evento['alteracoes'], 'versoes': atualizadas})
@@ -0,0 +1,120 @@
+# relatorios.py
+# Relatórios de produtividade: agregados diários por data, unidade e fisioterapeuta (pelo id do usuário).
+# Os painéis do administrador leem só as tabelas de resumo (uma linha por dia/unidade/usuário),
+# nunca evolucoes e atendimentos, então o custo não cresce com o histórico.
+from datetime import date, datetime, time
+
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from models import db, Usuario, Paciente, Evolucao, Atendimento, ResumoEvolucoes, ResumoAtendimentos
+from arquivo_morto import arquivo_morto
+
+SEM_USUARIO = 0  # usuario_id do resumo para as evoluções cujo autor não foi identificado
+
+# --- Atualização Incremental ---
+def contabilizar_evolucao(evolucao, unidade, usuario_id):
+    """Soma uma evolução de `usuario_id` (quem a assinou) ao resumo do dia, na mesma transação que a grava."""
+    comando = sqlite_insert(ResumoEvolucoes).values(data=evolucao.data.date(), unidade=unidade, usuario_id=usuario_id, total=1)
+    comando = comando.on_conflict_do_update(index_elements=['data', 'unidade', 'usuario_id'], set_={'total': ResumoEvolucoes.total + 1})
+    db.session.execute(comando)
+
+def _consulta_atendimentos():
+    # Turnos marcados por dia e unidade; um paciente conta uma vez mesmo se atendido nos dois turnos
+    return (db.select(Atendimento.data, Paciente.unidade,
+                      db.func.count(),
+                      db.func.sum(db.cast(Atendimento.turno_manha, db.Integer)),
+                      db.func.sum(db.cast(Atendimento.turno_tarde, db.Integer)))
+            .join(Paciente, Paciente.id == Atendimento.paciente_id)
+            .where(db.or_(Atendimento.turno_manha, Atendimento.turno_tarde))
+            .group_by(Atendimento.data, Paciente.unidade))
+
+def atualizar_resumo_atendimentos(dia):
+    """Recalcula o resumo de atendimentos de um dia.
+
+    As marcações do painel podem ser desfeitas, então o dia é recontado em vez de somado;
+    a consulta usa ix_atendimentos_data e lê só os atendimentos daquele dia.
+    """
+    colunas = ['data', 'unidade', 'pacientes', 'turnos_manha', 'turnos_tarde']
+    db.session.execute(db.delete(ResumoAtendimentos).where(ResumoAtendimentos.data == dia))
+    db.session.execute(db.insert(ResumoAtendimentos).from_select(colunas, _consulta_atendimentos().where(Atendimento.data == dia)))
+
+# --- Reconstrução a Partir do Histórico ---
+def reconstruir_resumos(desde=None):
+    """Apaga e recalcula os resumos (todos, ou a partir da data `desde`) a partir de evolucoes e atendimentos.
+
+    A unidade usada é a atual de cada paciente: dias anteriores a uma transferência passam para a nova unidade.
+    Os pacientes do arquivo morto também entram, somados aos do banco principal.
+    """
+    if arquivo_morto.ativo: arquivo_morto.descartar_restaurados()  # senão os restaurados contariam duas vezes
+    dia_evolucao, usuario = db.func.date(Evolucao.data), db.func.coalesce(Evolucao.usuario_id, SEM_USUARIO)
+    consulta_evolucoes = (db.select(dia_evolucao, Paciente.unidade, usuario, db.func.count())
+                          .join(Paciente, Paciente.id == Evolucao.paciente_id)
+                          .group_by(dia_evolucao, Paciente.unidade, usuario))
+    consulta_atendimentos = _consulta_atendimentos()
+    apagar_evolucoes, apagar_atendimentos = db.delete(ResumoEvolucoes), db.delete(ResumoAtendimentos)
+    if desde:
+        consulta_evolucoes = consulta_evolucoes.where(Evolucao.data >= datetime.combine(desde, time()))
+        consulta_atendimentos = consulta_atendimentos.where(Atendimento.data >= desde)
+        apagar_evolucoes = apagar_evolucoes.where(ResumoEvolucoes.data >= desde)
+        apagar_atendimentos = apagar_atendimentos.where(ResumoAtendimentos.data >= desde)
+
+    db.session.execute(apagar_evolucoes)
+    db.session.execute(apagar_atendimentos)
+    db.session.execute(db.insert(ResumoEvolucoes).from_select(['data', 'unidade', 'usuario_id', 'total'], consulta_evolucoes))
+    db.session.execute(db.insert(ResumoAtendimentos).from_select(['data', 'unidade', 'pacientes', 'turnos_manha', 'turnos_tarde'], consulta_atendimentos))
+    if arquivo_morto.ativo:
+        with arquivo_morto.lendo():
+            evolucoes_arquivadas = db.session.execute(consulta_evolucoes).all()
+            atendimentos_arquivados = db.session.execute(consulta_atendimentos).all()
+        if evolucoes_arquivadas:
+            comando = sqlite_insert(ResumoEvolucoes)
+            comando = comando.on_conflict_do_update(index_elements=['data', 'unidade', 'usuario_id'], set_={'total': ResumoEvolucoes.total + comando.excluded.total})
+            db.session.execute(comando, [{'data': date.fromisoformat(dia), 'unidade': unidade, 'usuario_id': usuario_id, 'total': total}
+                                         for dia, unidade, usuario_id, total in evolucoes_arquivadas])
+        if atendimentos_arquivados:
+            comando = sqlite_insert(ResumoAtendimentos)
+            comando = comando.on_conflict_do_update(index_elements=['data', 'unidade'], set_={
+                coluna: getattr(ResumoAtendimentos, coluna) + getattr(comando.excluded, coluna) for coluna in ['pacientes', 'turnos_manha', 'turnos_tarde']})
+            db.session.execute(comando, [{'data': dia, 'unidade': unidade, 'pacientes': pacientes, 'turnos_manha': manha, 'turnos_tarde': tarde}
+                                         for dia, unidade, pacientes, manha, tarde in atendimentos_arquivados])
+    db.session.commit()
+
+# --- Consultas dos Painéis ---
+def relatorio_produtividade(inicio, fim):
+    """Totais do período [inicio, fim]: por dia, por fisioterapeuta e por unidade."""
+    evolucoes_no_periodo = ResumoEvolucoes.data.between(inicio, fim)
+    atendimentos_no_periodo = ResumoAtendimentos.data.between(inicio, fim)
+
+    por_dia = {}
+    for dia, pacientes, manha, tarde in db.session.execute(
+            db.select(ResumoAtendimentos.data, db.func.sum(ResumoAtendimentos.pacientes),
+                      db.func.sum(ResumoAtendimentos.turnos_manha), db.func.sum(ResumoAtendimentos.turnos_tarde))
+            .where(atendimentos_no_periodo).group_by(ResumoAtendimentos.data)):
+        por_dia[dia] = {'pacientes': pacientes, 'turnos_manha': manha, 'turnos_tarde': tarde, 'evolucoes': 0}
+    for dia, total in db.session.execute(
+            db.select(ResumoEvolucoes.data, db.func.sum(ResumoEvolucoes.total))
+            .where(evolucoes_no_periodo).group_by(ResumoEvolucoes.data)):
+        por_dia.setdefault(dia, {'pacientes': 0, 'turnos_manha': 0, 'turnos_tarde': 0})['evolucoes'] = total
+
+    # Com o nome atual de cada usuário
+    total_fisio = db.func.sum(ResumoEvolucoes.total)
+    por_fisio = db.session.execute(
+        db.select(db.func.coalesce(Usuario.nome_completo, 'Sem usuário identificado'), total_fisio, db.func.count(db.distinct(ResumoEvolucoes.data)))
+        .select_from(ResumoEvolucoes).outerjoin(Usuario, Usuario.id == ResumoEvolucoes.usuario_id)
+        .where(evolucoes_no_periodo).group_by(ResumoEvolucoes.usuario_id).order_by(total_fisio.desc())).all()
+
+    por_unidade = {}
+    for unidade, pacientes in db.session.execute(
+            db.select(ResumoAtendimentos.unidade, db.func.sum(ResumoAtendimentos.pacientes))
+            .where(atendimentos_no_periodo).group_by(ResumoAtendimentos.unidade)):
+        por_unidade[unidade] = {'atendimentos': pacientes, 'evolucoes': 0}
+    for unidade, total in db.session.execute(
+            db.select(ResumoEvolucoes.unidade, db.func.sum(ResumoEvolucoes.total))
+            .where(evolucoes_no_periodo).group_by(ResumoEvolucoes.unidade)):
+        por_unidade.setdefault(unidade, {'atendimentos': 0})['evolucoes'] = total
+
+    return {
+        'por_dia': sorted(por_dia.items()),
+        'por_fisio': por_fisio,
+        'por_unidade': sorted(por_unidade.items()),
+    }
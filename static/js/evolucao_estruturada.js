@@ -0,0 +1,88 @@
+document.addEventListener('DOMContentLoaded', function() {
+
+    // --- CAMPOS DOS MODELOS DE EVOLUÇÃO ---
+    // Mostra só os campos do modelo escolhido; os demais ficam desabilitados e não vão no formulário.
+    // Com um modelo o texto livre passa a ser opcional (o resumo dos campos já entra na evolução).
+    const modeloSelect = document.getElementById('modelo');
+    const texto = document.getElementById('evolucao');
+    if (modeloSelect && texto) {
+        const fieldsets = document.querySelectorAll('fieldset[data-modelo]');
+        modeloSelect.addEventListener('change', function() {
+            fieldsets.forEach(fieldset => {
+                const ativo = fieldset.dataset.modelo === modeloSelect.value;
+                fieldset.hidden = !ativo;
+                fieldset.disabled = !ativo;
+            });
+            texto.required = !modeloSelect.value;
+        });
+    }
+
+    // --- GRÁFICO DE TENDÊNCIAS ---
+    // Desenha em SVG a série do parâmetro escolhido (GET /paciente/<id>/series).
+    const card = document.getElementById('tendencias');
+    if (!card) { return; }
+    const parametroSelect = document.getElementById('tendencia-parametro');
+    const diasSelect = document.getElementById('tendencia-dias');
+    const grafico = document.getElementById('tendencia-grafico');
+    const vazio = document.getElementById('tendencia-vazio');
+    const SVG = 'http://www.w3.org/2000/svg';
+    const LARGURA = 600, ALTURA = 200, MARGEM = { esquerda: 48, direita: 12, topo: 12, base: 28 };
+
+    function elemento(nome, atributos, textoElemento) {
+        const el = document.createElementNS(SVG, nome);
+        Object.entries(atributos).forEach(([chave, valor]) => el.setAttribute(chave, valor));
+        if (textoElemento !== undefined) { el.textContent = textoElemento; }
+        return el;
+    }
+
+    function formatar(valor) {
+        return String(Math.round(valor * 10) / 10).replace('.', ',');
+    }
+
+    function desenhar(serie) {
+        grafico.replaceChildren();
+        const pontos = serie.pontos;
+        vazio.hidden = pontos.length > 0;
+        grafico.style.display = pontos.length ? '' : 'none';
+        if (!pontos.length) { return; }
+
+        const tempos = pontos.map(p => new Date(p.data).getTime());
+        const valores = pontos.map(p => p.valor);
+        const fim = new Date(); fim.setHours(23, 59, 59, 999);
+        const inicio = new Date(fim); inicio.setDate(inicio.getDate() - serie.dias); inicio.setMilliseconds(1);
+        let minimo = Math.min(...valores), maximo = Math.max(...valores);
+        if (minimo === maximo) { minimo -= 1; maximo += 1; }
+        const x = t => MARGEM.esquerda + (t - inicio.getTime()) / (fim.getTime() - inicio.getTime()) * (LARGURA - MARGEM.esquerda - MARGEM.direita);
+        const y = v => ALTURA - MARGEM.base - (v - minimo) / (maximo - minimo) * (ALTURA - MARGEM.topo - MARGEM.base);
+
+        [minimo, (minimo + maximo) / 2, maximo].forEach(valor => {
+            grafico.appendChild(elemento('line', { x1: MARGEM.esquerda, x2: LARGURA - MARGEM.direita, y1: y(valor), y2: y(valor), class: 'trend-chart__grid' }));
+            grafico.appendChild(elemento('text', { x: MARGEM.esquerda - 6, y: y(valor) + 4, 'text-anchor': 'end', class: 'trend-chart__label' }, formatar(valor)));
+        });
+        [inicio, fim].forEach((data, i) => {
+            grafico.appendChild(elemento('text', { x: i ? LARGURA - MARGEM.direita : MARGEM.esquerda, y: ALTURA - 8, 'text-anchor': i ? 'end' : 'start', class: 'trend-chart__label' },
+                                         data.toLocaleDateString('pt-BR')));
+        });
+        grafico.appendChild(elemento('polyline', { points: tempos.map((t, i) => x(t) + ',' + y(valores[i])).join(' '), class: 'trend-chart__line' }));
+        tempos.forEach((t, i) => {
+            const ponto = elemento('circle', { cx: x(t), cy: y(valores[i]), r: 3.5, class: 'trend-chart__point' });
+            ponto.appendChild(elemento('title', {}, new Date(t).toLocaleString('pt-BR') + ': ' + formatar(valores[i]) + (serie.unidade ? ' ' + serie.unidade : '')));
+            grafico.appendChild(ponto);
+        });
+    }
+
+    function carregar() {
+        const parametros = new URLSearchParams({ parametro: parametroSelect.value, dias: diasSelect.value });
+        fetch(card.dataset.url + '?' + parametros, { headers: { 'Accept': 'application/json' } })
+            .then(resposta => {
+                if (!resposta.ok) { throw new Error('Falha ao carregar a série'); }
+                return resposta.json();
+            })
+            .then(desenhar)
+            .catch(() => { grafico.replaceChildren(); vazio.hidden = false; });
+    }
+
+    parametroSelect.addEventListener('change', carregar);
+    diasSelect.addEventListener('change', carregar);
+    carregar();
+});
@@ -0,0 +1,31 @@
+document.addEventListener('DOMContentLoaded', function() {
+
+    // --- LÓGICA PARA CARREGAR EVOLUÇÕES ANTERIORES (PAGINAÇÃO) ---
+    const botao = document.getElementById('carregar-anteriores');
+    const historico = document.getElementById('historico-evolucoes');
+
+    if (!botao || !historico) { return; }
+
+    botao.addEventListener('click', function() {
+        botao.disabled = true;
+        const url = botao.dataset.url + '?antes=' + encodeURIComponent(botao.dataset.cursor);
+
+        fetch(url, { headers: { 'Accept': 'application/json' } })
+            .then(resposta => {
+                if (!resposta.ok) { throw new Error('Falha ao carregar o histórico'); }
+                return resposta.json();
+            })
+            .then(pagina => {
+                historico.insertAdjacentHTML('beforeend', pagina.html);
+                if (pagina.proximo) {
+                    botao.dataset.cursor = pagina.proximo;
+                    botao.disabled = false;
+                } else {
+                    botao.parentElement.remove();
+                }
+            })
+            .catch(() => {
+                botao.disabled = false;
+            });
+    });
+});
@@ -0,0 +1,158 @@
+document.addEventListener('DOMContentLoaded', function() {
+
+    // --- LÓGICA PARA MARCAR ATENDIMENTOS DIRETO NO PAINEL ---
+    // As marcações são agrupadas e enviadas em lote, sem recarregar a página.
+    const painel = document.getElementById('painel-atendimentos');
+    if (!painel) { return; }
+
+    const url = painel.dataset.url;
+    const ESPERA_MS = 400;
+    let pendentes = new Map();   // "paciente_id:turno" -> {paciente_id, turno, valor}
+    let temporizador = null;
+
+    function checkboxDe(pacienteId, turno) {
+        return document.getElementById(turno + '-' + pacienteId);
+    }
+
+    function enviarLote() {
+        temporizador = null;
+        if (pendentes.size === 0) { return; }
+        const lote = pendentes;
+        pendentes = new Map();
+
+        fetch(url, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json', 'Accept': 'application/json' },
+            body: JSON.stringify({ alteracoes: Array.from(lote.values()) })
+        })
+            .then(resposta => {
+                if (!resposta.ok) { throw new Error('Falha ao salvar os atendimentos'); }
+            })
+            .catch(() => {
+                // Desfaz as marcações que não foram salvas (a não ser que já tenham sido alteradas de novo)
+                lote.forEach((marcacao, chave) => {
+                    const checkbox = checkboxDe(marcacao.paciente_id, marcacao.turno);
+                    if (checkbox && !pendentes.has(chave)) { checkbox.checked = !marcacao.valor; }
+                });
+                alert('Não foi possível salvar os atendimentos. Tente novamente.');
+            });
+    }
+
+    // Delegação de eventos: as seções das unidades podem ser substituídas pelo painel ao vivo
+    document.addEventListener('change', function(evento) {
+        const checkbox = evento.target;
+        if (!checkbox.matches('input[data-paciente-id][data-turno]')) { return; }
+        const marcacao = { paciente_id: Number(checkbox.dataset.pacienteId), turno: checkbox.dataset.turno, valor: checkbox.checked };
+        pendentes.set(marcacao.paciente_id + ':' + marcacao.turno, marcacao);
+        if (temporizador) { clearTimeout(temporizador); }
+        temporizador = setTimeout(enviarLote, ESPERA_MS);
+    });
+
+    // --- PAINEL AO VIVO (Server-Sent Events) ---
+    // Recebe as marcações feitas em outros tablets e o HTML novo das unidades que mudaram.
+    const secoes = document.getElementById('painel-secoes');
+    const urlEventos = painel.dataset.eventos;
+    if (!secoes || !urlEventos || !window.EventSource) { return; }
+    const RECONEXAO_MS = 3000;
+    // Conexão recusada (limite de painéis do servidor) ou servidor fora do ar: a espera cresce a cada nova recusa,
+    // nunca abaixo do Retry-After do servidor nem acima de ESPERA_MAXIMA_MS, com um sorteio para os tablets não
+    // tentarem todos juntos. Enquanto isso a página do painel é conferida por GET condicional (304 se nada mudou).
+    const ESPERA_RECUSA_MS = Number(painel.dataset.espera || 30) * 1000;
+    const ESPERA_MAXIMA_MS = 5 * 60 * 1000;
+    const REVALIDACAO_MS = Number(painel.dataset.revalidacao || 15) * 1000;
+    let recusas = 0;
+    let revalidacao = null;
+
+    function secaoDe(unidade) {
+        return secoes.querySelector('[data-unidade="' + CSS.escape(unidade) + '"]');
+    }
+
+    function versoesAtuais() {
+        const versoes = {};
+        secoes.querySelectorAll('[data-unidade]').forEach(secao => { versoes[secao.dataset.unidade] = Number(secao.dataset.versao); });
+        return versoes;
+    }
+
+    function atualizarUnidade(dados) {
+        let secao = secaoDe(dados.unidade);
+        if (!dados.html) {
+            if (secao) { secao.remove(); }
+            return;
+        }
+        if (!secao) {
+            secao = document.createElement('div');
+            secao.dataset.unidade = dados.unidade;
+            const seguinte = dados.ordem.slice(dados.ordem.indexOf(dados.unidade) + 1).map(secaoDe).find(Boolean);
+            secoes.insertBefore(secao, seguinte || null);
+        }
+        secao.dataset.versao = dados.versao;
+        secao.innerHTML = dados.html;
+        // Marcações deste tablet que ainda não foram enviadas continuam valendo sobre o HTML novo
+        pendentes.forEach(marcacao => {
+            const checkbox = checkboxDe(marcacao.paciente_id, marcacao.turno);
+            if (checkbox) { checkbox.checked = marcacao.valor; }
+        });
+    }
+
+    function aplicarAtendimentos(dados) {
+        dados.alteracoes.forEach(marcacao => {
+            if (pendentes.has(marcacao.paciente_id + ':' + marcacao.turno)) { return; }
+            const checkbox = checkboxDe(marcacao.paciente_id, marcacao.turno);
+            if (checkbox) { checkbox.checked = marcacao.valor; }
+        });
+        Object.entries(dados.versoes).forEach(([unidade, versao]) => {
+            const secao = secaoDe(unidade);
+            if (secao) { secao.dataset.versao = versao; }
+        });
+    }
+
+    function revalidar() {
+        // O navegador manda o ETag da página guardada; com um 304 ele devolve a cópia que já tem
+        fetch(window.location.href, { cache: 'no-cache', headers: { 'Accept': 'text/html' } })
+            .then(resposta => (resposta.ok ? resposta.text() : null))
+            .then(html => {
+                const novas = html && new DOMParser().parseFromString(html, 'text/html').getElementById('painel-secoes');
+                if (!novas) { return; }
+                const ordem = Array.from(novas.children, secao => secao.dataset.unidade);
+                Array.from(novas.children).forEach(nova => {
+                    const atual = secaoDe(nova.dataset.unidade);
+                    if (!atual || atual.dataset.versao !== nova.dataset.versao) {
+                        atualizarUnidade({ unidade: nova.dataset.unidade, versao: Number(nova.dataset.versao), html: nova.innerHTML, ordem: ordem });
+                    }
+                });
+                Array.from(secoes.children).forEach(atual => {
+                    if (!ordem.includes(atual.dataset.unidade)) { atualizarUnidade({ unidade: atual.dataset.unidade, html: null }); }
+                });
+            })
+            .catch(() => {});
+    }
+
+    function esperaAposRecusa() {
+        recusas += 1;
+        const teto = Math.min(ESPERA_MAXIMA_MS, ESPERA_RECUSA_MS * 2 ** recusas);
+        return ESPERA_RECUSA_MS + Math.random() * Math.max(teto - ESPERA_RECUSA_MS, 0);
+    }
+
+    function conectar() {
+        // A reconexão é feita aqui (e não pelo EventSource) para mandar as versões atuais de novo
+        const fonte = new EventSource(urlEventos + '?versoes=' + encodeURIComponent(JSON.stringify(versoesAtuais())));
+        let aberta = false;
+        fonte.onopen = () => {
+            aberta = true;
+            recusas = 0;
+            if (revalidacao) { clearInterval(revalidacao); revalidacao = null; }
+        };
+        fonte.addEventListener('unidade', evento => atualizarUnidade(JSON.parse(evento.data)));
+        fonte.addEventListener('atendimentos', evento => aplicarAtendimentos(JSON.parse(evento.data)));
+        fonte.addEventListener('recarregar', () => { fonte.close(); window.location.reload(); });
+        fonte.onerror = () => {
+            fonte.close();
+            // Um fluxo que chegou a abrir terminou (PAINEL_AO_VIVO_DURACAO, reinício do worker): reconecta logo.
+            // O EventSource não mostra o status da resposta; sem abrir, a conexão foi recusada (503) ou o servidor caiu.
+            if (aberta) { setTimeout(conectar, RECONEXAO_MS); return; }
+            if (!revalidacao) { revalidacao = setInterval(revalidar, REVALIDACAO_MS); }
+            setTimeout(conectar, esperaAposRecusa());
+        };
+    }
+    conectar();
+});
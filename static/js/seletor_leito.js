@@ -0,0 +1,61 @@
+document.addEventListener('DOMContentLoaded', function() {
+
+    // --- SELETOR DE LEITOS LIVRES ---
+    // Nas unidades com mapa de leitos o campo vira uma lista só com os leitos livres (consultados em /censo);
+    // nas demais o leito continua sendo digitado. Usado no cadastro/edição e na transferência de pacientes.
+    document.querySelectorAll('select[data-leitos]').forEach(function(unidadeSelect) {
+        const container = document.getElementById(unidadeSelect.dataset.leitos);
+        const dados = unidadeSelect.dataset;
+
+        function leitoInicial() {
+            return unidadeSelect.value === dados.unidadeAtual ? (dados.leitoAtual || '') : '';
+        }
+
+        function campoTexto() {
+            const input = document.createElement('input');
+            input.type = 'text';
+            input.id = 'leito';
+            input.name = 'leito';
+            input.className = 'form-control';
+            input.placeholder = 'Leito';
+            input.value = leitoInicial();
+            input.required = true;
+            return input;
+        }
+
+        function campoLista(livres) {
+            const select = document.createElement('select');
+            select.id = 'leito';
+            select.name = 'leito';
+            select.className = 'form-select';
+            select.required = true;
+            if (livres.length === 0) {
+                select.appendChild(new Option('Nenhum leito livre', '', true, true));
+                select.options[0].disabled = true;
+            }
+            livres.forEach(numero => {
+                select.appendChild(new Option(`Leito ${numero}`, numero, false, numero === leitoInicial()));
+            });
+            return select;
+        }
+
+        function atualizar() {
+            if (!unidadeSelect.value) { return; }
+            const parametros = new URLSearchParams({ unidade: unidadeSelect.value });
+            if (dados.paciente) { parametros.set('paciente', dados.paciente); }
+            fetch(dados.censo + '?' + parametros, { headers: { 'Accept': 'application/json' } })
+                .then(resposta => {
+                    if (!resposta.ok) { throw new Error('Falha ao consultar os leitos'); }
+                    return resposta.json();
+                })
+                .then(resultado => {
+                    const unidade = resultado.unidades[0];
+                    container.replaceChildren(unidade && unidade.leitos_fixos ? campoLista(unidade.livres) : campoTexto());
+                })
+                .catch(() => container.replaceChildren(campoTexto()));
+        }
+
+        unidadeSelect.addEventListener('change', atualizar);
+        atualizar();
+    });
+});
@@ -0,0 +1,38 @@
+import pytest
+from werkzeug.security import generate_password_hash
+
+from app import create_app
+from models import db, Usuario
+
+
+@pytest.fixture
+def app(tmp_path):
+    """Aplicação sobre um banco SQLite temporário, criado pelo create_all (sem arquivo morto)."""
+    app = create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + str(tmp_path / 'hospital.db'),
+        'ANEXOS_DIRETORIO': str(tmp_path / 'anexos'),
+        'ARQUIVO_MORTO_BANCO': '',
+    })
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.engine.dispose()
+
+
+@pytest.fixture
+def usuario(app):
+    usuario = Usuario(nome_completo='Ana Fisio', email='ana@hospital', senha_hash=generate_password_hash('senha'), funcao='admin')
+    db.session.add(usuario)
+    db.session.commit()
+    return usuario
+
+
+@pytest.fixture
+def cliente(app, usuario):
+    """Cliente de teste já logado como `usuario`."""
+    cliente = app.test_client()
+    with cliente.session_transaction() as sessao:
+        sessao['_user_id'] = str(usuario.id)
+    return cliente
@@ -0,0 +1,14 @@
+import pytest
+
+
+@pytest.mark.parametrize('corpo', [{'alteracoes': 5}, {'alteracoes': {'paciente_id': 1}}, [{'paciente_id': 1}], 'manha'])
+def test_marcar_atendimentos_recusa_corpo_fora_do_formato(cliente, corpo):
+    resposta = cliente.post('/atendimentos', json=corpo)
+    assert resposta.status_code == 400
+    assert resposta.get_json() == {'erro': 'Formato inválido.'}
+
+
+def test_marcar_atendimentos_sem_alteracoes(cliente):
+    resposta = cliente.post('/atendimentos', json={})
+    assert resposta.status_code == 400
+    assert resposta.get_json() == {'erro': 'Nenhuma alteração enviada.'}
@@ -0,0 +1,52 @@
+from datetime import datetime
+
+from sqlalchemy import create_engine, event
+
+from auditoria import EscritorAuditoria
+from models import db, RegistroAuditoria
+
+
+def _registro(registro_id, **campos):
+    return {'data': datetime(2026, 1, 1), 'usuario_id': None, 'usuario_nome': 'sistema', 'origem': 'cli', 'tabela': 'pacientes',
+            'registro_id': registro_id, 'operacao': 'alteracao', 'alteracoes': {'leito': ['1', '2']}, **campos}
+
+
+def _escritor(engine, **parametros):
+    # Intervalo longo: a thread do escritor não descarrega durante o teste
+    escritor = EscritorAuditoria(intervalo=3600, **parametros)
+    escritor.engine = engine
+    return escritor
+
+
+def test_descarregar_grava_uma_transacao_por_lote(app):
+    escritor = _escritor(db.engine, tamanho_lote=2)
+    escritor._buffer = [_registro(numero) for numero in range(5)]
+    comandos = []
+    def contar(conn, cursor, statement, parameters, context, executemany):
+        comandos.append(statement)
+    event.listen(db.engine, 'before_cursor_execute', contar)
+    try:
+        escritor.descarregar()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', contar)
+    assert sum(comando.startswith('INSERT INTO auditoria') for comando in comandos) == 3
+    assert db.session.scalar(db.select(db.func.count(RegistroAuditoria.id))) == 5
+
+
+def test_registro_ruim_nao_impede_os_demais(app):
+    escritor = _escritor(db.engine)
+    escritor._buffer = [_registro(1), _registro(2, operacao=None), _registro(3)]
+    escritor.descarregar()
+    assert escritor._buffer == []
+    assert db.session.scalars(db.select(RegistroAuditoria.registro_id).order_by(RegistroAuditoria.id)).all() == [1, 3]
+
+
+def test_banco_indisponivel_devolve_ao_buffer_limitado(tmp_path):
+    # Um banco sem a tabela de auditoria recusa a gravação com OperationalError, como um banco travado
+    escritor = _escritor(create_engine('sqlite:///' + str(tmp_path / 'vazio.db')), tamanho_maximo=3)
+    escritor.adicionar([_registro(numero) for numero in range(2)])
+    escritor.descarregar()
+    assert [registro['registro_id'] for registro in escritor._buffer] == [0, 1]
+
+    escritor.adicionar([_registro(numero) for numero in range(2, 5)])
+    assert [registro['registro_id'] for registro in escritor._buffer] == [2, 3, 4]
@@ -0,0 +1,29 @@
+from datetime import date, datetime
+
+from models import db, Paciente, Evolucao
+
+
+def test_busca_do_arquivo_funciona_num_banco_criado_pelo_create_all(cliente, usuario):
+    paciente = Paciente(nome='José Souza', data_nascimento=date(1950, 1, 1), unidade='UTI', leito='1', diagnostico='DPOC',
+                        status='Inativo')
+    db.session.add(paciente)
+    db.session.flush()
+    db.session.add(Evolucao(data=datetime(2026, 1, 2, 10), fisio=usuario.nome_completo, usuario_id=usuario.id,
+                            texto='Extubado sem intercorrências', paciente_id=paciente.id))
+    db.session.commit()
+
+    resposta = cliente.get('/arquivo?busca=jose')
+    assert resposta.status_code == 200
+    assert 'José Souza' in resposta.get_data(as_text=True)
+
+    resposta = cliente.get('/arquivo?busca=intercorrencias&evolucoes=1')
+    assert 'José Souza' in resposta.get_data(as_text=True)
+
+
+def test_drop_all_e_create_all_recriam_o_indice(app):
+    db.drop_all()
+    assert not db.session.scalars(db.text("SELECT name FROM sqlite_master WHERE name LIKE 'busca_%'")).all()
+    db.create_all()
+    db.session.add(Paciente(nome='José Souza', data_nascimento=date(1950, 1, 1), unidade='UTI', leito='1', diagnostico='DPOC'))
+    db.session.commit()
+    assert db.session.scalars(db.text("SELECT rowid FROM busca_pacientes WHERE busca_pacientes MATCH 'jose'")).all() == [1]
@@ -0,0 +1,26 @@
+from datetime import date
+
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+from leitos import leito_ocupado
+from models import db, Paciente
+
+
+def _gravar(**campos):
+    db.session.add(Paciente(**{'nome': 'Ana', 'data_nascimento': date(1950, 1, 1), 'unidade': 'UTI', 'leito': '1',
+                               'diagnostico': 'DPOC', **campos}))
+    with pytest.raises(IntegrityError) as erro:
+        db.session.commit()
+    db.session.rollback()
+    return erro.value
+
+
+def test_leito_ocupado_reconhece_o_indice_do_leito(app):
+    db.session.add(Paciente(nome='Bia', data_nascimento=date(1951, 1, 1), unidade='UTI', leito='1', diagnostico='AVC'))
+    db.session.commit()
+    assert leito_ocupado(_gravar())
+
+
+def test_leito_ocupado_ignora_outras_restricoes(app):
+    assert not leito_ocupado(_gravar(nome=None))
@@ -0,0 +1,64 @@
+from datetime import date
+
+from sqlalchemy import event
+
+from models import db, Paciente, montar_painel, registrar_atendimentos
+from painel_ao_vivo import barramento
+
+
+def _internar(quantidade, unidade='2ª Enfermaria'):
+    pacientes = [Paciente(nome=f'Paciente {numero}', data_nascimento=date(1950, 1, 1), unidade=unidade,
+                          leito=str(numero), diagnostico='DPOC') for numero in range(1, quantidade + 1)]
+    db.session.add_all(pacientes)
+    db.session.flush()
+    # Metade com atendimento no dia, para o LEFT JOIN trazer os dois tipos de linha
+    registrar_atendimentos({(paciente.id, 'manha'): True for paciente in pacientes[::2]})
+    db.session.commit()
+
+
+def _montar_contando_comandos():
+    comandos = []
+    def contar(conn, cursor, statement, parameters, context, executemany):
+        comandos.append(statement)
+    db.session.expire_all()
+    event.listen(db.engine, 'before_cursor_execute', contar)
+    try:
+        painel = montar_painel()
+        # Lê o que o template do painel lê, para que um carregamento preguiçoso também entre na conta
+        for pacientes in painel.values():
+            for paciente in pacientes:
+                paciente.nome, paciente.leito, paciente.diagnostico, paciente.atendimentos_hoje
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', contar)
+    return sum(len(pacientes) for pacientes in painel.values()), comandos
+
+
+def test_painel_faz_o_mesmo_numero_de_consultas_com_3_ou_50_pacientes(app):
+    _internar(3)
+    total, com_3 = _montar_contando_comandos()
+    assert total == 3
+
+    _internar(47, unidade='3ª Enfermaria')
+    total, com_50 = _montar_contando_comandos()
+    assert total == 50
+
+    assert len(com_50) == len(com_3)
+
+
+def test_painel_marca_os_turnos_do_dia(app):
+    _internar(3)
+    turnos = [paciente.atendimentos_hoje for paciente in montar_painel()['2ª Enfermaria']]
+    assert [turno['manha'] for turno in turnos] == [True, False, True]
+    assert not any(turno['tarde'] for turno in turnos)
+
+
+def test_painel_ao_vivo_recusado_informa_a_espera(app, cliente, monkeypatch):
+    monkeypatch.setattr(barramento, 'conexoes', 0)
+    resposta = cliente.get('/painel/eventos')
+    assert resposta.status_code == 503
+    assert resposta.headers['Retry-After'] == str(app.config['PAINEL_AO_VIVO_ESPERA'])
+
+    # A página leva a espera e o intervalo da revalidação usados pelo painel_diario.js depois de uma recusa
+    html = cliente.get('/').get_data(as_text=True)
+    assert f'data-espera="{app.config["PAINEL_AO_VIVO_ESPERA"]}"' in html
+    assert f'data-revalidacao="{app.config["PAINEL_AO_VIVO_REVALIDACAO"]}"' in html
@@ -0,0 +1,35 @@
+from datetime import date
+
+from models import db, Paciente
+from relatorios import reconstruir_resumos, relatorio_produtividade
+
+
+def _evoluir(cliente, paciente_id, texto):
+    resposta = cliente.post(f'/paciente/evoluir/{paciente_id}', data={'turno_atendimento': 'manha', 'evolucao': texto})
+    assert resposta.status_code == 302
+
+
+def test_renomear_o_usuario_nao_divide_os_totais(cliente, usuario):
+    paciente = Paciente(nome='José', data_nascimento=date(1950, 1, 1), unidade='UTI', leito='1', diagnostico='DPOC')
+    db.session.add(paciente)
+    db.session.commit()
+
+    _evoluir(cliente, paciente.id, 'Antes de renomear')
+    cliente.post(f'/admin/usuarios/editar/{usuario.id}', data={'nome_completo': 'Ana Fisio Souza', 'email': usuario.email, 'funcao': 'admin'})
+    _evoluir(cliente, paciente.id, 'Depois de renomear')
+
+    por_fisio = relatorio_produtividade(date.today(), date.today())['por_fisio']
+    assert [tuple(linha) for linha in por_fisio] == [('Ana Fisio Souza', 2, 1)]
+
+
+def test_reconstruir_resumos_agrupa_pelo_usuario_da_evolucao(cliente, usuario):
+    paciente = Paciente(nome='José', data_nascimento=date(1950, 1, 1), unidade='UTI', leito='1', diagnostico='DPOC')
+    db.session.add(paciente)
+    db.session.commit()
+    _evoluir(cliente, paciente.id, 'Antes de renomear')
+    cliente.post(f'/admin/usuarios/editar/{usuario.id}', data={'nome_completo': 'Ana Fisio Souza', 'email': usuario.email, 'funcao': 'admin'})
+    _evoluir(cliente, paciente.id, 'Depois de renomear')
+    incremental = relatorio_produtividade(date.today(), date.today())
+
+    reconstruir_resumos()
+    assert relatorio_produtividade(date.today(), date.today()) == incremental
@@ -0,0 +1,5 @@
+# wsgi.py
+# Ponto de entrada WSGI para produção: gunicorn -c gunicorn.conf.py wsgi:app
+from app import create_app
+
+app = create_app()